@@ -1,24 +1,556 @@
 import os
-from flask import Flask, request, jsonify, send_from_directory
+import sys
+import json
+import re
+import base64
+import hashlib
+import random
+import threading
+import time
+import uuid
+import queue
+import atexit
+import logging
+import logging.handlers
+from collections import OrderedDict, deque
+from itertools import chain
+from functools import wraps, lru_cache
+from contextlib import contextmanager
+from bisect import bisect_left, bisect_right
+import click
+from flask import Flask, Blueprint, current_app, request, jsonify, send_from_directory, stream_with_context, has_request_context, g
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.local import LocalProxy
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
-from flask_migrate import Migrate # Import Migrate
-from datetime import datetime, timezone, date # Import date
+from sqlalchemy import func, text, insert, select, union_all, or_, bindparam, event, tuple_, cast, inspect
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from datetime import datetime, timezone, date, timedelta # Import date
 
 # --- 기본 설정 ---
-app = Flask(__name__)
-# CORS 설정 확장 - 모든 원본에서의 모든 헤더와 메소드 허용
-CORS(app, resources={r"/api/*": {"origins": "*", "supports_credentials": True, "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"], "allow_headers": "*"}})
+db = SQLAlchemy()
+# 모든 라우트와 CLI 명령은 이 블루프린트에 등록하고 create_app()에서 앱에 붙임
+bp = Blueprint('api', __name__, cli_group=None)
 
-# 실제 배포 시에는 특정 도메인만 허용하도록 설정: CORS(app, resources={r"/api/*": {"origins": "http://your-frontend-domain.com"}})
+def create_app(config=None):
+    """
+    애플리케이션 팩토리
+    config (dict): 기본 설정을 덮어쓸 값 (예: {'SQLALCHEMY_DATABASE_URI': 'sqlite:///test.db'})
+    테이블 생성과 예시 데이터는 import 시점이 아니라 CLI 명령(flask init-db / flask seed-demo)으로 처리한다.
+    """
+    app = Flask(__name__)
+    # CORS 설정 확장 - 모든 원본에서의 모든 헤더와 메소드 허용
+    CORS(app, resources={r"/api/*": {"origins": "*", "supports_credentials": True, "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"], "allow_headers": "*"}})
+
+    # 실제 배포 시에는 특정 도메인만 허용하도록 설정: CORS(app, resources={r"/api/*": {"origins": "http://your-frontend-domain.com"}})
+
+    # 데이터베이스 설정 (SQLite 사용)
+    basedir = os.path.abspath(os.path.dirname(__file__))
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('RESERVATIONS_DATABASE_URI', 'sqlite:///' + os.path.join(basedir, 'reservations.db'))
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False # SQLAlchemy 이벤트 시스템 비활성화 (성능 향상)
+    app.config['STATISTICS_CACHE_SIZE'] = 128 # 통계 결과 캐시 최대 항목 수
+    app.config['STATISTICS_CACHE_TTL'] = 300 # 통계 결과 캐시 유효 시간 (초)
+    # SQLite 운영 설정 (동시 예약 요청 시 "database is locked" 방지)
+    app.config['SQLITE_BUSY_TIMEOUT_MS'] = 5000 # 잠금 대기 시간
+    app.config['SQLITE_CACHE_SIZE_KB'] = 20000 # 연결당 페이지 캐시 크기
+    app.config['SQLITE_MMAP_SIZE'] = 256 * 1024 * 1024 # 메모리 매핑 I/O 크기 (바이트)
+    app.config['WRITE_RETRY_ATTEMPTS'] = 5 # 잠금 오류 시 쓰기 요청 재시도 횟수
+    app.config['WRITE_RETRY_BASE_DELAY'] = 0.05 # 재시도 대기 시간 (초, 시도마다 2배)
+    # 변경 피드 (/api/events/stream)
+    app.config['EVENT_FEED_SIZE'] = 1000 # 재개(resume)용으로 메모리에 보관하는 최근 변경 수
+    app.config['EVENT_STREAM_MAX_CLIENTS'] = 20 # 동시에 열 수 있는 스트림 수 (스트림마다 요청 스레드 하나를 점유)
+    app.config['EVENT_STREAM_MAX_SECONDS'] = 300 # 스트림 최대 유지 시간 (이후 브라우저가 Last-Event-ID로 재연결)
+    app.config['EVENT_STREAM_HEARTBEAT'] = 15 # 변경이 없을 때 연결 유지용 주석을 보내는 간격 (초)
+    # 요청 계측 (/api/metrics)
+    app.config['METRICS_ENABLED'] = True
+    app.config['SLOW_REQUEST_MS'] = int(os.environ.get('RESERVATIONS_SLOW_REQUEST_MS', 0)) # 0이면 느린 요청 로그(SQL 포함) 끔
+    # 구조화 로깅 (stderr로 JSON 한 줄씩)
+    app.config['LOG_LEVEL'] = os.environ.get('RESERVATIONS_LOG_LEVEL', 'INFO').upper() # DEBUG면 조회 범위까지 기록
+    app.config['LOG_SAMPLE_RATES'] = parse_sample_rates(os.environ.get('RESERVATIONS_LOG_SAMPLE')) # 뷰 이름 -> 0~1 (WARNING 이상은 항상 기록)
+    # 예약 쓰기 Idempotency-Key
+    app.config['IDEMPOTENCY_TTL'] = 24 * 3600 # 저장된 응답을 재사용하는 기간 (초)
+    app.config['IDEMPOTENCY_LOCK_TIMEOUT'] = 60 # 처리 중인 키를 버려진 것으로 보는 시간 (초, 프로세스 종료 등)
+    # 사용자/장비 삭제 방식: False면 예약 기록까지 DB cascade로 삭제, True면 삭제 표시만 (지난 예약은 통계용으로 남음)
+    app.config['SOFT_DELETE'] = os.environ.get('RESERVATIONS_SOFT_DELETE', '').lower() in ('1', 'true', 'yes')
+    # JSON 응답 인코더: 'auto'(orjson이 있으면 orjson), 'orjson', 'stdlib'
+    app.config['JSON_ENCODER'] = os.environ.get('RESERVATIONS_JSON_ENCODER', 'auto')
+    # 지난 예약 보관 (flask archive-reservations)
+    app.config['ARCHIVE_AFTER_DAYS'] = 365 # 종료일이 이보다 오래된 예약을 보관 테이블로 옮김
+    app.config['ARCHIVE_BATCH_SIZE'] = 5000 # 트랜잭션 하나에 옮길 예약 수 (쓰기 잠금 시간을 짧게 유지)
+    app.config['ENABLE_MIGRATIONS'] = True # flask db 명령 등록 (웹 워커에서는 꺼서 alembic import 생략)
+    if config:
+        app.config.update(config)
+
+    configure_logging(app.config)
+    app.json = ReservationJSONProvider(app, app.config['JSON_ENCODER'])
+    db.init_app(app)
+    if app.config['ENABLE_MIGRATIONS']:
+        from flask_migrate import Migrate # alembic까지 불러오므로 필요할 때만 import
+        Migrate(app, db, directory=os.path.join(basedir, 'migrations')) # python app.py를 다른 폴더에서 실행해도 찾도록
+    app.register_blueprint(bp)
+
+    with app.app_context():
+        configure_sqlite_engine(db.engine, app.config)
+        if app.config['METRICS_ENABLED']:
+            instrument_engine(db.engine)
+
+    # 메모리 상태는 앱마다 새로 만듦 (같은 프로세스의 다른 앱/DB와 공유하지 않음)
+    app.extensions['reservations'] = AppState(app.config)
+    return app
+
+# --- 앱별 메모리 상태 ---
+# 장비 잠금/구간 인덱스/변경 피드/통계 캐시/요청 메트릭은 앱이 가리키는 DB에 묶여 있으므로 모듈 전역이 아니라
+# 앱의 extensions에 둔다. 모듈의 equipment_locks 등은 현재 앱의 상태를 가리키는 프록시다.
+
+class AppState:
+    """create_app()이 앱마다 하나씩 만드는 메모리 상태 묶음"""
+
+    def __init__(self, config):
+        self.equipment_locks = KeyedLockManager()
+        self.interval_indexes = IntervalIndexRegistry()
+        self.change_feed = ChangeFeed(config['EVENT_FEED_SIZE'])
+        self.statistics_cache = StatisticsCache(config['STATISTICS_CACHE_SIZE'], config['STATISTICS_CACHE_TTL'])
+        self.request_metrics = RequestMetrics()
+        self.idempotency_evicted_at = 0.0 # 만료된 멱등성 키를 마지막으로 정리한 시각 (time.monotonic)
+
+def app_state():
+    """현재 앱의 AppState (앱 컨텍스트 필요)"""
+    return current_app.extensions['reservations']
+
+# --- SQLite 저장소 설정 ---
+WRITE_METHODS = ('POST', 'PUT', 'DELETE')
+
+def configure_sqlite_engine(engine, config):
+    """연결마다 WAL/동기화/잠금 대기 PRAGMA를 적용하고 트랜잭션 시작을 직접 제어"""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = [
+        'PRAGMA journal_mode=WAL',
+        'PRAGMA synchronous=NORMAL',
+        f"PRAGMA busy_timeout={int(config['SQLITE_BUSY_TIMEOUT_MS'])}",
+        f"PRAGMA cache_size=-{int(config['SQLITE_CACHE_SIZE_KB'])}",
+        f"PRAGMA mmap_size={int(config['SQLITE_MMAP_SIZE'])}",
+        'PRAGMA foreign_keys=ON'
+    ]
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        # pysqlite의 암묵적 BEGIN을 끄고 아래 'begin' 이벤트에서 직접 BEGIN을 보냄
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    @event.listens_for(engine, 'begin')
+    def begin_transaction(connection):
+        # 쓰기 요청의 첫 트랜잭션은 처음부터 쓰기 잠금을 잡아 커밋 시점의 잠금 충돌을 막음
+        # (커밋 후 응답을 만들기 위한 조회는 일반 BEGIN)
+        if has_request_context() and request.method in WRITE_METHODS and not g.get('write_transaction_begun'):
+            g.write_transaction_begun = True
+            connection.exec_driver_sql('BEGIN IMMEDIATE')
+        else:
+            connection.exec_driver_sql('BEGIN')
+
+def is_database_locked(error):
+    return isinstance(error, OperationalError) and 'database is locked' in str(error.orig)
+
+def retry_on_locked(view):
+    """쓰기 뷰 데코레이터: 'database is locked' 오류면 롤백 후 지수 백오프로 다시 시도"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        attempts = current_app.config['WRITE_RETRY_ATTEMPTS']
+        delay = current_app.config['WRITE_RETRY_BASE_DELAY']
+        for attempt in range(attempts):
+            try:
+                return view(*args, **kwargs)
+            except OperationalError as e:
+                db.session.rollback()
+                g.pop('write_transaction_begun', None)
+                if not is_database_locked(e) or attempt == attempts - 1:
+                    raise
+                time.sleep(delay * (2 ** attempt) * (0.5 + random.random()))
+    return wrapper
+
+@contextmanager
+def read_before_write_lock():
+    """
+    쓰기 요청에서 잠글 장비를 알아내는 조회 (장비 잠금을 잡기 전에 실행)
+    일반 BEGIN으로 읽고 블록이 끝나면 트랜잭션을 닫는다. 쓰기 잠금(BEGIN IMMEDIATE)을 쥔 채 장비 잠금을 기다리면
+    그 장비 잠금을 쥔 요청이 DB 잠금을 기다려 busy_timeout까지 멈추므로, 장비 잠금 뒤의 첫 트랜잭션이 BEGIN IMMEDIATE가 되게 한다.
+    """
+    begun = g.get('write_transaction_begun')
+    g.write_transaction_begun = True
+    try:
+        yield
+    finally:
+        db.session.rollback()
+        if not begun:
+            g.pop('write_transaction_begun', None)
+
+def restart_write_transaction():
+    """잠금 안에서 연 쓰기 트랜잭션을 버리고 다음 트랜잭션을 다시 BEGIN IMMEDIATE로 시작하게 함"""
+    db.session.rollback()
+    g.pop('write_transaction_begun', None)
+
+# --- 구조화 로깅 ---
+# 요청 스레드는 레코드를 큐에 넣기만 하고, 포맷/출력은 백그라운드 리스너 스레드가 담당
+logger = logging.getLogger('fridge_booking')
+_log_listener = None
+
+def parse_sample_rates(value):
+    """'get_reservations=0.1,add_reservation=1' 형식의 엔드포인트별 샘플링 비율을 dict로 변환"""
+    rates = {}
+    for part in (value or '').split(','):
+        name, _, rate = part.partition('=')
+        if name.strip() and rate.strip():
+            rates[name.strip()] = float(rate)
+    return rates
+
+class JsonLogFormatter(logging.Formatter):
+    """레코드 한 건을 JSON 한 줄로 출력 (extra={'fields': {...}}의 값은 최상위 키로 펼침)"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class RequestContextFilter(logging.Filter):
+    """
+    요청 스레드에서 엔드포인트/메서드/경로를 레코드에 붙이고 엔드포인트별로 샘플링
+    WARNING 이상은 샘플링하지 않는다. 샘플링 비율은 LOG_SAMPLE_RATES (뷰 함수 이름 -> 0~1)
+    """
+
+    def __init__(self, sample_rates):
+        super().__init__()
+        self.sample_rates = sample_rates
+
+    def filter(self, record):
+        if not has_request_context():
+            return True
+        req = request._get_current_object() # 프록시를 한 번만 풀어서 사용
+        endpoint = (req.endpoint or 'unmatched').rpartition('.')[2]
+        if record.levelno < logging.WARNING:
+            rate = self.sample_rates.get(endpoint, 1.0)
+            if rate < 1.0 and random.random() >= rate:
+                return False
+        fields = {'endpoint': endpoint, 'method': req.method, 'path': req.path}
+        fields.update(getattr(record, 'fields', None) or {})
+        record.fields = fields
+        return True
+
+class StructuredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler.prepare()는 메시지를 문자열로 합쳐 버리므로 필드와 예외를 따로 보존
+    핸들러가 하나뿐이라(propagate=False) 레코드를 복사하지 않고 그대로 고쳐서 넘김
+    """
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # 트레이스백 객체는 스레드 간에 넘기지 않고 문자열로 만들어 둠 (오류 경로에서만 발생)
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def configure_logging(config):
+    """fridge_booking 로거를 큐 핸들러 + 리스너 스레드 구성으로 (다시) 설정"""
+    global _log_listener
+    log_queue = queue.SimpleQueue()
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonLogFormatter())
+    listener = logging.handlers.QueueListener(log_queue, output)
+    listener.start()
+
+    handler = StructuredQueueHandler(log_queue)
+    handler.addFilter(RequestContextFilter(config['LOG_SAMPLE_RATES']))
+    for old in list(logger.handlers):
+        logger.removeHandler(old)
+    logger.addHandler(handler)
+    logger.setLevel(config['LOG_LEVEL'])
+    logger.propagate = False # 루트 로거로 넘기지 않음 (출력은 리스너가 한 번만)
+
+    # 핸들러를 바꾼 뒤에 이전 앱의 리스너를 멈춤 (남은 레코드를 모두 출력하고 종료)
+    stop_log_listener()
+    _log_listener = listener
+
+@atexit.register
+def stop_log_listener():
+    """리스너 스레드를 멈춤 (큐에 남은 레코드는 모두 출력됨)"""
+    global _log_listener
+    listener, _log_listener = _log_listener, None
+    if listener is not None:
+        listener.stop()
+
+# --- JSON 응답 인코딩 ---
+# jsonify()는 app.json 프로바이더를 거친다. orjson이 설치되어 있으면 orjson으로, 없으면 표준 json으로 인코딩한다.
+# 목록 API의 행 dict는 날짜를 date/datetime 그대로 담고 인코더가 ISO 8601 문자열로 바꾼다 (행마다 isoformat() 호출 없음).
+JSON_ENCODERS = ('auto', 'orjson', 'stdlib')
+
+@lru_cache(maxsize=None)
+def load_orjson():
+    """orjson이 설치되어 있으면 모듈을, 없으면 None을 반환"""
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson
+
+def json_default(value):
+    """기본 인코더가 모르는 값 변환 (날짜는 ISO 8601, 나머지는 Flask 기본 규칙: Decimal/UUID/dataclass 등)"""
+    if isinstance(value, date): # datetime 포함 (Flask 기본값은 HTTP 날짜 형식이라 직접 처리)
+        return value.isoformat()
+    return DefaultJSONProvider.default(value)
+
+def json_dumps(obj):
+    """jsonify() 밖(SSE 등)에서 쓰는 압축 JSON 문자열 (날짜는 json_default로 변환)"""
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':'), default=json_default)
+
+# backslashreplace는 U+0080~U+00FF를 \xXX로, BMP 밖 문자를 \UXXXXXXXX로 바꾸므로 (JSON이 아님) 이 문자들만 먼저 직접 이스케이프
+NON_JSON_ESCAPE_RE = re.compile('[\x80-\xff\U00010000-\U0010ffff]')
+
+def escape_non_ascii(match):
+    """문자를 표준 json(ensure_ascii)과 같은 \\uXXXX 이스케이프로 (BMP 밖 문자는 서로게이트 쌍)"""
+    units = match.group().encode('utf-16-be').hex()
+    return ''.join(f'\\u{units[i:i + 4]}' for i in range(0, len(units), 4))
+
+def ascii_json(body):
+    """
+    orjson 출력(UTF-8)을 표준 json과 같은 ASCII 출력으로
+    비 ASCII 문자는 문자열 안에만 있으므로 통째로 치환해도 안전하다. 나머지 BMP 문자(한글 등)는 backslashreplace가 C 속도로 \\uXXXX로 바꾼다.
+    """
+    if body.isascii():
+        return body
+    return NON_JSON_ESCAPE_RE.sub(escape_non_ascii, body.decode()).encode('ascii', 'backslashreplace')
+
+class ReservationJSONProvider(DefaultJSONProvider):
+    """
+    orjson을 쓸 수 있으면 응답 본문을 orjson으로 바로 bytes로 만들고, 아니면 표준 json으로 인코딩
+    두 경로 모두 기존 출력과 바이트 단위로 같다: 키는 정렬하고, 비 ASCII 문자는 \\uXXXX로 이스케이프한다.
+    """
+    default = staticmethod(json_default)
+
+    def __init__(self, app, encoder='auto'):
+        super().__init__(app)
+        if encoder not in JSON_ENCODERS:
+            raise ValueError(f"JSON_ENCODER는 {', '.join(JSON_ENCODERS)} 중 하나여야 합니다: {encoder}")
+        self.orjson = load_orjson() if encoder != 'stdlib' else None
+        if encoder == 'orjson' and self.orjson is None:
+            logger.warning('orjson이 설치되어 있지 않아 표준 json으로 인코딩합니다.')
+        # dict의 정수 키(통계 등)는 표준 json처럼 문자열 키로 출력하고, 키는 표준 json(sort_keys)처럼 정렬
+        self.orjson_options = self.orjson.OPT_NON_STR_KEYS | self.orjson.OPT_SORT_KEYS if self.orjson else 0
+
+    @property
+    def encoder_name(self):
+        return 'orjson' if self.orjson else 'stdlib'
+
+    @property
+    def native_dates(self):
+        """date/datetime을 인코더가 직접 빠르게 출력하는지 (표준 json은 값마다 default 콜백을 거쳐 느림)"""
+        return self.orjson is not None
+
+    def dumps(self, obj, **kwargs):
+        if self.orjson and not kwargs:
+            return ascii_json(self.orjson.dumps(obj, default=json_default, option=self.orjson_options)).decode()
+        return super().dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        if self.orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        options = self.orjson_options | self.orjson.OPT_APPEND_NEWLINE
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            options |= self.orjson.OPT_INDENT_2
+        return self._app.response_class(ascii_json(self.orjson.dumps(obj, default=json_default, option=options)), mimetype=self.mimetype)
+
+# --- 요청 계측 (메트릭) ---
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10) # 초
+SIZE_BUCKETS = (100, 1000, 10_000, 100_000, 1_000_000, 10_000_000) # 바이트
+SQL_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100) # 요청당 SQL 문 수
+SLOW_LOG_SQL_LIMIT = 50 # 느린 요청 로그에 남길 최대 SQL 문 수
+
+class Histogram:
+    """Prometheus 방식의 누적 버킷 히스토그램 (잠금은 RequestMetrics가 담당)"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1) # 마지막 칸은 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum:.6f}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+class EndpointMetrics:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.response_size = Histogram(SIZE_BUCKETS)
+        self.sql_statements = Histogram(SQL_COUNT_BUCKETS)
+        self.sql_seconds = 0.0
+        self.statuses = {}
+        self.errors = 0
+
+class RequestMetrics:
+    """(엔드포인트 규칙, 메서드)별 지연 시간/응답 크기/SQL 수·시간/상태 코드 집계"""
+
+    def __init__(self):
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def observe(self, endpoint, method, status, seconds, size, sql_count, sql_seconds):
+        with self._lock:
+            metrics = self._endpoints.get((endpoint, method))
+            if metrics is None:
+                metrics = self._endpoints[(endpoint, method)] = EndpointMetrics()
+            metrics.latency.observe(seconds)
+            if size is not None: # 스트리밍 응답은 크기를 미리 알 수 없음
+                metrics.response_size.observe(size)
+            metrics.sql_statements.observe(sql_count)
+            metrics.sql_seconds += sql_seconds
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+            if status >= 500:
+                metrics.errors += 1
+
+    def render(self):
+        """Prometheus 텍스트 형식 (text/plain; version=0.0.4)"""
+        families = {
+            'http_requests_total': ('counter', '엔드포인트/메서드/상태 코드별 요청 수', []),
+            'http_request_errors_total': ('counter', '5xx 응답 수', []),
+            'http_request_duration_seconds': ('histogram', '요청 처리 시간 (응답 객체 반환까지)', []),
+            'http_response_size_bytes': ('histogram', '응답 본문 크기 (스트리밍 응답 제외)', []),
+            'http_request_sql_statements': ('histogram', '요청당 실행한 SQL 문 수', []),
+            'http_request_sql_seconds_total': ('counter', '요청 중 SQL 실행에 쓴 시간', []),
+        }
+        with self._lock:
+            for (endpoint, method), metrics in sorted(self._endpoints.items()):
+                labels = f'endpoint="{prometheus_escape(endpoint)}",method="{method}"'
+                for status, count in sorted(metrics.statuses.items()):
+                    families['http_requests_total'][2].append(f'http_requests_total{{{labels},status="{status}"}} {count}')
+                families['http_request_errors_total'][2].append(f'http_request_errors_total{{{labels}}} {metrics.errors}')
+                families['http_request_duration_seconds'][2].extend(metrics.latency.render('http_request_duration_seconds', labels))
+                families['http_response_size_bytes'][2].extend(metrics.response_size.render('http_response_size_bytes', labels))
+                families['http_request_sql_statements'][2].extend(metrics.sql_statements.render('http_request_sql_statements', labels))
+                families['http_request_sql_seconds_total'][2].append(f'http_request_sql_seconds_total{{{labels}}} {metrics.sql_seconds:.6f}')
+        lines = []
+        for name, (kind, help_text, samples) in families.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(samples)
+        return lines
+
+request_metrics = LocalProxy(app_state, 'request_metrics')
+
+def prometheus_escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def instrument_engine(engine):
+    """요청 중에 실행된 SQL 문 수와 시간을 g에 누적 (느린 요청 로그가 켜져 있으면 SQL도 기록)"""
+
+    # 시작 시각은 문장별 실행 컨텍스트에 둠 (실패한 문장은 after_cursor_execute가 불리지 않아도 남는 것이 없음)
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context.query_started = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - context.query_started
+        if not has_request_context() or 'sql_count' not in g:
+            return
+        g.sql_count += 1
+        g.sql_seconds += elapsed
+        if g.sql_log is not None and len(g.sql_log) < SLOW_LOG_SQL_LIMIT:
+            g.sql_log.append({'ms': round(elapsed * 1000, 3), 'sql': statement,
+                              'params': repr(parameters)[:200]})
+
+@bp.before_app_request
+def start_request_metrics():
+    if not current_app.config['METRICS_ENABLED']:
+        return
+    g.request_started = time.perf_counter()
+    g.sql_count = 0
+    g.sql_seconds = 0.0
+    g.sql_log = [] if current_app.config['SLOW_REQUEST_MS'] else None
+
+@bp.after_app_request
+def record_request_metrics(response):
+    if 'request_started' not in g:
+        return response
+    seconds = time.perf_counter() - g.request_started
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    size = None if response.is_streamed else response.calculate_content_length()
+    request_metrics.observe(endpoint, request.method, response.status_code, seconds, size, g.sql_count, g.sql_seconds)
+
+    slow_ms = current_app.config['SLOW_REQUEST_MS']
+    if slow_ms and seconds * 1000 >= slow_ms:
+        logger.warning('느린 요청', extra={'fields': {
+            'query': request.query_string.decode(),
+            'rule': endpoint,
+            'status': response.status_code,
+            'ms': round(seconds * 1000, 1),
+            'sql_count': g.sql_count,
+            'sql_ms': round(g.sql_seconds * 1000, 1),
+            'sql': g.sql_log
+        }})
+    return response
 
-# 데이터베이스 설정 (SQLite 사용)
-basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + os.path.join(basedir, 'reservations.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False # SQLAlchemy 이벤트 시스템 비활성화 (성능 향상)
+# --- 장비별 쓰기 잠금 ---
+class KeyedLockManager:
+    """
+    키(장비 ID)별 잠금. 같은 장비에 대한 중복 검사와 저장은 한 번에 하나씩만 진행되고,
+    서로 다른 장비의 예약은 병렬로 처리된다. 사용하지 않는 키의 잠금은 자동으로 정리된다.
+    """
 
-db = SQLAlchemy(app)
-migrate = Migrate(app, db)
+    def __init__(self):
+        self._locks = {} # key -> [threading.Lock, 대기/보유 중인 스레드 수]
+        self._guard = threading.Lock()
+
+    @contextmanager
+    def hold(self, *keys):
+        # 교착 상태를 피하려고 항상 정렬된 순서로 잠금
+        keys = sorted(set(keys))
+        entries = []
+        with self._guard:
+            for key in keys:
+                entry = self._locks.setdefault(key, [threading.Lock(), 0])
+                entry[1] += 1
+                entries.append((key, entry))
+        acquired = []
+        try:
+            for _, entry in entries:
+                entry[0].acquire()
+                acquired.append(entry)
+            yield
+        finally:
+            for entry in reversed(acquired):
+                entry[0].release()
+            with self._guard:
+                for key, entry in entries:
+                    entry[1] -= 1
+                    if entry[1] == 0:
+                        del self._locks[key]
+
+equipment_locks = LocalProxy(app_state, 'equipment_locks')
 
 # --- 데이터베이스 모델 정의 ---
 
@@ -26,7 +558,9 @@ class Equipment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(80), unique=True, nullable=False)
     description = db.Column(db.String(200), nullable=True)
-    reservations = db.relationship('Reservation', backref='equipment', lazy=True, cascade="all, delete-orphan")
+    deleted_at = db.Column(db.DateTime, nullable=True) # 소프트 삭제 시각 (SOFT_DELETE 모드, 지난 예약은 통계용으로 남음)
+    # 예약/반복 규칙/보관된 예약은 외래 키의 ON DELETE CASCADE로 DB가 지움 (passive_deletes: 자식 행을 세션에 읽지 않음)
+    reservations = db.relationship('Reservation', backref='equipment', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
 
     def to_dict(self):
         return {
@@ -39,7 +573,8 @@ class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(80), unique=True, nullable=False)
     # email = db.Column(db.String(120), unique=True, nullable=True) # 필요시 추가
-    reservations = db.relationship('Reservation', backref='user', lazy=True, cascade="all, delete-orphan")
+    deleted_at = db.Column(db.DateTime, nullable=True) # 소프트 삭제 시각 (SOFT_DELETE 모드)
+    reservations = db.relationship('Reservation', backref='user', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
 
     def to_dict(self):
         return {
@@ -49,13 +584,31 @@ class User(db.Model):
 
 class Reservation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    equipment_id = db.Column(db.Integer, db.ForeignKey('equipment.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    equipment_id = db.Column(db.Integer, db.ForeignKey('equipment.id', ondelete='CASCADE'), nullable=False)
     # Use start_date and end_date for multi-day reservations
     start_date = db.Column(db.Date, nullable=False)
     end_date = db.Column(db.Date, nullable=False) # Inclusive end date
     purpose = db.Column(db.String(200), nullable=True)
     created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc)) # Keep created_at as DateTime
+    # 반복 예약으로 생성된 경우 (규칙이 지워지면 남은 회차는 단일 예약이 됨)
+    series_id = db.Column(db.Integer, db.ForeignKey('reservation_series.id', ondelete='SET NULL'), nullable=True, index=True)
+
+    # 기간 중복 검사/캘린더/통계 쿼리용 복합 인덱스 (migrations/versions/0001_reservation_interval_indexes.py)
+    __table_args__ = (
+        # 장비별 중복 검사: equipment_id = ? AND start_date <= ? AND end_date >= ?
+        db.Index('ix_reservation_equipment_dates', 'equipment_id', 'start_date', 'end_date'),
+        # 사용자 필터 + 시작일 정렬
+        db.Index('ix_reservation_user_start', 'user_id', 'start_date'),
+        # 장비 필터 없는 기간 조회: end_date >= view_start 로 과거 예약을 건너뜀
+        db.Index('ix_reservation_end_start', 'end_date', 'start_date'),
+        # 커서 페이지네이션: ORDER BY start_date, id 와 (start_date, id) > (?, ?) 탐색
+        db.Index('ix_reservation_start_id', 'start_date', 'id'),
+        # 시작일 순 기간 스윕 (여러 기간 통계, 점유 시계열): 테이블 조회 없이 정렬된 채로 읽음
+        db.Index('ix_reservation_start_cover', 'start_date', 'end_date', 'equipment_id', 'user_id'),
+        # 지운(보관한) 예약의 id를 다시 쓰지 않음 (MAX(id) + 1이 아니라 sqlite_sequence 기준으로 발급)
+        {'sqlite_autoincrement': True},
+    )
 
     def to_dict(self):
         return {
@@ -68,22 +621,744 @@ class Reservation(db.Model):
             'start_date': self.start_date.isoformat(),
             'end_date': self.end_date.isoformat(),
             'purpose': self.purpose,
-            'created_at': self.created_at.isoformat() # Keep created_at as DateTime ISO string
+            'created_at': self.created_at.isoformat(), # Keep created_at as DateTime ISO string
+            'series_id': self.series_id
         }
 
+class ReservationSeries(db.Model):
+    """
+    반복 예약 규칙
+    - frequency='daily': start_date부터 interval일마다
+    - frequency='weekly': interval주마다 weekdays(0=월 ... 6=일)에 해당하는 요일
+    각 회차는 시작일부터 duration_days일 동안이며, until_date 이전에 시작하는 회차까지 생성된다.
+    """
+    __tablename__ = 'reservation_series'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    equipment_id = db.Column(db.Integer, db.ForeignKey('equipment.id', ondelete='CASCADE'), nullable=False)
+    frequency = db.Column(db.String(10), nullable=False) # 'daily' 또는 'weekly'
+    interval = db.Column(db.Integer, nullable=False, default=1)
+    weekdays = db.Column(db.String(20), nullable=True) # 쉼표로 구분된 요일 번호 (weekly 전용)
+    duration_days = db.Column(db.Integer, nullable=False, default=1)
+    start_date = db.Column(db.Date, nullable=False)
+    until_date = db.Column(db.Date, nullable=False) # Inclusive
+    purpose = db.Column(db.String(200), nullable=True)
+    created_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user_id': self.user_id,
+            'equipment_id': self.equipment_id,
+            'frequency': self.frequency,
+            'interval': self.interval,
+            'weekdays': [int(day) for day in self.weekdays.split(',')] if self.weekdays else [],
+            'duration_days': self.duration_days,
+            'start_date': self.start_date.isoformat(),
+            'until_date': self.until_date.isoformat(),
+            'purpose': self.purpose,
+            'created_at': self.created_at.isoformat()
+        }
+
+class ReservationArchive(db.Model):
+    """
+    보관된 지난 예약 (archive_reservations()가 종료일이 기준일보다 이른 예약을 reservation에서 옮겨 둠)
+    컬럼과 id는 Reservation과 같다. 반복 예약 규칙은 나중에 지워질 수 있으므로 series_id에는 외래 키를 두지 않음
+    """
+    __tablename__ = 'reservation_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
+    equipment_id = db.Column(db.Integer, db.ForeignKey('equipment.id', ondelete='CASCADE'), nullable=False)
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date, nullable=False) # Inclusive end date
+    purpose = db.Column(db.String(200), nullable=True)
+    created_at = db.Column(db.DateTime)
+    series_id = db.Column(db.Integer, nullable=True, index=True)
+    archived_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        # 통계/내보내기의 기간 조회와 보관 기준일(MAX(end_date)) 조회
+        db.Index('ix_reservation_archive_start_cover', 'start_date', 'end_date', 'equipment_id', 'user_id'),
+        db.Index('ix_reservation_archive_end', 'end_date'),
+        # 사용자/장비 삭제 시 보관된 예약 정리, 장비/사용자 필터
+        db.Index('ix_reservation_archive_equipment_start', 'equipment_id', 'start_date'),
+        db.Index('ix_reservation_archive_user_start', 'user_id', 'start_date'),
+    )
+
+# --- 사용량 롤업 테이블 ---
+# 통계를 매번 원본 Reservation 행에서 다시 계산하지 않도록, 예약 쓰기 경로에서 같은 트랜잭션으로 갱신한다.
+# 통계 기간 중 온전한 달은 월간 롤업에서, 앞뒤로 걸친 일부 달은 일간 롤업에서 읽으므로
+# 어떤 기간이든 읽는 행 수가 예약 수가 아니라 기간의 일수(와 그 기간에 사용한 사용자-장비 쌍 수)에 비례한다.
+
+class UserMonthlyUsage(db.Model):
+    """사용자-장비별 월간 사용 일수 (user_id, equipment_id, month=해당 월 1일)"""
+    __tablename__ = 'user_monthly_usage'
+    user_id = db.Column(db.Integer, primary_key=True)
+    equipment_id = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Date, primary_key=True)
+    used_days = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # 통계의 달 범위 조회 (기본 키는 user_id가 앞이라 달 조건으로 탐색할 수 없음)
+        db.Index('ix_user_monthly_usage_month', 'month', 'equipment_id', 'user_id', 'used_days'),
+    )
+
+class UserDailyUsage(db.Model):
+    """
+    사용자-장비별 일간 사용 일수 (day, equipment_id, user_id)
+    기본 키가 day로 시작하는 WITHOUT ROWID 테이블이라 날짜 범위 조회가 기본 키 탐색 하나로 끝남
+    """
+    __tablename__ = 'user_daily_usage'
+    day = db.Column(db.Date, primary_key=True)
+    equipment_id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, primary_key=True)
+    used_days = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # 사용자 삭제 시 롤업 정리 (장비 삭제는 장비 행이 테이블의 큰 몫이라 스캔과 차이가 없음)
+        db.Index('ix_user_daily_usage_user', 'user_id'),
+        {'sqlite_with_rowid': False},
+    )
+
+def apply_reservations_to_rollups(rows, sign=1):
+    """
+    예약 (equipment_id, user_id, start_date, end_date) 목록을 롤업 테이블에 반영
+    sign=1 이면 추가, sign=-1 이면 제거. 커밋은 호출한 쓰기 경로에서 함께 수행한다.
+    """
+    monthly = {}
+    daily = {}
+    for equipment_id, user_id, start_date, end_date in rows:
+        # 일간 롤업은 예약 기간의 하루마다 한 행
+        day = start_date
+        while day <= end_date:
+            day_key = (day, equipment_id, user_id)
+            daily[day_key] = daily.get(day_key, 0) + sign
+            day += timedelta(days=1)
+        # 예약 기간을 달 단위로 잘라 달마다 한 번씩 더함 (예약 일수와 관계없이 걸친 달 수만큼)
+        month = start_date.replace(day=1)
+        while month <= end_date:
+            next_month = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+            days = (min(end_date, next_month - timedelta(days=1)) - max(start_date, month)).days + 1
+            month_key = (user_id, equipment_id, month)
+            monthly[month_key] = monthly.get(month_key, 0) + sign * days
+            month = next_month
+
+    monthly_params = [{'user_id': u_id, 'equipment_id': eq_id, 'month': month, 'used_days': delta}
+                      for (u_id, eq_id, month), delta in monthly.items() if delta]
+
+    if monthly_params:
+        table = UserMonthlyUsage.__table__
+        stmt = sqlite_insert(table)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.equipment_id, table.c.month],
+            set_={'used_days': table.c.used_days + stmt.excluded.used_days}
+        ), monthly_params)
+
+    if sign < 0 and monthly_params:
+        # 0이 된 행은 정리
+        UserMonthlyUsage.query.filter(
+            UserMonthlyUsage.user_id.in_({p['user_id'] for p in monthly_params}),
+            UserMonthlyUsage.equipment_id.in_({p['equipment_id'] for p in monthly_params}),
+            UserMonthlyUsage.used_days <= 0
+        ).delete(synchronize_session=False)
+
+    daily_params = [{'day': day, 'equipment_id': eq_id, 'user_id': u_id, 'used_days': delta}
+                    for (day, eq_id, u_id), delta in daily.items() if delta]
+    if daily_params:
+        table = UserDailyUsage.__table__
+        stmt = sqlite_insert(table)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.day, table.c.equipment_id, table.c.user_id],
+            set_={'used_days': table.c.used_days + stmt.excluded.used_days}
+        ), daily_params)
+
+    if sign < 0 and daily_params:
+        UserDailyUsage.query.filter(
+            UserDailyUsage.day.between(min(p['day'] for p in daily_params), max(p['day'] for p in daily_params)),
+            UserDailyUsage.equipment_id.in_({p['equipment_id'] for p in daily_params}),
+            UserDailyUsage.used_days <= 0
+        ).delete(synchronize_session=False)
+
+def rebuild_rollups():
+    """롤업 테이블을 원본 Reservation 데이터(보관된 예약 포함)로 다시 채움 (백필용, 커밋 포함)"""
+    UserMonthlyUsage.query.delete(synchronize_session=False)
+    UserDailyUsage.query.delete(synchronize_session=False)
+    # 예약 기간을 일 단위로 펼치는 재귀 CTE로 DB 안에서 한 번에 집계
+    expand_days = """
+        WITH RECURSIVE days(equipment_id, user_id, day, end_date) AS (
+            SELECT equipment_id, user_id, start_date, end_date FROM reservation WHERE start_date <= end_date
+            UNION ALL
+            SELECT equipment_id, user_id, start_date, end_date FROM reservation_archive WHERE start_date <= end_date
+            UNION ALL
+            SELECT equipment_id, user_id, date(day, '+1 day'), end_date FROM days WHERE day < end_date
+        )
+    """
+    db.session.execute(text(expand_days + """
+        INSERT INTO user_monthly_usage (user_id, equipment_id, month, used_days)
+        SELECT user_id, equipment_id, date(day, 'start of month'), COUNT(*) FROM days
+        GROUP BY user_id, equipment_id, date(day, 'start of month')
+    """))
+    db.session.execute(text(expand_days + """
+        INSERT INTO user_daily_usage (day, equipment_id, user_id, used_days)
+        SELECT day, equipment_id, user_id, COUNT(*) FROM days
+        GROUP BY day, equipment_id, user_id
+    """))
+    db.session.commit()
+
+@bp.cli.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """사용량 롤업 테이블 재구축 (flask rebuild-rollups)"""
+    rebuild_rollups()
+    print("사용량 롤업 테이블을 다시 만들었습니다.")
+
+# --- 데이터 버전 (ETag / 조건부 GET) ---
+# 쓰기 엔드포인트가 같은 트랜잭션에서 테이블별 버전을 올리고,
+# 목록/통계 GET은 쿼리를 실행하기 전에 버전으로 만든 ETag를 If-None-Match와 비교한다.
+
+class DataVersion(db.Model):
+    """테이블별 단조 증가 버전과 마지막 변경 시각"""
+    __tablename__ = 'data_version'
+    table_name = db.Column(db.String(40), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+def bump_data_version(*table_names):
+    """지정한 테이블의 버전을 1 올림 (커밋은 호출한 쓰기 경로에서 수행)"""
+    table = DataVersion.__table__
+    stmt = sqlite_insert(table)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    db.session.execute(stmt.on_conflict_do_update(
+        index_elements=[table.c.table_name],
+        set_={'version': table.c.version + 1, 'updated_at': stmt.excluded.updated_at}
+    ), [{'table_name': name, 'version': 1, 'updated_at': now} for name in table_names])
+
+def current_data_versions(table_names):
+    """table_names 순서대로의 버전 튜플과 가장 최근 변경 시각"""
+    versions = {}
+    last_modified = None
+    for name, version, updated_at in db.session.query(
+            DataVersion.table_name, DataVersion.version, DataVersion.updated_at
+    ).filter(DataVersion.table_name.in_(table_names)):
+        versions[name] = version
+        last_modified = max(last_modified, updated_at) if last_modified else updated_at
+    return tuple(versions.get(name, 0) for name in table_names), last_modified
+
+def conditional_get(*table_names, by_date=False):
+    """
+    GET 뷰 데코레이터: table_names의 버전으로 ETag/Last-Modified를 붙이고,
+    If-None-Match가 일치하면 뷰(쿼리/직렬화)를 실행하지 않고 304를 반환
+    by_date=True: 기본 조회 기간이 오늘 기준인 뷰 (ETag에 오늘 날짜를 넣어 날짜가 바뀌면 다시 계산)
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            versions, last_modified = current_data_versions(table_names)
+            etag = request.endpoint + '-' + '.'.join(str(version) for version in versions)
+            if by_date:
+                etag += '-' + date.today().isoformat()
+
+            if request.if_none_match.contains_weak(etag):
+                response = current_app.response_class(status=304)
+            else:
+                response = view(*args, **kwargs)
+                if isinstance(response, tuple): # 에러 응답은 그대로 반환
+                    return response
+            response.set_etag(etag)
+            if last_modified:
+                response.last_modified = last_modified.replace(tzinfo=timezone.utc)
+            response.headers['Cache-Control'] = 'no-cache' # 매번 재검증
+            return response
+        return wrapper
+    return decorator
+
+# --- 멱등성 키 (Idempotency-Key) ---
+# 불안정한 네트워크에서 클라이언트가 같은 예약 쓰기를 재시도하면, 첫 요청의 응답을 저장해 두었다가
+# 검증/중복 검사/쓰기를 다시 하지 않고 그대로 돌려준다 (첫 요청이 성공했는데 재시도가 409가 되는 문제 방지).
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+IDEMPOTENCY_EVICT_INTERVAL = 60 # 만료된 키 정리 간격 (초, 앱별)
+
+class IdempotencyKey(db.Model):
+    """
+    Idempotency-Key 헤더로 받은 쓰기 요청의 결과 (status_code가 NULL이면 처리 중)
+    키가 곧 기본 키인 WITHOUT ROWID 테이블이라 조회/삽입이 B-tree 하나로 끝남
+    """
+    __tablename__ = 'idempotency_key'
+    key = db.Column(db.String(IDEMPOTENCY_KEY_MAX_LENGTH), primary_key=True)
+    request_hash = db.Column(db.LargeBinary(32), nullable=False) # sha256(메서드, 경로, 본문)
+    status_code = db.Column(db.Integer, nullable=True)
+    response_body = db.Column(db.LargeBinary, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, index=True) # TTL 만료 기준
+
+    __table_args__ = {'sqlite_with_rowid': False}
+
+def claim_idempotency_key(key, request_hash):
+    """
+    키를 처리 중으로 점유하고 커밋 (쓰기 요청의 첫 트랜잭션이라 BEGIN IMMEDIATE로 원자적)
+    반환: None (새로 점유함) 또는 이미 있는 IdempotencyKey 행
+    만료(IDEMPOTENCY_TTL)되었거나 처리 중인 채로 IDEMPOTENCY_LOCK_TIMEOUT이 지난 행은 없는 것으로 보고 다시 점유
+    """
+    config = current_app.config
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    expires_before = now - timedelta(seconds=config['IDEMPOTENCY_TTL'])
+    record = db.session.get(IdempotencyKey, key)
+    if record is not None and (record.created_at < expires_before or (
+            record.status_code is None and record.created_at < now - timedelta(seconds=config['IDEMPOTENCY_LOCK_TIMEOUT']))):
+        db.session.delete(record)
+        record = None
+    if record is not None:
+        db.session.expunge(record) # 롤백해도 값이 만료되지 않도록 세션에서 분리
+        db.session.rollback()
+        return record
+
+    db.session.add(IdempotencyKey(key=key, request_hash=request_hash, created_at=now))
+    state = app_state()
+    if time.monotonic() - state.idempotency_evicted_at > IDEMPOTENCY_EVICT_INTERVAL:
+        state.idempotency_evicted_at = time.monotonic()
+        IdempotencyKey.query.filter(IdempotencyKey.created_at < expires_before).delete(synchronize_session=False)
+    db.session.commit()
+    g.pop('write_transaction_begun', None) # 뷰의 첫 트랜잭션도 BEGIN IMMEDIATE로 시작
+    return None
+
+def finish_idempotency_key(key, response):
+    """뷰 실행 후 응답을 저장 (5xx/예외면 키를 지워 재시도가 다시 실행되게 함)"""
+    db.session.rollback() # 뷰가 응답을 만들며 열어 둔 읽기 트랜잭션 정리 (쓰기는 이미 커밋됨)
+    try:
+        if response is None or response.status_code >= 500:
+            IdempotencyKey.query.filter_by(key=key).delete(synchronize_session=False)
+        else:
+            IdempotencyKey.query.filter_by(key=key).update(
+                {'status_code': response.status_code, 'response_body': response.get_data()}, synchronize_session=False)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        logger.exception('멱등성 키 저장 중 오류 발생') # 키는 IDEMPOTENCY_LOCK_TIMEOUT 뒤에 다시 쓸 수 있음
+
+def idempotent(view):
+    """
+    쓰기 뷰 데코레이터: Idempotency-Key 헤더가 있으면 같은 키의 재시도에 저장된 응답을 그대로 반환
+    - 처음 받은 키: 처리 중으로 점유한 뒤 뷰를 실행하고 응답(5xx 제외)을 저장
+    - 같은 키 + 같은 요청: 저장된 상태 코드/본문 (Idempotent-Replayed: true 헤더), 아직 처리 중이면 409
+    - 같은 키 + 다른 요청(메서드/경로/본문): 422
+    retry_on_locked 바깥에 둔다 (잠금 오류로 뷰를 다시 실행하는 동안 키를 계속 점유).
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if key is None:
+            return view(*args, **kwargs)
+        if not 0 < len(key) <= IDEMPOTENCY_KEY_MAX_LENGTH:
+            return jsonify({'message': f'Idempotency-Key는 1~{IDEMPOTENCY_KEY_MAX_LENGTH}자여야 합니다.'}), 400
+
+        request_hash = hashlib.sha256(b'\n'.join(
+            [request.method.encode(), request.full_path.encode(), request.get_data()])).digest()
+        record = claim_idempotency_key(key, request_hash)
+        if record is not None:
+            if record.request_hash != request_hash:
+                return jsonify({'message': '같은 Idempotency-Key로 다른 요청을 보낼 수 없습니다.'}), 422
+            if record.status_code is None:
+                response = jsonify({'message': '같은 Idempotency-Key의 요청을 처리하고 있습니다. 잠시 후 다시 시도해주세요.'})
+                response.status_code = 409
+                response.headers['Retry-After'] = '1'
+                return response
+            response = current_app.response_class(record.response_body, status=record.status_code,
+                                                  mimetype='application/json')
+            response.headers['Idempotent-Replayed'] = 'true'
+            return response
+
+        response = None
+        try:
+            response = current_app.make_response(view(*args, **kwargs))
+            return response
+        finally:
+            finish_idempotency_key(key, response)
+    return wrapper
+
+# --- 지난 예약 보관 (hot/cold 분리) ---
+# 지난 예약은 수정할 수 없으므로(과거 날짜 예약/수정 불가) 주기적으로 reservation_archive로 옮긴다.
+# 캘린더/중복 검사/구간 인덱스는 reservation 테이블만 읽고, 통계/내보내기처럼 조회 기간이
+# 보관된 구간에 닿는 경우에만 두 테이블을 UNION ALL로 합쳐서 읽는다.
+# 롤업 테이블은 보관된 예약도 계속 포함한다 (보관 여부와 관계없이 통계가 같음).
+RESERVATION_COLUMNS = ('id', 'user_id', 'equipment_id', 'start_date', 'end_date', 'purpose', 'created_at', 'series_id')
+
+def reaches_archive(start_date=None):
+    """start_date부터 시작하는 기간 조회가 보관된 예약에 닿는지 (보관된 예약 중 가장 늦은 종료일과 비교)"""
+    watermark = db.session.query(func.max(ReservationArchive.end_date)).scalar()
+    return watermark is not None and (start_date is None or start_date <= watermark)
+
+def reservation_source(start_date=None):
+    """
+    start_date부터 시작하는 기간 조회에 쓸 예약 원본 (.c로 컬럼 접근)
+    기간이 보관된 구간에 닿으면 reservation + reservation_archive의 UNION ALL 서브쿼리,
+    아니면 reservation 테이블 그대로 (SQLite가 바깥 WHERE를 양쪽 SELECT로 내려 각 인덱스를 사용)
+    """
+    if not reaches_archive(start_date):
+        return Reservation.__table__
+    hot, cold = Reservation.__table__, ReservationArchive.__table__
+    return union_all(
+        select(*[hot.c[name] for name in RESERVATION_COLUMNS]),
+        select(*[cold.c[name] for name in RESERVATION_COLUMNS])
+    ).subquery('reservation_all')
+
+def reservation_table_sql(start_date=None):
+    """reservation_source()의 text() SQL 버전 (FROM 절에 그대로 넣을 테이블 이름 또는 서브쿼리)"""
+    if not reaches_archive(start_date):
+        return 'reservation'
+    columns = ', '.join(RESERVATION_COLUMNS)
+    return f'(SELECT {columns} FROM reservation UNION ALL SELECT {columns} FROM reservation_archive)'
+
+def archive_reservations(cutoff, batch_size):
+    """
+    종료일이 cutoff보다 이른 예약을 reservation_archive로 옮김 (batch_size개씩 별도 트랜잭션, 옮긴 수 반환)
+    reservation은 AUTOINCREMENT 테이블이라 옮긴 예약의 id가 새 예약에 다시 쓰이지 않는다.
+    """
+    if cutoff > date.today():
+        raise ValueError('보관 기준일은 오늘 이후일 수 없습니다.')
+    hot = Reservation.__table__
+    moved = 0
+    while True:
+        # ix_reservation_end_start로 기준일 이전 예약만 찾음 (앞 배치에서 옮긴 행은 이미 지워짐)
+        ids = [row[0] for row in db.session.query(Reservation.id).filter(
+            Reservation.end_date < cutoff).limit(batch_size)]
+        if not ids:
+            break
+        db.session.execute(insert(ReservationArchive.__table__).from_select(
+            list(RESERVATION_COLUMNS), select(*[hot.c[name] for name in RESERVATION_COLUMNS]).where(hot.c.id.in_(ids))))
+        Reservation.query.filter(Reservation.id.in_(ids)).delete(synchronize_session=False)
+        bump_data_version('reservation')
+        db.session.commit()
+        moved += len(ids)
+        logger.info('예약 보관', extra={'fields': {'batch': len(ids), 'moved': moved, 'cutoff': cutoff}})
+    if moved:
+        interval_indexes.invalidate()
+    return moved
+
+@bp.cli.command('archive-reservations')
+@click.option('--before', 'before', default=None, help='이 날짜(YYYY-MM-DD)보다 먼저 끝난 예약을 보관 (기본값: 오늘 - ARCHIVE_AFTER_DAYS)')
+@click.option('--batch-size', type=int, default=None, help='트랜잭션 하나에 옮길 예약 수 (기본값: ARCHIVE_BATCH_SIZE)')
+def archive_reservations_command(before, batch_size):
+    """지난 예약을 보관 테이블로 옮김 (flask archive-reservations, 주기 작업으로 실행)"""
+    cutoff = date.fromisoformat(before) if before else date.today() - timedelta(days=current_app.config['ARCHIVE_AFTER_DAYS'])
+    moved = archive_reservations(cutoff, batch_size or current_app.config['ARCHIVE_BATCH_SIZE'])
+    print(f"{cutoff} 이전에 끝난 예약 {moved}건을 보관했습니다.")
+
+# --- 사용자/장비 소프트 삭제 (SOFT_DELETE 모드) ---
+# 기본 삭제는 외래 키의 ON DELETE CASCADE로 예약 기록까지 지운다. SOFT_DELETE 모드에서는 deleted_at만 기록하고
+# 지난 예약(보관 테이블 포함)과 롤업을 남겨 통계/내보내기/캘린더에서 계속 조회되게 한다.
+# 삭제 표시된 사용자/장비는 목록과 빈 기간 검색에서 빠지고 새 예약에 쓸 수 없다.
+
+def get_active(model, obj_id):
+    """삭제 표시되지 않은 사용자/장비 (없거나 소프트 삭제되었으면 None)"""
+    return model.query.filter(model.id == obj_id, model.deleted_at.is_(None)).first()
+
+def soft_delete_owner(owner, column_name):
+    """
+    사용자/장비를 삭제 표시하고 아직 시작하지 않은 예약과 반복 규칙을 삭제 (커밋은 호출한 쪽에서)
+    column_name: 예약에서 owner를 가리키는 컬럼 ('user_id' 또는 'equipment_id')
+    반환: 예약이 삭제된 장비 ID 집합 (구간 인덱스 무효화용)
+    """
+    today = date.today()
+    column = getattr(Reservation, column_name)
+    upcoming = db.session.query(
+        Reservation.equipment_id, Reservation.user_id, Reservation.start_date, Reservation.end_date
+    ).filter(column == owner.id, Reservation.start_date >= today).all()
+    apply_reservations_to_rollups(upcoming, sign=-1)
+    # 규칙을 먼저 지우면 이미 지난 회차는 외래 키(ON DELETE SET NULL)로 단일 예약이 됨
+    delete_series_for(getattr(ReservationSeries, column_name) == owner.id)
+    Reservation.query.filter(column == owner.id, Reservation.start_date >= today).delete(synchronize_session=False)
+    owner.deleted_at = datetime.now(timezone.utc)
+    return {row[0] for row in upcoming}
+
+# --- 행 직렬화 (JOIN / 컬럼 프로젝션) ---
+# ORM 객체를 로드한 뒤 to_dict()에서 user/equipment를 지연 로딩하면 행마다 SELECT가 2번 추가된다 (N+1).
+# 필요한 컬럼만 한 번의 JOIN 쿼리로 가져와 튜플에서 바로 JSON용 dict를 만든다.
+# 목록 응답의 dict는 dict 리터럴 하나로 만들고 날짜는 date/datetime 그대로 둔다 (ISO 문자열 변환은 JSON 인코더가 담당).
+
+def reservation_rows_query(source=None):
+    """
+    예약 + 사용자/장비 이름을 한 번에 가져오는 컬럼 프로젝션 쿼리
+    source: reservation_source()의 결과 (생략하면 reservation 테이블, 필터는 source.c 컬럼으로)
+    """
+    if source is None:
+        source = Reservation.__table__
+    return db.session.query(
+        source.c.id,
+        source.c.user_id,
+        User.name,
+        source.c.equipment_id,
+        Equipment.name,
+        source.c.start_date,
+        source.c.end_date,
+        source.c.purpose,
+        source.c.created_at,
+        source.c.series_id
+    ).select_from(source
+    ).outerjoin(User, source.c.user_id == User.id
+    ).outerjoin(Equipment, source.c.equipment_id == Equipment.id)
+
+def reservation_row_to_dict(row, iso_dates=False):
+    """
+    reservation_rows_query() 결과 튜플을 Reservation.to_dict()와 같은 키의 dict로 변환
+    start_date/end_date/created_at은 date/datetime 그대로 (jsonify/json_dumps가 ISO 8601 문자열로 출력)
+    iso_dates=True면 미리 ISO 문자열로 변환
+    """
+    res_id, user_id, user_name, equipment_id, equipment_name, start_date, end_date, purpose, created_at, series_id = row
+    if iso_dates:
+        start_date, end_date, created_at = start_date.isoformat(), end_date.isoformat(), created_at.isoformat()
+    return {
+        'id': res_id,
+        'user_id': user_id,
+        'user_name': user_name,
+        'equipment_id': equipment_id,
+        'equipment_name': equipment_name,
+        'start_date': start_date,
+        'end_date': end_date,
+        'purpose': purpose,
+        'created_at': created_at,
+        'series_id': series_id
+    }
+
+def reservation_rows_to_dicts(rows):
+    """
+    목록 응답용 dict 목록. orjson 인코더면 날짜를 그대로 두고, 표준 json 인코더면
+    행마다 default 콜백을 3번 거치는 것보다 빠르도록 여기서 ISO 문자열로 바꿈
+    """
+    iso_dates = not getattr(current_app.json, 'native_dates', False)
+    return [reservation_row_to_dict(row, iso_dates) for row in rows]
+
+def equipment_rows(query):
+    """(id, name, description) 컬럼 쿼리 결과를 Equipment.to_dict()와 같은 dict 목록으로 (ORM 객체 생성 없음)"""
+    return [{'id': eq_id, 'name': name, 'description': description} for eq_id, name, description in query]
+
+def user_rows(query):
+    """(id, name) 컬럼 쿼리 결과를 User.to_dict()와 같은 dict 목록으로 (ORM 객체 생성 없음)"""
+    return [{'id': user_id, 'name': name} for user_id, name in query]
+
+def serialize_reservation(reservation_id):
+    """예약 ID 하나를 JOIN 한 번으로 직렬화 (없으면 None)"""
+    row = reservation_rows_query().filter(Reservation.id == reservation_id).first()
+    return reservation_row_to_dict(row) if row else None
+
+# --- 장비별 예약 구간 인덱스 (메모리) ---
+# 중복 검사를 매번 DB에 묻지 않도록 장비별로 시작일 정렬 배열을 앱별 메모리(AppState)에 둔다.
+# 처음 조회할 때 DB에서 읽어 오고, 예약 쓰기 경로가 커밋 후 갱신(또는 무효화)한다.
+
+class EquipmentIntervalIndex:
+    """
+    장비 하나의 예약 구간 (시작일 정렬 배열)
+    같은 장비의 예약은 서로 겹치지 않으므로(쓰기 경로가 잠금 안에서 검사) 시작일 순이면 종료일도 순서대로다.
+    그래서 조회 시작일보다 먼저 시작한 예약 중에는 바로 앞의 하나만 겹칠 수 있고, 조회는 이분 탐색 한 번이면 된다.
+    """
+
+    def __init__(self, rows):
+        # rows: (reservation_id, start_date, end_date)
+        self.entries = sorted((start, end, res_id) for res_id, start, end in rows)
+        self.starts = [start for start, _, _ in self.entries]
+        self.spans = {res_id: (start, end) for start, end, res_id in self.entries}
+
+    def add(self, res_id, start_date, end_date):
+        if res_id in self.spans:
+            self.remove(res_id)
+        pos = bisect_right(self.starts, start_date)
+        self.starts.insert(pos, start_date)
+        self.entries.insert(pos, (start_date, end_date, res_id))
+        self.spans[res_id] = (start_date, end_date)
+
+    def remove(self, res_id):
+        span = self.spans.pop(res_id, None)
+        if span is None:
+            return
+        pos = bisect_left(self.starts, span[0])
+        while self.entries[pos][2] != res_id:
+            pos += 1
+        del self.starts[pos]
+        del self.entries[pos]
+
+    def _overlapping(self, start_date, end_date):
+        """[start_date, end_date]와 겹치는 entries의 범위 (lo, hi)"""
+        lo = bisect_left(self.starts, start_date)
+        if lo and self.entries[lo - 1][1] >= start_date: # 앞에서 시작해 조회 기간까지 이어지는 예약
+            lo -= 1
+        return lo, bisect_right(self.starts, end_date, lo)
+
+    def collisions(self, start_date, end_date, exclude_id=None):
+        """[start_date, end_date]와 겹치는 예약 ID 목록 (시작일 순)"""
+        lo, hi = self._overlapping(start_date, end_date)
+        return [res_id for _, _, res_id in self.entries[lo:hi] if res_id != exclude_id]
+
+    def collides(self, start_date, end_date, exclude_id=None):
+        lo, hi = self._overlapping(start_date, end_date)
+        return any(self.entries[pos][2] != exclude_id for pos in range(lo, hi))
+
+class IntervalIndexRegistry:
+    """장비 ID별 EquipmentIntervalIndex 캐시 (지연 로딩, 스레드 안전)"""
+
+    def __init__(self):
+        self._indexes = {}
+        self._lock = threading.RLock()
+
+    def _get(self, equipment_id):
+        index = self._indexes.get(equipment_id)
+        if index is None:
+            rows = db.session.query(Reservation.id, Reservation.start_date, Reservation.end_date
+                                    ).filter(Reservation.equipment_id == equipment_id).all()
+            index = self._indexes[equipment_id] = EquipmentIntervalIndex(rows)
+        return index
+
+    def collisions(self, equipment_id, start_date, end_date, exclude_id=None):
+        with self._lock:
+            return self._get(equipment_id).collisions(start_date, end_date, exclude_id)
+
+    def collides(self, equipment_id, start_date, end_date, exclude_id=None):
+        with self._lock:
+            return self._get(equipment_id).collides(start_date, end_date, exclude_id)
+
+    def reservation_added(self, equipment_id, res_id, start_date, end_date):
+        """커밋된 예약 추가 반영 (아직 로드되지 않은 장비는 다음 조회 때 DB에서 읽음)"""
+        with self._lock:
+            index = self._indexes.get(equipment_id)
+            if index is not None:
+                index.add(res_id, start_date, end_date)
+
+    def reservation_removed(self, equipment_id, res_id):
+        with self._lock:
+            index = self._indexes.get(equipment_id)
+            if index is not None:
+                index.remove(res_id)
+
+    def invalidate(self, equipment_ids=None):
+        """지정한 장비(없으면 전체)의 인덱스를 버림"""
+        with self._lock:
+            if equipment_ids is None:
+                self._indexes.clear()
+            else:
+                for equipment_id in equipment_ids:
+                    self._indexes.pop(equipment_id, None)
+
+interval_indexes = LocalProxy(app_state, 'interval_indexes')
+
+# --- 변경 피드 (Server-Sent Events) ---
+class ChangeFeed:
+    """
+    쓰기 핸들러가 커밋 직후 발행하는 변경 내역(delta)의 메모리 링 버퍼
+    이벤트마다 단조 증가하는 seq를 붙이고, SSE 구독자는 마지막으로 받은 seq 이후 이벤트를 기다렸다가 읽는다.
+    epoch는 피드(앱)마다 달라서, 서버 재시작 전의 seq로 재개하려는 클라이언트를 알아볼 수 있다.
+    """
+
+    def __init__(self, maxlen=1000):
+        self.epoch = uuid.uuid4().hex[:8]
+        self._events = deque(maxlen=maxlen)
+        self._seq = 0
+        self._cond = threading.Condition()
+        self.subscribers = 0
+
+    @property
+    def last_seq(self):
+        with self._cond:
+            return self._seq
+
+    def publish(self, entity, op, data, equipment_ids=()):
+        self.publish_many([(entity, op, data, equipment_ids)])
+
+    def publish_many(self, changes):
+        """changes: (entity, op, data, equipment_ids) 목록. equipment_ids가 비어 있으면 모든 구독자에게 전달"""
+        if not changes:
+            return
+        with self._cond:
+            for entity, op, data, equipment_ids in changes:
+                self._seq += 1
+                self._events.append((self._seq, entity, op, data, frozenset(equipment_ids)))
+            self._cond.notify_all()
+
+    def read_since(self, seq, timeout):
+        """
+        seq 이후의 이벤트 목록 반환 (없으면 timeout초 동안 기다림)
+        요청한 구간이 이미 버퍼에서 밀려났으면 None (클라이언트가 전체를 다시 받아야 함)
+        """
+        with self._cond:
+            if self._seq <= seq:
+                self._cond.wait(timeout)
+            oldest = self._seq - len(self._events) + 1
+            if seq > self._seq or seq < oldest - 1:
+                return None
+            return list(self._events)[len(self._events) - (self._seq - seq):]
+
+    def subscribe(self, max_subscribers):
+        """구독자 자리 확보 (가득 차면 False)"""
+        with self._cond:
+            if self.subscribers >= max_subscribers:
+                return False
+            self.subscribers += 1
+            return True
+
+    def unsubscribe(self):
+        with self._cond:
+            self.subscribers -= 1
+
+change_feed = LocalProxy(app_state, 'change_feed')
+
+# --- 커서(keyset) 페이지네이션 ---
+# limit 또는 cursor 파라미터가 있을 때만 페이지 단위로 응답한다 (없으면 기존처럼 전체 목록).
+# 커서는 마지막 행의 정렬 키를 담은 불투명 문자열이고, 다음 페이지는 OFFSET 없이
+# 정렬 키 인덱스에서 "키 > 커서" 위치부터 limit+1 행만 읽는다.
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(token, types):
+    """커서를 정렬 키 튜플로 복원. types는 각 키를 변환할 함수 목록 (예: (date.fromisoformat, int))"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError
+        return tuple(convert(value) for convert, value in zip(types, values))
+    except (ValueError, TypeError):
+        raise ValueError('cursor 형식이 잘못되었습니다.')
+
+def parse_page_args(cursor_types):
+    """
+    limit/cursor 쿼리 파라미터 파싱
+    반환: ((limit, cursor_key), None) / (None, None) (페이지네이션 요청 아님) / (None, 에러 응답)
+    """
+    limit_str = request.args.get('limit')
+    token = request.args.get('cursor')
+    if limit_str is None and token is None:
+        return None, None
+    try:
+        limit = int(limit_str) if limit_str is not None else DEFAULT_PAGE_SIZE
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError
+    except ValueError:
+        return None, (jsonify({'message': f'limit은 1~{MAX_PAGE_SIZE} 사이의 정수여야 합니다.'}), 400)
+    try:
+        cursor_key = decode_cursor(token, cursor_types) if token else None
+    except ValueError as e:
+        return None, (jsonify({'message': str(e)}), 400)
+    return (limit, cursor_key), None
+
+def page_response(items, limit, last_key):
+    """limit+1 행을 읽은 결과로 페이지 응답 생성 (남는 행이 있으면 next_cursor 포함)"""
+    has_more = len(items) > limit
+    return jsonify({
+        'items': items[:limit],
+        'next_cursor': encode_cursor(last_key(items[limit - 1])) if has_more else None
+    })
+
 # 정적 파일 제공 루트 (클라이언트에서 직접 액세스 가능)
-@app.route('/')
+@bp.route('/')
 def index():
     return send_from_directory(os.getcwd(), 'index.html')
 
-@app.route('/<path:path>')
+@bp.route('/<path:path>')
 def serve_static(path):
     return send_from_directory(os.getcwd(), path)
 
 # --- API 엔드포인트 (라우트) 정의 ---
 
 # 테스트용 루트 추가
-@app.route('/api/test', methods=['GET'])
+@bp.route('/api/test', methods=['GET'])
 def test_api():
     """테스트용 API 엔드포인트"""
     return jsonify({
@@ -93,35 +1368,66 @@ def test_api():
     })
 
 # == 장비 관리 ==
-@app.route('/api/equipment', methods=['GET'])
+@bp.route('/api/equipment', methods=['GET'])
+@conditional_get('equipment')
 def get_equipment_list():
-    """모든 장비 목록 반환"""
-    equipments = Equipment.query.all()
-    return jsonify([eq.to_dict() for eq in equipments])
-
-@app.route('/api/equipment', methods=['POST'])
+    """
+    모든 장비 목록 반환
+    Query Parameters (선택, 지정하면 {items, next_cursor} 페이지 응답):
+    - limit (integer): 페이지 크기 (기본 100, 최대 500)
+    - cursor (string): 이전 페이지의 next_cursor
+    """
+    page, error = parse_page_args((int,))
+    if error:
+        return error
+    query = db.session.query(Equipment.id, Equipment.name, Equipment.description).filter(Equipment.deleted_at.is_(None))
+    if page is None:
+        return jsonify(equipment_rows(query))
+
+    limit, cursor_key = page
+    if cursor_key:
+        query = query.filter(Equipment.id > cursor_key[0])
+    items = equipment_rows(query.order_by(Equipment.id).limit(limit + 1))
+    return page_response(items, limit, lambda item: [item['id']])
+
+@bp.route('/api/equipment', methods=['POST'])
+@retry_on_locked
 def add_equipment():
     """새 장비 추가"""
     data = request.get_json()
     if not data or not 'name' in data:
         return jsonify({'message': '장비 이름(name)은 필수입니다.'}), 400
 
-    if Equipment.query.filter_by(name=data['name']).first():
+    new_equipment = Equipment.query.filter_by(name=data['name']).first()
+    if new_equipment is None:
+        new_equipment = Equipment(name=data['name'], description=data.get('description'))
+        db.session.add(new_equipment)
+    elif new_equipment.deleted_at is None:
         return jsonify({'message': '이미 존재하는 장비 이름입니다.'}), 409 # Conflict
-
-    new_equipment = Equipment(name=data['name'], description=data.get('description'))
-    db.session.add(new_equipment)
+    else: # 소프트 삭제된 같은 이름의 장비는 되살림 (지난 예약 기록이 다시 연결됨)
+        new_equipment.deleted_at = None
+        new_equipment.description = data.get('description')
     try:
+        bump_data_version('equipment')
         db.session.commit()
-        return jsonify(new_equipment.to_dict()), 201 # Created
+        result = new_equipment.to_dict()
+        change_feed.publish('equipment', 'insert', result, [result['id']])
+        return jsonify(result), 201 # Created
     except Exception as e:
         db.session.rollback()
+        logger.exception('장비 추가 중 오류 발생')
         return jsonify({'message': '장비 추가 중 오류 발생', 'error': str(e)}), 500
 
-@app.route('/api/equipment/<int:id>', methods=['DELETE'])
+@bp.route('/api/equipment/<int:id>', methods=['DELETE'])
+@retry_on_locked
 def delete_equipment(id):
-    """특정 장비 삭제 (연관된 예약도 함께 삭제됨 - cascade 설정)"""
-    equipment = Equipment.query.get(id)
+    """
+    특정 장비 삭제
+    - 기본: 장비 행만 지우면 예약/반복 규칙/보관된 예약은 외래 키의 ON DELETE CASCADE로 DB가 함께 삭제
+    - SOFT_DELETE 모드: 삭제 표시만 하고 시작 전 예약과 반복 규칙만 삭제 (지난 예약은 통계용으로 남음)
+    """
+    soft = current_app.config['SOFT_DELETE']
+    equipment = get_active(Equipment, id) if soft else db.session.get(Equipment, id)
     if equipment is None:
         return jsonify({'message': '해당 ID의 장비를 찾을 수 없습니다.'}), 404 # Not Found
 
@@ -129,45 +1435,85 @@ def delete_equipment(id):
     # if equipment.reservations:
     #    return jsonify({'message': '해당 장비에 예약이 존재하여 삭제할 수 없습니다.'}), 409 # Conflict
 
-    db.session.delete(equipment)
     try:
+        if soft:
+            soft_delete_owner(equipment, 'equipment_id')
+        else:
+            # 장비의 예약이 모두 삭제되므로 롤업 행도 함께 제거
+            UserMonthlyUsage.query.filter_by(equipment_id=id).delete(synchronize_session=False)
+            UserDailyUsage.query.filter_by(equipment_id=id).delete(synchronize_session=False)
+            db.session.delete(equipment)
+        bump_data_version('equipment', 'reservation')
         db.session.commit()
+        interval_indexes.invalidate([id])
+        # 기본 모드면 장비의 예약도 함께 삭제되었음을 뜻함 (클라이언트가 해당 장비 예약을 지움)
+        # soft=True면 지난 예약은 남아 있으므로 클라이언트가 현재 범위를 다시 조회
+        change_feed.publish('equipment', 'delete', {'id': id, 'soft': soft}, [id])
         return jsonify({'message': f'장비 ID {id} 삭제 완료'}), 200 # OK (또는 204 No Content)
     except Exception as e:
         db.session.rollback()
+        logger.exception('장비 삭제 중 오류 발생')
         return jsonify({'message': '장비 삭제 중 오류 발생', 'error': str(e)}), 500
 
 
 # == 사용자 관리 ==
-@app.route('/api/users', methods=['GET'])
+@bp.route('/api/users', methods=['GET'])
+@conditional_get('user')
 def get_user_list():
-    """모든 사용자 목록 반환"""
-    users = User.query.all()
-    return jsonify([user.to_dict() for user in users])
-
-@app.route('/api/users', methods=['POST'])
+    """
+    모든 사용자 목록 반환
+    Query Parameters (선택): limit, cursor (장비 목록과 같음, id 순)
+    """
+    page, error = parse_page_args((int,))
+    if error:
+        return error
+    query = db.session.query(User.id, User.name).filter(User.deleted_at.is_(None))
+    if page is None:
+        return jsonify(user_rows(query))
+
+    limit, cursor_key = page
+    if cursor_key:
+        query = query.filter(User.id > cursor_key[0])
+    items = user_rows(query.order_by(User.id).limit(limit + 1))
+    return page_response(items, limit, lambda item: [item['id']])
+
+@bp.route('/api/users', methods=['POST'])
+@retry_on_locked
 def add_user():
     """새 사용자 추가"""
     data = request.get_json()
     if not data or not 'name' in data:
         return jsonify({'message': '사용자 이름(name)은 필수입니다.'}), 400
 
-    if User.query.filter_by(name=data['name']).first():
+    new_user = User.query.filter_by(name=data['name']).first()
+    if new_user is None:
+        new_user = User(name=data['name'])
+        db.session.add(new_user)
+    elif new_user.deleted_at is None:
         return jsonify({'message': '이미 존재하는 사용자 이름입니다.'}), 409
-
-    new_user = User(name=data['name'])
-    db.session.add(new_user)
+    else: # 소프트 삭제된 같은 이름의 사용자는 되살림
+        new_user.deleted_at = None
     try:
+        bump_data_version('user')
         db.session.commit()
-        return jsonify(new_user.to_dict()), 201
+        result = new_user.to_dict()
+        change_feed.publish('user', 'insert', result)
+        return jsonify(result), 201
     except Exception as e:
         db.session.rollback()
+        logger.exception('사용자 추가 중 오류 발생')
         return jsonify({'message': '사용자 추가 중 오류 발생', 'error': str(e)}), 500
 
-@app.route('/api/users/<int:id>', methods=['DELETE'])
+@bp.route('/api/users/<int:id>', methods=['DELETE'])
+@retry_on_locked
 def delete_user(id):
-    """특정 사용자 삭제 (연관된 예약도 함께 삭제됨 - cascade 설정)"""
-    user = User.query.get(id)
+    """
+    특정 사용자 삭제
+    - 기본: 예약/반복 규칙/보관된 예약은 외래 키의 ON DELETE CASCADE로 DB가 함께 삭제
+    - SOFT_DELETE 모드: 삭제 표시만 하고 시작 전 예약과 반복 규칙만 삭제 (장비 삭제와 같음)
+    """
+    soft = current_app.config['SOFT_DELETE']
+    user = get_active(User, id) if soft else db.session.get(User, id)
     if user is None:
         return jsonify({'message': '해당 ID의 사용자를 찾을 수 없습니다.'}), 404
 
@@ -175,17 +1521,33 @@ def delete_user(id):
     # if user.reservations:
     #     return jsonify({'message': '해당 사용자에게 예약이 존재하여 삭제할 수 없습니다.'}), 409
 
-    db.session.delete(user)
     try:
+        if soft:
+            equipment_ids = soft_delete_owner(user, 'user_id')
+        else:
+            # 구간 인덱스를 무효화할 장비 (보관된 예약은 인덱스에 없으므로 현재 예약만)
+            equipment_ids = db.session.scalars(
+                select(Reservation.equipment_id).where(Reservation.user_id == id).distinct()
+            ).all()
+            # 사용자의 예약이 모두 삭제되므로 롤업 행도 함께 제거
+            UserMonthlyUsage.query.filter_by(user_id=id).delete(synchronize_session=False)
+            UserDailyUsage.query.filter_by(user_id=id).delete(synchronize_session=False)
+            db.session.delete(user)
+        bump_data_version('user', 'reservation')
         db.session.commit()
+        interval_indexes.invalidate(equipment_ids)
+        # 기본 모드면 사용자의 예약도 함께 삭제되었음을 뜻함 (클라이언트가 해당 사용자 예약을 지움)
+        change_feed.publish('user', 'delete', {'id': id, 'soft': soft})
         return jsonify({'message': f'사용자 ID {id} 삭제 완료'}), 200
     except Exception as e:
         db.session.rollback()
+        logger.exception('사용자 삭제 중 오류 발생')
         return jsonify({'message': '사용자 삭제 중 오류 발생', 'error': str(e)}), 500
 
 
 # == 예약 관리 ==
-@app.route('/api/reservations', methods=['GET'])
+@bp.route('/api/reservations', methods=['GET'])
+@conditional_get('reservation', 'user', 'equipment')
 def get_reservations():
     """
     예약 목록 조회 (필터링 가능)
@@ -194,31 +1556,41 @@ def get_reservations():
     - end (ISO format, e.g., 2023-11-28): 조회 종료 날짜 (exclusive, for FullCalendar's view range)
     - equipment_id (integer): 특정 장비 ID
     - user_id (integer): 특정 사용자 ID
+    - limit, cursor (선택): 지정하면 (start_date, id) 순서의 {items, next_cursor} 페이지 응답
+      (FullCalendar는 지정하지 않으므로 기존처럼 전체 목록을 받음)
     """
-    query = Reservation.query
+    page, error = parse_page_args((date.fromisoformat, int))
+    if error:
+        return error
 
     # 날짜 필터링 (start와 end 사이에 있는 예약을 찾음)
     start_str = request.args.get('start')
     end_str = request.args.get('end')
+    view_start_date = view_end_date = None
     if start_str and end_str:
         try:
             # Parse date strings (YYYY-MM-DD)
             # Parse date strings from FullCalendar (start is inclusive, end is exclusive)
             view_start_date = date.fromisoformat(start_str)
             view_end_date = date.fromisoformat(end_str)
-            print(f"Received view date range: {view_start_date} to {view_end_date}")
-            # Find reservations that *overlap* with the view range
-            # Overlap condition: (res_start < view_end) and (res_end >= view_start)
-            # Note: res_end is inclusive in DB, view_end is exclusive from FullCalendar
-            query = query.filter(Reservation.start_date < view_end_date, Reservation.end_date >= view_start_date)
+            logger.debug('조회 범위', extra={'fields': {'start': view_start_date, 'end': view_end_date}})
         except ValueError:
             return jsonify({'message': '날짜 형식이 잘못되었습니다. YYYY-MM-DD 형식을 사용해주세요.'}), 400
 
+    # 최근 기간이면 reservation 테이블만, 보관된 구간까지 보는 경우에만 보관 테이블을 합침
+    source = reservation_source(view_start_date)
+    query = reservation_rows_query(source)
+    if view_start_date:
+        # Find reservations that *overlap* with the view range
+        # Overlap condition: (res_start < view_end) and (res_end >= view_start)
+        # Note: res_end is inclusive in DB, view_end is exclusive from FullCalendar
+        query = query.filter(source.c.start_date < view_end_date, source.c.end_date >= view_start_date)
+
     # 장비 필터링
     equipment_id = request.args.get('equipment_id')
     if equipment_id:
         try:
-            query = query.filter(Reservation.equipment_id == int(equipment_id))
+            query = query.filter(source.c.equipment_id == int(equipment_id))
         except ValueError:
              return jsonify({'message': 'equipment_id는 정수여야 합니다.'}), 400
 
@@ -226,14 +1598,24 @@ def get_reservations():
     user_id = request.args.get('user_id')
     if user_id:
         try:
-            query = query.filter(Reservation.user_id == int(user_id))
+            query = query.filter(source.c.user_id == int(user_id))
         except ValueError:
             return jsonify({'message': 'user_id는 정수여야 합니다.'}), 400
 
-    reservations = query.order_by(Reservation.start_date).all() # Order by start date
-    return jsonify([res.to_dict() for res in reservations])
+    if page is None:
+        rows = query.order_by(source.c.start_date).all() # Order by start date
+        return jsonify(reservation_rows_to_dicts(rows))
+
+    limit, cursor_key = page
+    if cursor_key:
+        query = query.filter(tuple_(source.c.start_date, source.c.id) > tuple_(*cursor_key))
+    rows = query.order_by(source.c.start_date, source.c.id).limit(limit + 1).all()
+    return page_response(reservation_rows_to_dicts(rows), limit,
+                         lambda item: [str(item['start_date']), item['id']]) # date 또는 ISO 문자열
 
-@app.route('/api/reservations', methods=['POST'])
+@bp.route('/api/reservations', methods=['POST'])
+@idempotent
+@retry_on_locked
 def add_reservation():
     """새 예약 추가 (날짜 범위 중복 검사 포함)"""
     data = request.get_json()
@@ -248,7 +1630,6 @@ def add_reservation():
         # Parse date strings (YYYY-MM-DD)
         start_date = date.fromisoformat(data['start_date'])
         end_date = date.fromisoformat(data['end_date']) # Inclusive end date
-        print(f"Adding reservation from {start_date} to {end_date}")
         purpose = data.get('purpose')
     except (ValueError, TypeError) as e:
         return jsonify({'message': '입력 데이터 형식이 잘못되었습니다. 날짜는 YYYY-MM-DD 형식이어야 합니다.', 'error': str(e)}), 400
@@ -259,52 +1640,211 @@ def add_reservation():
     if start_date < date.today():
          return jsonify({'message': '과거 날짜로 예약할 수 없습니다.'}), 400 # 선택사항
 
-    # 사용자 및 장비 존재 여부 확인
-    if not User.query.get(user_id):
-        return jsonify({'message': f'사용자 ID {user_id}를 찾을 수 없습니다.'}), 404
-    if not Equipment.query.get(equipment_id):
-        return jsonify({'message': f'장비 ID {equipment_id}를 찾을 수 없습니다.'}), 404
-
-    # 날짜 범위 중복 검사 (같은 장비에 대해 겹치는 예약이 있는지 확인)
-    # Overlap condition: (new_start <= existing_end) and (new_end >= existing_start)
-    overlapping_reservations = Reservation.query.filter(
-        Reservation.equipment_id == equipment_id,
-        Reservation.start_date <= end_date,
-        Reservation.end_date >= start_date
-    ).first() # 하나라도 있으면 중복
-
-    if overlapping_reservations:
-        return jsonify({
-            'message': '선택한 시간에 해당 장비의 예약이 이미 존재합니다.',
-            'conflict_reservation': overlapping_reservations.to_dict() # 어떤 예약과 충돌하는지 정보 제공 (선택사항)
-        }), 409 # Conflict
-
-    # 예약 생성
-    new_reservation = Reservation(
-        user_id=user_id,
-        equipment_id=equipment_id,
-        start_date=start_date,
-        end_date=end_date,
-        purpose=purpose
-    )
-    db.session.add(new_reservation)
+    # 같은 장비에 대한 검사~커밋~인덱스 갱신을 직렬화 (DB 트랜잭션이 시작되기 전에 잠금)
+    with equipment_locks.hold(equipment_id):
+        # 사용자 및 장비 존재 여부 확인
+        if not get_active(User, user_id):
+            return jsonify({'message': f'사용자 ID {user_id}를 찾을 수 없습니다.'}), 404
+        if not get_active(Equipment, equipment_id):
+            return jsonify({'message': f'장비 ID {equipment_id}를 찾을 수 없습니다.'}), 404
+
+        # 날짜 범위 중복 검사 (같은 장비에 대해 겹치는 예약이 있는지 확인)
+        # Overlap condition: (new_start <= existing_end) and (new_end >= existing_start)
+        # 장비별 메모리 구간 인덱스로 검사
+        conflict_ids = interval_indexes.collisions(equipment_id, start_date, end_date)
+
+        if conflict_ids:
+            return jsonify({
+                'message': '선택한 시간에 해당 장비의 예약이 이미 존재합니다.',
+                'conflict_reservation': serialize_reservation(conflict_ids[0]) # 어떤 예약과 충돌하는지 정보 제공 (선택사항)
+            }), 409 # Conflict
+
+        # 예약 생성
+        new_reservation = Reservation(
+            user_id=user_id,
+            equipment_id=equipment_id,
+            start_date=start_date,
+            end_date=end_date,
+            purpose=purpose
+        )
+        db.session.add(new_reservation)
+        try:
+            apply_reservations_to_rollups([(equipment_id, user_id, start_date, end_date)])
+            bump_data_version('reservation')
+            db.session.commit()
+            interval_indexes.reservation_added(equipment_id, new_reservation.id, start_date, end_date)
+            result = serialize_reservation(new_reservation.id)
+            logger.info('예약 추가', extra={'fields': {'reservation_id': new_reservation.id, 'equipment_id': equipment_id,
+                                                   'start': start_date, 'end': end_date}})
+            change_feed.publish('reservation', 'insert', result, [equipment_id])
+            return jsonify(result), 201
+        except Exception as e:
+            db.session.rollback()
+            # 예외 메시지를 더 자세히 로깅하고, 클라이언트에게 반환
+            error_message = str(e.__cause__ or e)
+            logger.exception('예약 추가 중 오류 발생', extra={'fields': {'user_id': user_id, 'equipment_id': equipment_id}})
+            return jsonify({'message': '예약 추가 중 오류 발생', 'error': error_message}), 500
+
+MAX_BATCH_SIZE = 1000 # 배치 요청 한 번에 받을 수 있는 최대 예약 수
+
+def parse_reservation_item(data):
+    """
+    예약 입력 하나를 검증/변환
+    성공하면 (값 dict, None), 실패하면 (None, (메시지, HTTP 상태 코드))
+    """
+    required_fields = ['user_id', 'equipment_id', 'start_date', 'end_date']
+    if not isinstance(data, dict) or not all(field in data for field in required_fields):
+        return None, (f'필수 필드가 누락되었습니다: {required_fields}', 400)
     try:
-        db.session.commit()
-        return jsonify(new_reservation.to_dict()), 201
-    except Exception as e:
-        db.session.rollback()
-        # 예외 메시지를 더 자세히 로깅하고, 클라이언트에게 반환
-        error_message = str(e.__cause__ or e)
-        print(f"예약 추가 중 오류 발생: {error_message}")
-        return jsonify({'message': '예약 추가 중 오류 발생', 'error': error_message}), 500
+        item = {
+            'user_id': int(data['user_id']),
+            'equipment_id': int(data['equipment_id']),
+            'start_date': date.fromisoformat(data['start_date']),
+            'end_date': date.fromisoformat(data['end_date']), # Inclusive end date
+            'purpose': data.get('purpose')
+        }
+    except (ValueError, TypeError):
+        return None, ('입력 데이터 형식이 잘못되었습니다. 날짜는 YYYY-MM-DD 형식이어야 합니다.', 400)
+    if item['start_date'] > item['end_date']:
+        return None, ('시작 날짜는 종료 날짜보다 빠르거나 같아야 합니다.', 400)
+    if item['start_date'] < date.today():
+        return None, ('과거 날짜로 예약할 수 없습니다.', 400)
+    return item, None
+
+@bp.route('/api/reservations/batch', methods=['POST'])
+@idempotent
+@retry_on_locked
+def add_reservations_batch():
+    """
+    여러 예약을 한 번에 추가 (학기 일정 가져오기 등)
+    Request Body:
+    - reservations (list): 단일 예약 POST와 같은 형식의 항목 목록
+    - mode (string): 'all_or_nothing'(기본값, 하나라도 실패하면 아무것도 저장하지 않음)
+                     또는 'best_effort'(성공한 항목만 저장하고 항목별 결과 반환)
+    배치 안에서 서로 겹치는 항목은 시작일이 빠른 항목(같으면 먼저 온 항목)이 우선한다.
+    """
+    data = request.get_json()
+    items = data.get('reservations') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({'message': '예약 목록(reservations)은 필수입니다.'}), 400
+    if len(items) > MAX_BATCH_SIZE:
+        return jsonify({'message': f'한 번에 최대 {MAX_BATCH_SIZE}건까지 추가할 수 있습니다.'}), 400
+    mode = data.get('mode', 'all_or_nothing')
+    if mode not in ('all_or_nothing', 'best_effort'):
+        return jsonify({'message': "mode는 'all_or_nothing' 또는 'best_effort'여야 합니다."}), 400
+
+    results = [None] * len(items)
+    parsed = {}
+    for i, raw in enumerate(items):
+        item, error = parse_reservation_item(raw)
+        if error:
+            results[i] = {'index': i, 'status': 'error', 'status_code': error[1], 'message': error[0]}
+        else:
+            parsed[i] = item
+
+    # 배치가 건드리는 장비를 모두 잠근 뒤 검사~커밋 (DB 트랜잭션이 시작되기 전에 잠금)
+    with equipment_locks.hold(*{item['equipment_id'] for item in parsed.values()}):
+        # 참조하는 사용자/장비를 IN 쿼리 한 번씩으로 확인
+        user_ids = {item['user_id'] for item in parsed.values()}
+        equipment_ids = {item['equipment_id'] for item in parsed.values()}
+        known_users = {row[0] for row in db.session.query(User.id).filter(
+            User.id.in_(user_ids), User.deleted_at.is_(None))} if user_ids else set()
+        known_equipment = {row[0] for row in db.session.query(Equipment.id).filter(
+            Equipment.id.in_(equipment_ids), Equipment.deleted_at.is_(None))} if equipment_ids else set()
+        for i, item in list(parsed.items()):
+            if item['user_id'] not in known_users:
+                message = f"사용자 ID {item['user_id']}를 찾을 수 없습니다."
+            elif item['equipment_id'] not in known_equipment:
+                message = f"장비 ID {item['equipment_id']}를 찾을 수 없습니다."
+            else:
+                continue
+            results[i] = {'index': i, 'status': 'error', 'status_code': 404, 'message': message}
+            del parsed[i]
+
+        # 충돌 검사: 배치 기간에 걸친 기존 예약을 한 번에 읽은 뒤 장비별로 정렬-스윕
+        by_equipment = {}
+        for i, item in parsed.items():
+            by_equipment.setdefault(item['equipment_id'], []).append(i)
+        existing_rows = {}
+        if parsed:
+            batch_start = min(item['start_date'] for item in parsed.values())
+            batch_end = max(item['end_date'] for item in parsed.values())
+            for eq_id, res_id, start, end in db.session.query(
+                    Reservation.equipment_id, Reservation.id, Reservation.start_date, Reservation.end_date
+            ).filter(
+                Reservation.equipment_id.in_(by_equipment.keys()),
+                Reservation.start_date <= batch_end,
+                Reservation.end_date >= batch_start
+            ):
+                existing_rows.setdefault(eq_id, []).append((res_id, start, end))
+
+        for eq_id, indices in by_equipment.items():
+            existing = EquipmentIntervalIndex(existing_rows.get(eq_id, []))
+            accepted_end = None
+            accepted_index = None
+            for i in sorted(indices, key=lambda i: (parsed[i]['start_date'], i)):
+                item = parsed[i]
+                conflict_ids = existing.collisions(item['start_date'], item['end_date'])
+                if conflict_ids:
+                    results[i] = {'index': i, 'status': 'error', 'status_code': 409,
+                                  'message': '선택한 시간에 해당 장비의 예약이 이미 존재합니다.',
+                                  'conflict_reservation_id': conflict_ids[0]}
+                elif accepted_end is not None and accepted_end >= item['start_date']:
+                    results[i] = {'index': i, 'status': 'error', 'status_code': 409,
+                                  'message': '배치 안의 다른 예약과 기간이 겹칩니다.',
+                                  'conflict_index': accepted_index}
+                else:
+                    accepted_end, accepted_index = item['end_date'], i
+                    continue
+                del parsed[i]
+
+        failed = len(items) - len(parsed)
+        if mode == 'all_or_nothing' and failed:
+            errors = [result for result in results if result is not None]
+            status_code = 400 if any(result['status_code'] != 409 for result in errors) else 409
+            return jsonify({
+                'message': f'{failed}건의 예약에 문제가 있어 아무것도 저장하지 않았습니다.',
+                'created': 0,
+                'failed': failed,
+                'results': errors
+            }), status_code
+
+        # 하나의 트랜잭션으로 저장
+        new_reservations = {i: Reservation(**item) for i, item in parsed.items()}
+        try:
+            db.session.add_all(new_reservations.values())
+            db.session.flush() # INSERT ... RETURNING으로 ID를 받아 둠 (커밋 후에 읽으면 객체마다 다시 SELECT)
+            created_ids = {i: res.id for i, res in new_reservations.items()}
+            apply_reservations_to_rollups([(item['equipment_id'], item['user_id'], item['start_date'], item['end_date'])
+                                           for item in parsed.values()])
+            bump_data_version('reservation')
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.exception('예약 일괄 추가 중 오류 발생')
+            return jsonify({'message': '예약 일괄 추가 중 오류 발생', 'error': str(e)}), 500
+
+        for i, res_id in created_ids.items():
+            item = parsed[i]
+            interval_indexes.reservation_added(item['equipment_id'], res_id, item['start_date'], item['end_date'])
+        rows = {row[0]: row for row in reservation_rows_query().filter(Reservation.id.in_(created_ids.values()))} if created_ids else {}
+        for i, res_id in created_ids.items():
+            results[i] = {'index': i, 'status': 'created', 'status_code': 201,
+                          'reservation': reservation_row_to_dict(rows[res_id])}
+        change_feed.publish_many([('reservation', 'insert', results[i]['reservation'], [results[i]['reservation']['equipment_id']])
+                                  for i in created_ids])
 
-@app.route('/api/reservations/<int:id>', methods=['PUT'])
+        return jsonify({
+            'created': len(created_ids),
+            'failed': failed,
+            'results': results
+        }), 201 if not failed else 200
+
+@bp.route('/api/reservations/<int:id>', methods=['PUT'])
+@idempotent
+@retry_on_locked
 def update_reservation(id):
     """특정 예약 수정 (날짜 범위 중복 검사 포함)"""
-    reservation = Reservation.query.get(id)
-    if reservation is None:
-        return jsonify({'message': '해당 ID의 예약을 찾을 수 없습니다.'}), 404
-
     data = request.get_json()
     # Required fields for date range
     required_fields = ['user_id', 'equipment_id', 'start_date', 'end_date']
@@ -317,7 +1857,6 @@ def update_reservation(id):
         # Parse date strings
         start_date = date.fromisoformat(data['start_date'])
         end_date = date.fromisoformat(data['end_date'])
-        print(f"Updating reservation from {start_date} to {end_date}")
         purpose = data.get('purpose')
     except (ValueError, TypeError) as e:
         return jsonify({'message': '입력 데이터 형식이 잘못되었습니다. 날짜는 YYYY-MM-DD 형식이어야 합니다.', 'error': str(e)}), 400
@@ -328,69 +1867,780 @@ def update_reservation(id):
     if start_date < date.today():
          return jsonify({'message': '과거 날짜로 예약할 수 없습니다.'}), 400 # 선택사항
 
-    # 사용자 및 장비 존재 여부 확인
-    if not User.query.get(user_id):
-        return jsonify({'message': f'사용자 ID {user_id}를 찾을 수 없습니다.'}), 404
-    if not Equipment.query.get(equipment_id):
-        return jsonify({'message': f'장비 ID {equipment_id}를 찾을 수 없습니다.'}), 404
+    # 같은 장비에 대한 검사~커밋~인덱스 갱신을 직렬화 (DB 트랜잭션이 시작되기 전에 잠금)
+    with equipment_locks.hold(equipment_id):
+        reservation = Reservation.query.get(id)
+        if reservation is None:
+            return jsonify({'message': '해당 ID의 예약을 찾을 수 없습니다.'}), 404
+
+        # 사용자 및 장비 존재 여부 확인
+        if not get_active(User, user_id):
+            return jsonify({'message': f'사용자 ID {user_id}를 찾을 수 없습니다.'}), 404
+        if not get_active(Equipment, equipment_id):
+            return jsonify({'message': f'장비 ID {equipment_id}를 찾을 수 없습니다.'}), 404
+
+        # 날짜 범위 중복 검사 (같은 장비에 대해 겹치는 다른 예약이 있는지 확인)
+        # Overlap condition: (new_start <= existing_end) and (new_end >= existing_start)
+        conflict_ids = interval_indexes.collisions(equipment_id, start_date, end_date, exclude_id=id)  # 현재 수정 중인 예약은 제외
+
+        if conflict_ids:
+            return jsonify({
+                'message': '선택한 시간에 해당 장비의 예약이 이미 존재합니다.',
+                'conflict_reservation': serialize_reservation(conflict_ids[0])
+            }), 409
+
+        # 예약 수정 (롤업에서 기존 기간을 빼고 새 기간을 더함)
+        old_row = (reservation.equipment_id, reservation.user_id, reservation.start_date, reservation.end_date)
+        reservation.user_id = user_id
+        reservation.equipment_id = equipment_id
+        reservation.start_date = start_date
+        reservation.end_date = end_date
+        reservation.purpose = purpose
 
-    # 날짜 범위 중복 검사 (같은 장비에 대해 겹치는 다른 예약이 있는지 확인)
-    # Overlap condition: (new_start <= existing_end) and (new_end >= existing_start)
-    overlapping_reservations = Reservation.query.filter(
+        try:
+            apply_reservations_to_rollups([old_row], sign=-1)
+            apply_reservations_to_rollups([(equipment_id, user_id, start_date, end_date)])
+            bump_data_version('reservation')
+            db.session.commit()
+            interval_indexes.reservation_removed(old_row[0], id)
+            interval_indexes.reservation_added(equipment_id, id, start_date, end_date)
+            result = serialize_reservation(id)
+            logger.info('예약 수정', extra={'fields': {'reservation_id': id, 'equipment_id': equipment_id,
+                                                   'start': start_date, 'end': end_date}})
+            # 다른 장비로 옮긴 경우 이전 장비 구독자도 받도록 두 장비 모두 지정
+            change_feed.publish('reservation', 'update', result, {old_row[0], equipment_id})
+            return jsonify(result), 200
+        except Exception as e:
+            db.session.rollback()
+            logger.exception('예약 수정 중 오류 발생')
+            return jsonify({'message': '예약 수정 중 오류 발생', 'error': str(e)}), 500
+
+@bp.route('/api/reservations/<int:id>', methods=['DELETE'])
+@idempotent
+@retry_on_locked
+def delete_reservation(id):
+    """특정 예약 삭제 (보관된 지난 예약도 삭제 가능)"""
+    while True:
+        # 삭제~구간 인덱스 갱신을 같은 장비의 검사~커밋과 직렬화 (보관된 예약은 인덱스에 없어 잠그지 않음)
+        with read_before_write_lock():
+            equipment_id = db.session.scalar(select(Reservation.equipment_id).where(Reservation.id == id))
+        with equipment_locks.hold(*([equipment_id] if equipment_id is not None else [])):
+            reservation = Reservation.query.get(id) or ReservationArchive.query.get(id)
+            if reservation is None:
+                return jsonify({'message': '해당 ID의 예약을 찾을 수 없습니다.'}), 404
+            if isinstance(reservation, Reservation) and reservation.equipment_id != equipment_id:
+                restart_write_transaction() # 조회와 잠금 사이에 다른 장비로 옮겨짐: 그 장비로 다시 잠금
+                continue
+
+            old_row = (reservation.equipment_id, reservation.user_id, reservation.start_date, reservation.end_date)
+            db.session.delete(reservation)
+            try:
+                apply_reservations_to_rollups([old_row], sign=-1)
+                bump_data_version('reservation')
+                db.session.commit()
+                interval_indexes.reservation_removed(old_row[0], id)
+                change_feed.publish('reservation', 'delete', {'id': id, 'equipment_id': old_row[0]}, [old_row[0]])
+                return jsonify({'message': f'예약 ID {id} 삭제 완료'}), 200
+            except Exception as e:
+                db.session.rollback()
+                logger.exception('예약 삭제 중 오류 발생')
+                return jsonify({'message': '예약 삭제 중 오류 발생', 'error': str(e)}), 500
+
+# == 반복 예약 ==
+MAX_SERIES_OCCURRENCES = 500 # 반복 예약 하나가 만들 수 있는 최대 회차 수
+
+def expand_recurrence(start_date, until_date, frequency, interval, weekdays, duration_days):
+    """반복 규칙을 회차별 (시작일, 종료일) 목록으로 펼침 (시작일 순)"""
+    length = timedelta(days=duration_days - 1)
+    occurrences = []
+    if frequency == 'daily':
+        step = timedelta(days=interval)
+        day = start_date
+        while day <= until_date and len(occurrences) <= MAX_SERIES_OCCURRENCES:
+            occurrences.append((day, day + length))
+            day += step
+    else:
+        # start_date가 속한 주의 월요일부터 interval주 간격으로 지정 요일을 채움
+        week_start = start_date - timedelta(days=start_date.weekday())
+        while week_start <= until_date and len(occurrences) <= MAX_SERIES_OCCURRENCES:
+            for weekday in weekdays:
+                day = week_start + timedelta(days=weekday)
+                if start_date <= day <= until_date:
+                    occurrences.append((day, day + length))
+            week_start += timedelta(weeks=interval)
+    return occurrences
+
+def series_occurrence_conflicts(equipment_id, occurrences, exclude_series_id=None):
+    """
+    회차 목록과 겹치는 기존 예약을 장비당 범위 쿼리 한 번으로 찾음
+    반환값: [(회차 시작일, 충돌 예약 ID), ...]
+    """
+    if not occurrences:
+        return []
+    query = db.session.query(Reservation.id, Reservation.start_date, Reservation.end_date).filter(
         Reservation.equipment_id == equipment_id,
-        Reservation.id != id,  # 현재 수정 중인 예약은 제외
-        Reservation.start_date <= end_date,
-        Reservation.end_date >= start_date
-    ).first()
+        Reservation.start_date <= max(end for _, end in occurrences),
+        Reservation.end_date >= min(start for start, _ in occurrences)
+    )
+    if exclude_series_id is not None:
+        query = query.filter(or_(Reservation.series_id.is_(None), Reservation.series_id != exclude_series_id))
+    existing = EquipmentIntervalIndex(query.all())
+    conflicts = []
+    for start, end in occurrences:
+        conflict_ids = existing.collisions(start, end)
+        if conflict_ids:
+            conflicts.append((start, conflict_ids[0]))
+    return conflicts
+
+def delete_series_for(*criteria):
+    """조건에 맞는 반복 예약 규칙 삭제 (남는 회차는 외래 키의 ON DELETE SET NULL로 단일 예약으로 분리)"""
+    ReservationSeries.query.filter(*criteria).delete(synchronize_session=False)
+
+@bp.route('/api/reservations/series', methods=['POST'])
+@idempotent
+@retry_on_locked
+def add_reservation_series():
+    """
+    반복 예약 추가 (모든 회차를 한 번에 생성, 하나라도 겹치면 아무것도 저장하지 않음)
+    Request Body:
+    - user_id, equipment_id (integer): 필수
+    - start_date, until_date (YYYY-MM-DD): 반복 시작일과 마지막 회차가 시작할 수 있는 날짜 (필수)
+    - frequency: 'daily'(interval일마다) 또는 'weekly'(interval주마다 weekdays 요일)
+    - interval (integer): 반복 간격 (기본값 1)
+    - weekdays (list of integer): 0=월 ... 6=일 (weekly 필수)
+    - duration_days (integer): 회차당 예약 일수 (기본값 1)
+    - purpose (string): 사용 목적
+    """
+    data = request.get_json()
+    required_fields = ['user_id', 'equipment_id', 'start_date', 'until_date', 'frequency']
+    if not data or not all(field in data for field in required_fields):
+        return jsonify({'message': f'필수 필드가 누락되었습니다: {required_fields}'}), 400
 
-    if overlapping_reservations:
-        return jsonify({
-            'message': '선택한 시간에 해당 장비의 예약이 이미 존재합니다.',
-            'conflict_reservation': overlapping_reservations.to_dict()
-        }), 409
+    try:
+        user_id = int(data['user_id'])
+        equipment_id = int(data['equipment_id'])
+        start_date = date.fromisoformat(data['start_date'])
+        until_date = date.fromisoformat(data['until_date'])
+        frequency = data['frequency']
+        interval = int(data.get('interval', 1))
+        duration_days = int(data.get('duration_days', 1))
+        weekdays = sorted({int(day) for day in data.get('weekdays') or []})
+        purpose = data.get('purpose')
+    except (ValueError, TypeError) as e:
+        return jsonify({'message': '입력 데이터 형식이 잘못되었습니다. 날짜는 YYYY-MM-DD 형식이어야 합니다.', 'error': str(e)}), 400
+
+    if frequency not in ('daily', 'weekly'):
+        return jsonify({'message': "frequency는 'daily' 또는 'weekly'여야 합니다."}), 400
+    if interval < 1 or duration_days < 1:
+        return jsonify({'message': 'interval과 duration_days는 1 이상이어야 합니다.'}), 400
+    if frequency == 'weekly' and (not weekdays or weekdays[0] < 0 or weekdays[-1] > 6):
+        return jsonify({'message': 'weekly 반복에는 0(월)~6(일) 사이의 weekdays가 필요합니다.'}), 400
+    if start_date > until_date:
+        return jsonify({'message': '시작 날짜는 종료 날짜보다 빠르거나 같아야 합니다.'}), 400
+    if start_date < date.today():
+         return jsonify({'message': '과거 날짜로 예약할 수 없습니다.'}), 400
+
+    occurrences = expand_recurrence(start_date, until_date, frequency, interval, weekdays, duration_days)
+    if not occurrences:
+        return jsonify({'message': '반복 규칙에 해당하는 날짜가 없습니다.'}), 400
+    if len(occurrences) > MAX_SERIES_OCCURRENCES:
+        return jsonify({'message': f'반복 예약은 최대 {MAX_SERIES_OCCURRENCES}회까지 만들 수 있습니다.'}), 400
+    # 회차끼리 겹치지 않아야 함 (회차 길이가 반복 간격보다 긴 경우)
+    for (_, prev_end), (next_start, _) in zip(occurrences, occurrences[1:]):
+        if next_start <= prev_end:
+            return jsonify({'message': '반복 회차끼리 기간이 겹칩니다. duration_days를 줄여주세요.'}), 400
+
+    # 같은 장비에 대한 검사~커밋을 직렬화 (DB 트랜잭션이 시작되기 전에 잠금)
+    with equipment_locks.hold(equipment_id):
+        # 사용자 및 장비 존재 여부 확인
+        if not get_active(User, user_id):
+            return jsonify({'message': f'사용자 ID {user_id}를 찾을 수 없습니다.'}), 404
+        if not get_active(Equipment, equipment_id):
+            return jsonify({'message': f'장비 ID {equipment_id}를 찾을 수 없습니다.'}), 404
+
+        conflicts = series_occurrence_conflicts(equipment_id, occurrences)
+        if conflicts:
+            return jsonify({
+                'message': f'{len(conflicts)}개 회차가 기존 예약과 겹칩니다.',
+                'conflicts': [{'start_date': start.isoformat(), 'conflict_reservation_id': res_id}
+                              for start, res_id in conflicts]
+            }), 409
+
+        series = ReservationSeries(
+            user_id=user_id,
+            equipment_id=equipment_id,
+            frequency=frequency,
+            interval=interval,
+            weekdays=','.join(str(day) for day in weekdays) if frequency == 'weekly' else None,
+            duration_days=duration_days,
+            start_date=start_date,
+            until_date=until_date,
+            purpose=purpose
+        )
+        db.session.add(series)
+        try:
+            db.session.flush()
+            # 회차는 ORM 객체 없이 executemany INSERT 한 번으로 생성
+            db.session.execute(insert(Reservation), [
+                {'user_id': user_id, 'equipment_id': equipment_id, 'start_date': start, 'end_date': end,
+                 'purpose': purpose, 'series_id': series.id}
+                for start, end in occurrences
+            ])
+            apply_reservations_to_rollups([(equipment_id, user_id, start, end) for start, end in occurrences])
+            bump_data_version('reservation')
+            db.session.commit()
+            interval_indexes.invalidate([equipment_id])
+        except Exception as e:
+            db.session.rollback()
+            logger.exception('반복 예약 추가 중 오류 발생')
+            return jsonify({'message': '반복 예약 추가 중 오류 발생', 'error': str(e)}), 500
+
+        result = series.to_dict()
+        result['occurrences'] = len(occurrences)
+        change_feed.publish_many([('reservation', 'insert', reservation_row_to_dict(row), [equipment_id])
+                                  for row in reservation_rows_query().filter(Reservation.series_id == series.id)])
+        return jsonify(result), 201
+
+@bp.route('/api/reservations/series/<int:id>', methods=['PUT'])
+@idempotent
+@retry_on_locked
+def update_reservation_series(id):
+    """
+    반복 예약 전체 수정 (오늘 이후에 시작하는 회차만, UPDATE 한 번으로 적용)
+    Request Body (모두 선택): user_id, equipment_id, purpose
+    """
+    data = request.get_json()
+    if not data:
+        return jsonify({'message': '수정할 항목이 없습니다.'}), 400
+    try:
+        new_user_id = int(data['user_id']) if 'user_id' in data else None
+        new_equipment_id = int(data['equipment_id']) if 'equipment_id' in data else None
+    except (ValueError, TypeError) as e:
+        return jsonify({'message': '입력 데이터 형식이 잘못되었습니다.', 'error': str(e)}), 400
+
+    # 회차를 옮겨 갈 장비에 대한 검사~커밋을 직렬화 (DB 트랜잭션이 시작되기 전에 잠금)
+    with equipment_locks.hold(*([new_equipment_id] if new_equipment_id is not None else [])):
+        series = ReservationSeries.query.get(id)
+        if series is None:
+            return jsonify({'message': '해당 ID의 반복 예약을 찾을 수 없습니다.'}), 404
+        user_id = new_user_id if new_user_id is not None else series.user_id
+        equipment_id = new_equipment_id if new_equipment_id is not None else series.equipment_id
+        purpose = data.get('purpose', series.purpose)
+
+        if user_id != series.user_id and not get_active(User, user_id):
+            return jsonify({'message': f'사용자 ID {user_id}를 찾을 수 없습니다.'}), 404
+        if equipment_id != series.equipment_id and not get_active(Equipment, equipment_id):
+            return jsonify({'message': f'장비 ID {equipment_id}를 찾을 수 없습니다.'}), 404
+
+        upcoming = Reservation.query.filter(Reservation.series_id == id, Reservation.start_date >= date.today())
+        upcoming_rows = db.session.query(
+            Reservation.equipment_id, Reservation.user_id, Reservation.start_date, Reservation.end_date
+        ).filter(Reservation.series_id == id, Reservation.start_date >= date.today()).all()
+
+        if equipment_id != series.equipment_id:
+            conflicts = series_occurrence_conflicts(equipment_id, [(row[2], row[3]) for row in upcoming_rows], exclude_series_id=id)
+            if conflicts:
+                return jsonify({
+                    'message': f'{len(conflicts)}개 회차가 기존 예약과 겹칩니다.',
+                    'conflicts': [{'start_date': start.isoformat(), 'conflict_reservation_id': res_id}
+                                  for start, res_id in conflicts]
+                }), 409
+
+        old_equipment_id = series.equipment_id
+        try:
+            updated = upcoming.update({
+                Reservation.user_id: user_id,
+                Reservation.equipment_id: equipment_id,
+                Reservation.purpose: purpose
+            }, synchronize_session=False)
+            if user_id != series.user_id or equipment_id != old_equipment_id:
+                apply_reservations_to_rollups(upcoming_rows, sign=-1)
+                apply_reservations_to_rollups([(equipment_id, user_id, start, end) for _, _, start, end in upcoming_rows])
+            series.user_id = user_id
+            series.equipment_id = equipment_id
+            series.purpose = purpose
+            bump_data_version('reservation')
+            db.session.commit()
+            interval_indexes.invalidate({old_equipment_id, equipment_id})
+        except Exception as e:
+            db.session.rollback()
+            logger.exception('반복 예약 수정 중 오류 발생')
+            return jsonify({'message': '반복 예약 수정 중 오류 발생', 'error': str(e)}), 500
+
+        result = series.to_dict()
+        result['updated_occurrences'] = updated
+        if updated:
+            changed = reservation_rows_query().filter(Reservation.series_id == id, Reservation.start_date >= date.today())
+            change_feed.publish_many([('reservation', 'update', reservation_row_to_dict(row), {old_equipment_id, equipment_id})
+                                      for row in changed])
+        return jsonify(result), 200
+
+@bp.route('/api/reservations/series/<int:id>', methods=['DELETE'])
+@idempotent
+@retry_on_locked
+def delete_reservation_series(id):
+    """반복 예약 취소 (오늘 이후에 시작하는 회차를 DELETE 한 번으로 삭제, 지난 회차는 기록으로 남김)"""
+    today = date.today()
+    while True:
+        # 회차가 있는 장비를 모두 잠근 뒤 삭제~구간 인덱스 무효화 (회차 하나만 다른 장비로 옮겨졌을 수도 있음)
+        with read_before_write_lock():
+            locked_ids = set(db.session.scalars(select(Reservation.equipment_id).where(
+                Reservation.series_id == id, Reservation.start_date >= today).distinct()))
+        with equipment_locks.hold(*locked_ids):
+            series = ReservationSeries.query.get(id)
+            if series is None:
+                return jsonify({'message': '해당 ID의 반복 예약을 찾을 수 없습니다.'}), 404
+
+            upcoming = db.session.query(
+                Reservation.id, Reservation.equipment_id, Reservation.user_id, Reservation.start_date, Reservation.end_date
+            ).filter(Reservation.series_id == id, Reservation.start_date >= today).all()
+            upcoming_rows = [tuple(row[1:]) for row in upcoming]
+            equipment_ids = {row[0] for row in upcoming_rows}
+            if not equipment_ids <= locked_ids:
+                restart_write_transaction() # 조회와 잠금 사이에 회차가 다른 장비로 옮겨짐: 다시 잠금
+                continue
+
+            try:
+                deleted = Reservation.query.filter(
+                    Reservation.series_id == id, Reservation.start_date >= today
+                ).delete(synchronize_session=False)
+                apply_reservations_to_rollups(upcoming_rows, sign=-1)
+                if (Reservation.query.filter(Reservation.series_id == id).first()
+                        or ReservationArchive.query.filter(ReservationArchive.series_id == id).first()):
+                    # 지난 회차가 남아 있으면 규칙은 어제까지로 줄여서 보존
+                    series.until_date = min(series.until_date, today - timedelta(days=1))
+                else:
+                    db.session.delete(series)
+                bump_data_version('reservation')
+                db.session.commit()
+                interval_indexes.invalidate(equipment_ids)
+                change_feed.publish_many([('reservation', 'delete', {'id': row[0], 'equipment_id': row[1]}, [row[1]])
+                                          for row in upcoming])
+            except Exception as e:
+                db.session.rollback()
+                logger.exception('반복 예약 삭제 중 오류 발생')
+                return jsonify({'message': '반복 예약 삭제 중 오류 발생', 'error': str(e)}), 500
+
+            return jsonify({'message': f'반복 예약 ID {id} 취소 완료', 'deleted_occurrences': deleted}), 200
+
+@bp.route('/api/reservations/conflicts', methods=['GET'])
+def get_reservation_conflicts():
+    """
+    예약 충돌 미리 확인 (dry-run, 저장하지 않음)
+    Query Parameters:
+    - equipment_id (integer): 장비 ID (필수)
+    - start_date, end_date (YYYY-MM-DD): 확인할 기간 (필수, 양 끝 포함)
+    - exclude_id (integer): 제외할 예약 ID (기존 예약을 옮길 때)
+    """
+    try:
+        equipment_id = int(request.args['equipment_id'])
+        start_date = date.fromisoformat(request.args['start_date'])
+        end_date = date.fromisoformat(request.args['end_date'])
+        exclude_id = request.args.get('exclude_id')
+        exclude_id = int(exclude_id) if exclude_id else None
+    except KeyError as e:
+        return jsonify({'message': f'필수 파라미터가 누락되었습니다: {e.args[0]}'}), 400
+    except (ValueError, TypeError) as e:
+        return jsonify({'message': '입력 데이터 형식이 잘못되었습니다. 날짜는 YYYY-MM-DD 형식이어야 합니다.', 'error': str(e)}), 400
+
+    if start_date > end_date:
+        return jsonify({'message': '시작 날짜는 종료 날짜보다 빠르거나 같아야 합니다.'}), 400
 
-    # 예약 수정
-    reservation.user_id = user_id
-    reservation.equipment_id = equipment_id
-    reservation.start_date = start_date
-    reservation.end_date = end_date
-    reservation.purpose = purpose
+    conflict_ids = interval_indexes.collisions(equipment_id, start_date, end_date, exclude_id)
+    conflicts = []
+    if conflict_ids:
+        rows = reservation_rows_query().filter(Reservation.id.in_(conflict_ids)
+                                               ).order_by(Reservation.start_date, Reservation.id).all()
+        conflicts = reservation_rows_to_dicts(rows)
 
+    return jsonify({
+        'conflict': bool(conflicts),
+        'conflicts': conflicts
+    })
+
+# == 빈 기간 검색 ==
+MAX_AVAILABILITY_DAYS = 366 # 한 번에 검색할 수 있는 최대 기간 (일)
+
+def free_windows(reserved, window_start, window_end, min_days):
+    """
+    시작일 순으로 정렬된 (start_date, end_date) 목록을 한 번 훑어
+    [window_start, window_end] 안의 빈 기간 중 min_days일 이상인 것을 반환
+    """
+    windows = []
+    cursor = window_start # 아직 예약으로 덮이지 않은 첫 날짜
+    for start, end in reserved:
+        if start > window_end:
+            break
+        if start > cursor and (start - cursor).days >= min_days:
+            windows.append((cursor, start - timedelta(days=1)))
+        cursor = max(cursor, end + timedelta(days=1))
+        if cursor > window_end:
+            break
+    if cursor <= window_end and (window_end - cursor).days + 1 >= min_days:
+        windows.append((cursor, window_end))
+    return windows
+
+@bp.route('/api/availability', methods=['GET'])
+@conditional_get('reservation', 'equipment', by_date=True)
+def get_availability():
+    """
+    장비별 빈 기간 검색 (예: 다음 한 달 안에 5일 연속 비어 있는 장비)
+    Query Parameters:
+    - start_date (YYYY-MM-DD): 검색 시작일 (기본값: 오늘)
+    - end_date (YYYY-MM-DD): 검색 종료일, 포함 (기본값: 시작일 + 30일)
+    - min_days (integer): 최소 연속 일수 (기본값 1)
+    - equipment_id / equipment_ids: 장비 필터 (쉼표로 구분)
+    - only_available (true/false): 빈 기간이 있는 장비만 반환 (기본값 false)
+    """
     try:
-        db.session.commit()
-        return jsonify(reservation.to_dict()), 200
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'message': '예약 수정 중 오류 발생', 'error': str(e)}), 500
+        window_start = date.fromisoformat(request.args['start_date']) if request.args.get('start_date') else date.today()
+        window_end = date.fromisoformat(request.args['end_date']) if request.args.get('end_date') else window_start + timedelta(days=30)
+        min_days = int(request.args.get('min_days', 1))
+    except ValueError:
+        return jsonify({'message': '날짜는 YYYY-MM-DD, min_days는 정수여야 합니다.'}), 400
+    if window_start > window_end:
+        return jsonify({'message': '시작 날짜는 종료 날짜보다 빠르거나 같아야 합니다.'}), 400
+    if (window_end - window_start).days + 1 > MAX_AVAILABILITY_DAYS:
+        return jsonify({'message': f'검색 기간은 최대 {MAX_AVAILABILITY_DAYS}일입니다.'}), 400
+    if min_days < 1:
+        return jsonify({'message': 'min_days는 1 이상이어야 합니다.'}), 400
+    equipment_ids, error = parse_id_filter('equipment_id', 'equipment_ids')
+    if error:
+        return error
+    only_available = request.args.get('only_available', 'false').lower() == 'true'
+
+    equipment_query = db.session.query(Equipment.id, Equipment.name).filter(Equipment.deleted_at.is_(None)) # 삭제 표시된 장비는 예약 불가
+    if equipment_ids:
+        equipment_query = equipment_query.filter(Equipment.id.in_(equipment_ids))
+    equipment_rows = equipment_query.order_by(Equipment.id).all()
+
+    # 검색 기간과 겹치는 예약을 (장비, 시작일) 순으로 한 번에 읽음
+    # 장비 ID 목록으로 거르면 ix_reservation_equipment_dates에서 장비별로
+    # (equipment_id = ? AND start_date <= ?) 범위만 탐색하고, 인덱스 순서 그대로라 정렬/테이블 조회가 없음
+    source = reservation_source(window_start) # 지난 기간을 검색하는 경우에만 보관 테이블 포함
+    reserved_query = db.session.query(source.c.equipment_id, source.c.start_date, source.c.end_date).filter(
+        source.c.equipment_id.in_([equipment_id for equipment_id, _ in equipment_rows]),
+        source.c.start_date <= window_end,
+        source.c.end_date >= window_start
+    )
+    reserved = {}
+    for equipment_id, start, end in reserved_query.order_by(source.c.equipment_id, source.c.start_date):
+        reserved.setdefault(equipment_id, []).append((start, end))
+
+    results = []
+    for equipment_id, name in equipment_rows:
+        windows = free_windows(reserved.get(equipment_id, ()), window_start, window_end, min_days)
+        if only_available and not windows:
+            continue
+        results.append({
+            'equipment_id': equipment_id,
+            'equipment_name': name,
+            'free': [{'start_date': start.isoformat(), 'end_date': end.isoformat(), 'days': (end - start).days + 1}
+                     for start, end in windows]
+        })
 
-@app.route('/api/reservations/<int:id>', methods=['DELETE'])
-def delete_reservation(id):
-    """특정 예약 삭제"""
-    reservation = Reservation.query.get(id)
-    if reservation is None:
-        return jsonify({'message': '해당 ID의 예약을 찾을 수 없습니다.'}), 404
+    return jsonify({
+        'start_date': window_start.isoformat(),
+        'end_date': window_end.isoformat(),
+        'min_days': min_days,
+        'equipment': results
+    })
 
-    db.session.delete(reservation)
+# == 변경 스트림 ==
+def format_sse(event_id, event=None, data=None):
+    """SSE 메시지 한 개 (data가 없으면 id만 보내 브라우저의 Last-Event-ID만 갱신)"""
+    lines = [f'id: {event_id}']
+    if event:
+        lines.append(f'event: {event}')
+    if data is not None:
+        lines.append('data: ' + json_dumps(data))
+    return '\n'.join(lines) + '\n\n'
+
+def parse_resume_seq(token):
+    """'<epoch>-<seq>' 형식의 이벤트 ID를 seq로 변환 (다른 피드(프로세스/앱)의 ID거나 형식이 틀리면 None)"""
+    epoch, _, seq = token.rpartition('-')
+    if epoch != change_feed.epoch or not seq.isdigit():
+        return None
+    return int(seq)
+
+@bp.route('/api/events/stream', methods=['GET'])
+def stream_events():
+    """
+    예약/사용자/장비 변경 내역을 Server-Sent Events로 전달
+    Query Parameters:
+    - equipment_id (integer): 해당 장비의 예약/장비 변경만 받음 (사용자 변경은 항상 전달)
+    - since (string): 이 이벤트 ID 이후부터 재개 (브라우저 재연결 시에는 Last-Event-ID 헤더를 사용)
+    이벤트 종류:
+    - reservation / user / equipment: data = {"op": "insert"|"update"|"delete", "data": {...}}
+      (insert/update는 예약 목록 API와 같은 형식, delete는 id만 포함.
+       사용자/장비 delete는 그 사용자/장비의 예약도 모두 삭제되었음을 뜻함.
+       단 soft=true면 시작 전 예약만 삭제되고 지난 예약은 남음)
+    - reset: 재개 지점이 보관 범위를 벗어남 → 현재 화면 범위를 다시 조회해야 함
+    """
+    equipment_id = request.args.get('equipment_id')
     try:
-        db.session.commit()
-        return jsonify({'message': f'예약 ID {id} 삭제 완료'}), 200
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'message': '예약 삭제 중 오류 발생', 'error': str(e)}), 500
+        equipment_id = int(equipment_id) if equipment_id else None
+    except ValueError:
+        return jsonify({'message': 'equipment_id는 정수여야 합니다.'}), 400
+
+    feed = app_state().change_feed # 제너레이터는 앱 컨텍스트 밖에서 돌므로 실제 객체를 잡아 둠
+    resume_token = request.headers.get('Last-Event-ID') or request.args.get('since')
+    seq = feed.last_seq
+    needs_reset = False
+    if resume_token:
+        resume_seq = parse_resume_seq(resume_token)
+        if resume_seq is None:
+            needs_reset = True
+        else:
+            seq = resume_seq
+
+    config = current_app.config
+    heartbeat = config['EVENT_STREAM_HEARTBEAT']
+    max_seconds = config['EVENT_STREAM_MAX_SECONDS']
+    if not feed.subscribe(config['EVENT_STREAM_MAX_CLIENTS']):
+        return jsonify({'message': '동시에 열 수 있는 변경 스트림 수를 초과했습니다. 잠시 후 다시 시도해주세요.'}), 503
+
+    def generate():
+        nonlocal seq, needs_reset
+        yield 'retry: 3000\n\n'
+        if not needs_reset: # 재연결 시 이어받을 위치를 처음부터 알려 둠
+            yield format_sse(f'{feed.epoch}-{seq}')
+        deadline = time.monotonic() + max_seconds
+        while True:
+            if needs_reset:
+                seq = feed.last_seq
+                needs_reset = False
+                yield format_sse(f'{feed.epoch}-{seq}', 'reset', {})
+            if time.monotonic() >= deadline:
+                return # 브라우저가 마지막 이벤트 ID로 재연결
+            events = feed.read_since(seq, heartbeat)
+            if events is None:
+                needs_reset = True
+                continue
+            if not events:
+                yield ': keep-alive\n\n'
+                continue
+            chunks = []
+            for event_seq, entity, op, data, equipment_ids in events:
+                if equipment_id is None or not equipment_ids or equipment_id in equipment_ids:
+                    chunks.append(format_sse(f'{feed.epoch}-{event_seq}', entity, {'op': op, 'data': data}))
+                seq = event_seq
+            if not chunks: # 필터로 모두 걸러졌어도 재개 지점은 앞으로 옮김
+                chunks.append(format_sse(f'{feed.epoch}-{seq}'))
+            yield ''.join(chunks)
+
+    response = current_app.response_class(generate(), mimetype='text/event-stream')
+    response.call_on_close(feed.unsubscribe) # 연결이 끊기거나 스트림이 끝나면 자리 반환
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no' # 프록시 버퍼링 방지
+    return response
 
 # == 통계 엔드포인트 ==
-@app.route('/api/statistics', methods=['GET'])
-def get_statistics():
+def usage_pairs_from_daily_rollup(start_date, end_date, equipment_ids=None, user_ids=None):
+    """user_daily_usage 에서 기간 안의 (equipment_id, user_id)별 사용 일수 (기본 키의 day 범위 탐색)"""
+    query = db.session.query(
+        UserDailyUsage.equipment_id,
+        UserDailyUsage.user_id,
+        func.sum(UserDailyUsage.used_days)
+    ).filter(UserDailyUsage.day.between(start_date, end_date))
+    if equipment_ids is not None:
+        query = query.filter(UserDailyUsage.equipment_id.in_(equipment_ids))
+    if user_ids is not None:
+        query = query.filter(UserDailyUsage.user_id.in_(user_ids))
+    return {(eq_id, u_id): int(days or 0)
+            for eq_id, u_id, days in query.group_by(UserDailyUsage.equipment_id, UserDailyUsage.user_id)}
+
+def usage_pairs_from_rollups(start_date, end_date, equipment_ids=None, user_ids=None):
     """
-    예약 통계 조회
-    Query Parameters:
-    - start_date (ISO format, e.g., 2023-10-27): 조회 시작 날짜 (inclusive)
-    - end_date (ISO format, e.g., 2023-11-28): 조회 종료 날짜 (inclusive)
-    - equipment_id (integer): 특정 장비 ID
-    - user_id (integer): 특정 사용자 ID
+    (equipment_id, user_id)별 사용 일수를 롤업 테이블로 계산
+    기간에 완전히 포함되는 달은 user_monthly_usage 에서 읽고,
+    앞뒤로 걸친 일부 달(각 한 달 미만)은 user_daily_usage 에서 읽는다.
+    """
+    # 기간 안에 온전히 들어가는 첫 달의 1일과 마지막 달의 말일
+    first_full = start_date if start_date.day == 1 else (start_date.replace(day=28) + timedelta(days=4)).replace(day=1)
+    last_full_end = end_date if (end_date + timedelta(days=1)).day == 1 else end_date.replace(day=1) - timedelta(days=1)
+
+    if first_full > last_full_end:
+        return usage_pairs_from_daily_rollup(start_date, end_date, equipment_ids, user_ids)
+
+    query = db.session.query(
+        UserMonthlyUsage.equipment_id,
+        UserMonthlyUsage.user_id,
+        func.sum(UserMonthlyUsage.used_days)
+    ).filter(UserMonthlyUsage.month.between(first_full, last_full_end.replace(day=1)))
+    if equipment_ids is not None:
+        query = query.filter(UserMonthlyUsage.equipment_id.in_(equipment_ids))
+    if user_ids is not None:
+        query = query.filter(UserMonthlyUsage.user_id.in_(user_ids))
+    pairs = {(eq_id, u_id): int(days or 0)
+             for eq_id, u_id, days in query.group_by(UserMonthlyUsage.equipment_id, UserMonthlyUsage.user_id)}
+
+    edges = []
+    if start_date < first_full:
+        edges.append((start_date, first_full - timedelta(days=1)))
+    if last_full_end < end_date:
+        edges.append((last_full_end + timedelta(days=1), end_date))
+    for edge_start, edge_end in edges:
+        for key, days in usage_pairs_from_daily_rollup(edge_start, edge_end, equipment_ids, user_ids).items():
+            pairs[key] = pairs.get(key, 0) + days
+    return pairs
+
+def compute_statistics(start_date=None, end_date=None, equipment_ids=None, user_ids=None):
+    """
+    예약 통계 계산 (사용량 롤업 테이블 기반)
+    equipment_ids/user_ids는 집계할 예약을 해당 ID로 제한 (None이면 전체)
+    반환값은 /api/statistics 응답 JSON과 같은 dict
     """
-    query = Reservation.query
+    total_days_in_period = 0
+    range_start, range_end = start_date, end_date
+
+    if start_date and end_date:
+        # Calculate total days in the requested period
+        total_days_in_period = (end_date - start_date).days + 1
+    else:
+        # 가장 이른 시작일과 가장 늦은 종료일을 MIN/MAX 한 번으로 조회
+        source = reservation_source()
+        earliest, latest = db.session.query(func.min(source.c.start_date), func.max(source.c.end_date)).one()
+        range_start = start_date or earliest
+        range_end = end_date or latest
+        if not start_date and not end_date and earliest and latest:
+            # If no dates are provided, calculate statistics for all time
+            start_date = earliest
+            end_date = latest
+            total_days_in_period = (end_date - start_date).days + 1
+        # 한쪽 날짜만 주어진 경우 '미사용 일수'는 계산하지 않음
+
+    if range_start and range_end and range_start <= range_end:
+        usage_pairs = usage_pairs_from_rollups(range_start, range_end, equipment_ids, user_ids)
+    else:
+        usage_pairs = {}
+
+    equipment_names = dict(db.session.query(Equipment.id, Equipment.name).all())
+    user_names = dict(db.session.query(User.id, User.name).all())
+    return build_statistics(start_date, end_date, total_days_in_period, usage_pairs, equipment_names, user_names)
+
+def build_statistics(start_date, end_date, total_days_in_period, usage_pairs, equipment_names, user_names):
+    """(equipment_id, user_id)별 사용 일수를 /api/statistics 응답 형태(장비별/사용자별 dict)로 변환"""
+    not_used_default = total_days_in_period if total_days_in_period > 0 else 'N/A' # N/A if no period defined
+
+    # Initialize equipment usage with all equipment, assuming 0 used days initially
+    equipment_usage = {
+        name: {'used_days': 0, 'not_used_days': not_used_default, 'users': {}}
+        for name in equipment_names.values()
+    }
+    # Initialize user usage with all users, assuming 0 used days initially
+    user_usage = {
+        name: {'used_days': 0, 'equipment': {}}
+        for name in user_names.values()
+    }
+
+    for (eq_id, u_id), days in usage_pairs.items():
+        if days <= 0:
+            continue
+        equipment_name = equipment_names.get(eq_id, 'Unknown Equipment')
+        user_name = user_names.get(u_id, 'Unknown User')
+
+        eq_stats = equipment_usage.setdefault(
+            equipment_name, {'used_days': 0, 'not_used_days': not_used_default, 'users': {}})
+        eq_stats['used_days'] += days
+        eq_stats['users'][user_name] = eq_stats['users'].get(user_name, 0) + days
+
+        user_stats = user_usage.setdefault(user_name, {'used_days': 0, 'equipment': {}})
+        user_stats['used_days'] += days
+        user_stats['equipment'][equipment_name] = user_stats['equipment'].get(equipment_name, 0) + days
+
+    # Calculate not used days for equipment if a period was defined
+    if total_days_in_period > 0:
+        for eq_stats in equipment_usage.values():
+            eq_stats['not_used_days'] = total_days_in_period - eq_stats['used_days']
+
+    return {
+        'period_start': start_date.isoformat() if start_date else None,
+        'period_end': end_date.isoformat() if end_date else None,
+        'total_days_in_period': total_days_in_period if total_days_in_period > 0 else 'N/A',
+        'equipment_usage': equipment_usage,
+        'user_usage': user_usage
+    }
 
+# --- 통계 결과 캐시 ---
+class StatisticsCache:
+    """
+    계산된 통계의 LRU + TTL 캐시
+    키에 데이터 버전을 포함하므로 쓰기 엔드포인트가 bump_data_version()을 호출하면
+    이전 결과는 더 이상 조회되지 않고 LRU에서 밀려난다.
+    """
+
+    def __init__(self, maxsize=128, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        value = compute()
+        with self._lock:
+            self._entries[key] = (now + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+statistics_cache = LocalProxy(app_state, 'statistics_cache')
+
+def cached_statistics(start_date=None, end_date=None, equipment_ids=None, user_ids=None):
+    """compute_statistics()를 캐시를 거쳐 호출 (get_statistics와 export_csv가 공유)"""
+    versions, _ = current_data_versions(('reservation', 'user', 'equipment'))
+    key = (start_date, end_date, equipment_ids, user_ids, versions)
+    return statistics_cache.get_or_compute(
+        key, lambda: compute_statistics(start_date, end_date, equipment_ids, user_ids))
+
+def parse_id_filter(single_name, list_name):
+    """
+    request.args의 단일 ID(예: equipment_id)와 ID 목록(예: equipment_ids=1,2,3)을 합쳐
+    정렬된 튜플로 반환 (둘 다 없으면 None)
+    """
+    ids = set()
+    for name in (single_name, list_name):
+        value = request.args.get(name)
+        if value:
+            try:
+                ids.update(int(item) for item in value.split(',') if item.strip())
+            except ValueError:
+                return None, (jsonify({'message': f'{name}는 정수여야 합니다.'}), 400)
+    return (tuple(sorted(ids)) if ids else None), None
+
+def parse_statistics_args():
+    """
+    통계 조회 파라미터를 정규화
+    성공하면 ((start_date, end_date, equipment_ids, user_ids), None), 실패하면 (None, 에러 응답)
+    """
     # 날짜 필터링
     start_str = request.args.get('start_date')
     end_str = request.args.get('end_date')
@@ -400,208 +2650,492 @@ def get_statistics():
     if start_str:
         try:
             start_date = date.fromisoformat(start_str)
-            query = query.filter(Reservation.end_date >= start_date)
         except ValueError:
-            return jsonify({'message': 'start_date 형식이 잘못되었습니다. YYYY-MM-DD 형식을 사용해주세요.'}), 400
+            return None, (jsonify({'message': 'start_date 형식이 잘못되었습니다. YYYY-MM-DD 형식을 사용해주세요.'}), 400)
 
     if end_str:
         try:
             end_date = date.fromisoformat(end_str)
-            query = query.filter(Reservation.start_date <= end_date)
         except ValueError:
-            return jsonify({'message': 'end_date 형식이 잘못되었습니다. YYYY-MM-DD 형식을 사용해주세요.'}), 400
+            return None, (jsonify({'message': 'end_date 형식이 잘못되었습니다. YYYY-MM-DD 형식을 사용해주세요.'}), 400)
 
-    # 장비 필터링
-    equipment_id = request.args.get('equipment_id')
-    if equipment_id:
-        try:
-            query = query.filter(Reservation.equipment_id == int(equipment_id))
-        except ValueError:
-             return jsonify({'message': 'equipment_id는 정수여야 합니다.'}), 400
+    # 장비/사용자 필터링 (단일 ID와 쉼표로 구분한 ID 목록 모두 허용)
+    equipment_ids, error = parse_id_filter('equipment_id', 'equipment_ids')
+    if error:
+        return None, error
+    user_ids, error = parse_id_filter('user_id', 'user_ids')
+    if error:
+        return None, error
 
-    # 사용자 필터링
-    user_id = request.args.get('user_id')
-    if user_id:
-        try:
-            query = query.filter(Reservation.user_id == int(user_id))
-        except ValueError:
-            return jsonify({'message': 'user_id는 정수여야 합니다.'}), 400
+    return (start_date, end_date, equipment_ids, user_ids), None
 
-    reservations = query.all()
+@bp.route('/api/statistics', methods=['GET'])
+@conditional_get('reservation', 'user', 'equipment')
+def get_statistics():
+    """
+    예약 통계 조회
+    Query Parameters:
+    - start_date (ISO format, e.g., 2023-10-27): 조회 시작 날짜 (inclusive)
+    - end_date (ISO format, e.g., 2023-11-28): 조회 종료 날짜 (inclusive)
+    - equipment_id (integer): 특정 장비 ID
+    - user_id (integer): 특정 사용자 ID
+    """
+    params, error = parse_statistics_args()
+    if error:
+        return error
+    return jsonify(cached_statistics(*params))
 
-    # 통계 계산
-    equipment_usage = {}
-    user_usage = {}
-    total_days_in_period = 0
+# --- 여러 기간 통계 (한 번의 스윕) ---
+MAX_STATISTICS_PERIODS = 100 # /api/statistics/periods 한 번에 계산할 수 있는 최대 기간 수
+STATISTICS_PERIOD_BUCKETS = ('day', 'week', 'month')
 
-    if start_date and end_date:
-        # Calculate total days in the requested period
-        total_days_in_period = (end_date - start_date).days + 1
-    elif start_date:
-         # If only start_date is provided, calculate from start_date to today or a future date?
-         # For now, let's assume a period is defined by both start and end.
-         # If only one is provided, we might need clarification or a default behavior.
-         # For simplicity, if only start_date is given, we'll calculate usage from that date onwards
-         # but won't calculate 'days not used' relative to an end date.
-         pass # Handle this case later if needed
-    elif end_date:
-         # If only end_date is provided, calculate up to end_date from the beginning of records?
-         pass # Handle this case later if needed
+def usage_pairs_by_period(periods, equipment_ids=None, user_ids=None):
+    """
+    여러 기간의 (equipment_id, user_id)별 사용 일수를 예약을 한 번만 읽어서 계산
+    예약을 시작일 순으로 훑으면서(sweep) 이미 끝난 기간(종료일 < 예약 시작일)은 다시 보지 않고,
+    남은 기간 중 예약과 겹치는 기간마다 잘라낸(clamp) 일수를 더한다.
+    periods: [(시작일, 종료일), ...] (서로 겹쳐도 됨). 반환: periods 순서의 dict 리스트
+    """
+    origin = min(start for start, _ in periods)
+    last = max(end for _, end in periods)
+    # 날짜는 모두 origin 기준 오프셋(정수)으로 비교 (행마다 date 객체를 만들지 않음)
+    active = sorted(((start - origin).days, (end - origin).days, index) for index, (start, end) in enumerate(periods))
+    origin_day = func.julianday(origin)
+    source = reservation_source(origin)
+    query = db.session.query(
+        source.c.equipment_id,
+        source.c.user_id,
+        cast(func.julianday(source.c.start_date) - origin_day, db.Integer),
+        cast(func.julianday(source.c.end_date) - origin_day, db.Integer)
+    ).filter(
+        source.c.start_date <= last,
+        source.c.end_date >= origin
+    )
+    if equipment_ids is not None:
+        query = query.filter(source.c.equipment_id.in_(equipment_ids))
+    if user_ids is not None:
+        query = query.filter(source.c.user_id.in_(user_ids))
+
+    pairs = [{} for _ in periods]
+    current_start = None
+    for equipment_id, user_id, res_start, res_end in query.order_by(source.c.start_date):
+        if res_start != current_start:
+            # 예약 시작일은 커지기만 하므로 여기서 빠진 기간은 이후 예약과도 겹치지 않음
+            current_start = res_start
+            active = [period for period in active if period[1] >= res_start]
+        key = (equipment_id, user_id)
+        for period_start, period_end, index in active:
+            if period_start > res_end:
+                break # 시작일 순으로 정렬되어 있으므로 나머지 기간도 예약 이후
+            days = min(res_end, period_end) - max(res_start, period_start) + 1
+            pairs[index][key] = pairs[index].get(key, 0) + days
+    return pairs
+
+def compute_period_statistics(periods, equipment_ids=None, user_ids=None):
+    """기간마다 /api/statistics와 같은 형태의 통계를 계산 (장비/사용자 이름은 한 번만 조회)"""
+    usage_pairs = usage_pairs_by_period(periods, equipment_ids, user_ids)
+    equipment_names = dict(db.session.query(Equipment.id, Equipment.name).all())
+    user_names = dict(db.session.query(User.id, User.name).all())
+    return {'periods': [
+        build_statistics(start, end, (end - start).days + 1, pairs, equipment_names, user_names)
+        for (start, end), pairs in zip(periods, usage_pairs)
+    ]}
+
+@bp.route('/api/statistics/periods', methods=['GET'])
+@conditional_get('reservation', 'user', 'equipment')
+def get_period_statistics():
+    """
+    여러 기간의 통계를 한 번에 조회 (월별 비교 등)
+    Query Parameters (둘 중 하나):
+    - periods: 쉼표로 구분한 '시작일/종료일' 목록 (예: 2025-01-01/2025-01-31,2025-02-01/2025-02-28)
+    - start_date, end_date, bucket (day/week/month): 기간을 bucket 단위로 나눔 (첫/마지막 구간은 잘릴 수 있음)
+    - equipment_id(s), user_id(s): /api/statistics와 같은 필터
+    응답: {'periods': [/api/statistics 응답과 같은 형태, ...]} (요청한 기간 순서)
+    """
+    params, error = parse_statistics_args()
+    if error:
+        return error
+    start_date, end_date, equipment_ids, user_ids = params
+    periods_arg = request.args.get('periods')
+    bucket = request.args.get('bucket')
+
+    if periods_arg and (bucket or start_date or end_date):
+        return jsonify({'message': 'periods와 start_date/end_date/bucket은 함께 사용할 수 없습니다.'}), 400
+    if periods_arg:
+        periods = []
+        try:
+            for item in periods_arg.split(','):
+                start_str, end_str = item.split('/')
+                periods.append((date.fromisoformat(start_str.strip()), date.fromisoformat(end_str.strip())))
+        except ValueError:
+            return jsonify({'message': 'periods 형식이 잘못되었습니다. 시작일/종료일 (YYYY-MM-DD)을 쉼표로 구분해주세요.'}), 400
+    elif start_date and end_date and bucket:
+        if bucket not in STATISTICS_PERIOD_BUCKETS:
+            return jsonify({'message': f'bucket은 {", ".join(STATISTICS_PERIOD_BUCKETS)} 중 하나여야 합니다.'}), 400
+        if start_date > end_date:
+            return jsonify({'message': '시작 날짜는 종료 날짜보다 빠르거나 같아야 합니다.'}), 400
+        edges = bucket_edges(start_date, end_date, bucket)
+        bounds = edges + [(end_date - start_date).days + 1]
+        periods = [(start_date + timedelta(days=lo), start_date + timedelta(days=hi - 1))
+                   for lo, hi in zip(bounds, bounds[1:])]
     else:
-        # If no dates are provided, calculate statistics for all time
-        # Find the earliest reservation start date and the latest reservation end date
-        earliest_res = Reservation.query.order_by(Reservation.start_date).first()
-        latest_res = Reservation.query.order_by(Reservation.end_date.desc()).first()
-        if earliest_res and latest_res:
-            start_date = earliest_res.start_date
-            end_date = latest_res.end_date
-            total_days_in_period = (end_date - start_date).days + 1
-
-
-    # Initialize equipment usage with all equipment, assuming 0 used days initially
-    all_equipment = Equipment.query.all()
-    for eq in all_equipment:
-        equipment_usage[eq.name] = {
-            'used_days': 0,
-            'not_used_days': total_days_in_period if total_days_in_period > 0 else 'N/A', # N/A if no period defined
-            'users': {} # To store which users used this equipment
-        }
-
-    # Initialize user usage with all users, assuming 0 used days initially
-    all_users = User.query.all()
-    for user in all_users:
-        user_usage[user.name] = {
-            'used_days': 0,
-            'equipment': {} # To store which equipment this user used
-        }
+        return jsonify({'message': 'periods 또는 start_date, end_date, bucket이 필요합니다.'}), 400
 
+    if len(periods) > MAX_STATISTICS_PERIODS:
+        return jsonify({'message': f'기간은 최대 {MAX_STATISTICS_PERIODS}개까지 조회할 수 있습니다.'}), 400
+    if any(start > end for start, end in periods):
+        return jsonify({'message': '각 기간의 시작 날짜는 종료 날짜보다 빠르거나 같아야 합니다.'}), 400
 
-    for res in reservations:
-        res_start = res.start_date
-        res_end = res.end_date
-        user_name = res.user.name if res.user else 'Unknown User'
-        equipment_name = res.equipment.name if res.equipment else 'Unknown Equipment'
+    versions, _ = current_data_versions(('reservation', 'user', 'equipment'))
+    key = ('periods', tuple(periods), equipment_ids, user_ids, versions)
+    return jsonify(statistics_cache.get_or_compute(
+        key, lambda: compute_period_statistics(periods, equipment_ids, user_ids)))
 
-        # Calculate the overlap period between the reservation and the requested statistics period
-        # The overlap starts at the later of the reservation start date and the period start date
-        # The overlap ends at the earlier of the reservation end date and the period end date
-        overlap_start = max(res_start, start_date) if start_date else res_start
-        overlap_end = min(res_end, end_date) if end_date else res_end
+# --- 일별 점유 시계열 (장비 x 날짜 히트맵) ---
+MAX_TIMESERIES_DAYS = 731 # 한 번에 조회할 수 있는 최대 기간 (일)
+TIMESERIES_BUCKETS = ('day', 'week', 'month')
 
-        # Calculate the number of days in the overlap period
-        # Ensure overlap_start is not after overlap_end
-        if overlap_start <= overlap_end:
-            overlap_days = (overlap_end - overlap_start).days + 1
-        else:
-            overlap_days = 0 # No overlap
-
-        if overlap_days > 0:
-            # Update equipment usage
-            if equipment_name not in equipment_usage:
-                 equipment_usage[equipment_name] = {
-                    'used_days': 0,
-                    'not_used_days': total_days_in_period if total_days_in_period > 0 else 'N/A',
-                    'users': {}
-                }
-            equipment_usage[equipment_name]['used_days'] += overlap_days
-
-            # Update user usage for this equipment
-            if user_name not in equipment_usage[equipment_name]['users']:
-                equipment_usage[equipment_name]['users'][user_name] = 0
-            equipment_usage[equipment_name]['users'][user_name] += overlap_days
-
-
-            # Update user usage
-            if user_name not in user_usage:
-                 user_usage[user_name] = {
-                    'used_days': 0,
-                    'equipment': {}
-                }
-            user_usage[user_name]['used_days'] += overlap_days
-
-            # Update equipment usage for this user
-            if equipment_name not in user_usage[user_name]['equipment']:
-                user_usage[user_name]['equipment'][equipment_name] = 0
-            user_usage[user_name]['equipment'][equipment_name] += overlap_days
+@lru_cache(maxsize=None)
+def load_numpy():
+    """NumPy가 설치되어 있으면 모듈을, 없으면 None을 반환 (import 비용이 커서 처음 쓸 때 불러옴)"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+def bucket_edges(start_date, end_date, bucket):
+    """기간을 일/주(월요일 시작)/월 단위로 나눈 각 구간의 시작 오프셋(일) 목록 (첫 구간은 start_date부터)"""
+    total_days = (end_date - start_date).days + 1
+    if bucket == 'day':
+        return list(range(total_days))
+    edges = [0]
+    if bucket == 'week':
+        edges.extend(range(7 - start_date.weekday(), total_days, 7))
+        return edges
+    month = start_date.replace(day=1)
+    while True:
+        month = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+        offset = (month - start_date).days
+        if offset >= total_days:
+            return edges
+        edges.append(offset)
+
+def occupancy_by_bucket(equipment_ids, intervals, total_days, edges):
+    """
+    장비별 구간 점유 일수 행렬 (equipment_ids 순서의 행, edges 순서의 열)
+    intervals: (장비 ID, 시작 오프셋, 종료 오프셋(포함)) — 기간 밖으로 나간 값은 여기서 잘라냄
+    차분 배열(시작일 +1, 종료 다음날 -1)의 누적합이 날짜별 예약 수이므로 예약 길이와 관계없이
+    예약당 O(1)로 쌓고 장비당 한 번만 훑는다. NumPy가 있으면 전체를 배열 연산으로 처리.
+    """
+    np = load_numpy()
+    if np is not None:
+        return occupancy_by_bucket_numpy(np, equipment_ids, intervals, total_days, edges)
+
+    row_of = {equipment_id: row for row, equipment_id in enumerate(equipment_ids)}
+    diffs = [[0] * (total_days + 1) for _ in equipment_ids]
+    for equipment_id, start, end in intervals:
+        diff = diffs[row_of[equipment_id]]
+        diff[max(start, 0)] += 1
+        diff[min(end + 1, total_days)] -= 1
+
+    bounds = list(zip(edges, edges[1:] + [total_days]))
+    matrix = []
+    for diff in diffs:
+        occupied = []
+        running = 0
+        for value in diff[:total_days]:
+            running += value
+            occupied.append(running > 0)
+        matrix.append([sum(occupied[lo:hi]) for lo, hi in bounds])
+    return matrix
+
+def occupancy_by_bucket_numpy(np, equipment_ids, intervals, total_days, edges):
+    """occupancy_by_bucket()의 NumPy 구현 (bincount로 차분 배열, cumsum으로 누적, reduceat으로 구간 합)"""
+    if not equipment_ids:
+        return []
+    width = total_days + 1
+    # Row 객체 리스트를 np.array()에 바로 넘기면 행마다 시퀀스 검사를 해서 느리므로 평탄화해서 읽음
+    data = np.fromiter(chain.from_iterable(intervals), dtype=np.int64, count=3 * len(intervals)).reshape(-1, 3)
+    rows = np.searchsorted(np.array(equipment_ids, dtype=np.int64), data[:, 0])
+    starts = rows * width + np.maximum(data[:, 1], 0)
+    ends = rows * width + np.minimum(data[:, 2] + 1, total_days)
+    size = len(equipment_ids) * width
+    diff = np.bincount(starts, minlength=size) - np.bincount(ends, minlength=size)
+    daily = np.cumsum(diff.reshape(len(equipment_ids), width)[:, :total_days], axis=1)
+    return np.add.reduceat((daily > 0).astype(np.int32), edges, axis=1).tolist()
+
+def compute_timeseries(start_date, end_date, bucket, equipment_ids=None, user_ids=None):
+    """/api/statistics/timeseries 응답 dict 계산 (열 단위 배치로 반복되는 키를 줄임)"""
+    total_days = (end_date - start_date).days + 1
+    edges = bucket_edges(start_date, end_date, bucket)
+
+    equipment_query = db.session.query(Equipment.id, Equipment.name)
+    if equipment_ids is not None:
+        equipment_query = equipment_query.filter(Equipment.id.in_(equipment_ids))
+    equipment_rows = equipment_query.order_by(Equipment.id).all()
+
+    # 날짜를 기간 시작일 기준 오프셋(정수)으로 바꿔서 읽음 (행마다 date 객체를 만들지 않음)
+    origin = func.julianday(start_date)
+    source = reservation_source(start_date)
+    interval_query = db.session.query(
+        source.c.equipment_id,
+        cast(func.julianday(source.c.start_date) - origin, db.Integer),
+        cast(func.julianday(source.c.end_date) - origin, db.Integer)
+    ).filter(
+        source.c.start_date <= end_date,
+        source.c.end_date >= start_date
+    )
+    if equipment_ids is not None:
+        interval_query = interval_query.filter(source.c.equipment_id.in_(equipment_ids))
+    if user_ids is not None:
+        interval_query = interval_query.filter(source.c.user_id.in_(user_ids))
+
+    ids = [row[0] for row in equipment_rows]
+    matrix = occupancy_by_bucket(ids, interval_query.all(), total_days, edges)
+    return {
+        'period_start': start_date.isoformat(),
+        'period_end': end_date.isoformat(),
+        'bucket': bucket,
+        'buckets': [(start_date + timedelta(days=offset)).isoformat() for offset in edges],
+        'bucket_days': [hi - lo for lo, hi in zip(edges, edges[1:] + [total_days])],
+        'equipment_ids': ids,
+        'equipment_names': [row[1] for row in equipment_rows],
+        'occupied_days': matrix
+    }
+
+@bp.route('/api/statistics/timeseries', methods=['GET'])
+@conditional_get('reservation', 'equipment', by_date=True)
+def get_statistics_timeseries():
+    """
+    장비별 점유 시계열 (장비 x 기간 히트맵용)
+    Query Parameters:
+    - start_date, end_date (YYYY-MM-DD, 포함): 기본값은 올해 1월 1일 ~ 12월 31일 (최대 MAX_TIMESERIES_DAYS일)
+    - bucket: day(기본) / week / month
+    - equipment_id(s), user_id(s): /api/statistics와 같은 필터
+    응답의 occupied_days[i][j]는 equipment_ids[i] 장비가 buckets[j] 구간(bucket_days[j]일) 중 예약된 일수
+    """
+    params, error = parse_statistics_args()
+    if error:
+        return error
+    start_date, end_date, equipment_ids, user_ids = params
+    if start_date is None and end_date is None:
+        start_date = date(date.today().year, 1, 1)
+        end_date = date(date.today().year, 12, 31)
+    elif end_date is None:
+        end_date = start_date + timedelta(days=364)
+    elif start_date is None:
+        start_date = end_date - timedelta(days=364)
+    if start_date > end_date:
+        return jsonify({'message': '시작 날짜는 종료 날짜보다 빠르거나 같아야 합니다.'}), 400
+    if (end_date - start_date).days + 1 > MAX_TIMESERIES_DAYS:
+        return jsonify({'message': f'조회 기간은 최대 {MAX_TIMESERIES_DAYS}일입니다.'}), 400
+    bucket = request.args.get('bucket', 'day')
+    if bucket not in TIMESERIES_BUCKETS:
+        return jsonify({'message': f'bucket은 {", ".join(TIMESERIES_BUCKETS)} 중 하나여야 합니다.'}), 400
 
+    versions, _ = current_data_versions(('reservation', 'equipment'))
+    key = ('timeseries', start_date, end_date, bucket, equipment_ids, user_ids, versions)
+    return jsonify(statistics_cache.get_or_compute(
+        key, lambda: compute_timeseries(start_date, end_date, bucket, equipment_ids, user_ids)))
 
-    # Calculate not used days for equipment if a period was defined
-    if total_days_in_period > 0:
-        for eq_name in equipment_usage:
-            equipment_usage[eq_name]['not_used_days'] = total_days_in_period - equipment_usage[eq_name]['used_days']
+@bp.route('/api/statistics/cache', methods=['GET'])
+def get_statistics_cache_stats():
+    """통계 캐시 크기와 적중/실패 횟수 (캐시 크기 조정용)"""
+    return jsonify(statistics_cache.stats())
 
 
-    return jsonify({
-        'period_start': start_date.isoformat() if start_date else None,
-        'period_end': end_date.isoformat() if end_date else None,
-        'total_days_in_period': total_days_in_period if total_days_in_period > 0 else 'N/A',
-        'equipment_usage': equipment_usage,
-        'user_usage': user_usage
-    })
+# == 데이터 내보내기 API ==
+WEEKDAY_NAMES = ['월', '화', '수', '목', '금', '토', '일']
+EXPORT_FETCH_SIZE = 1000 # 스트리밍 내보내기에서 커서로 한 번에 읽는 행 수
 
+def usage_bucket_rows(bucket, start_date, end_date, equipment_ids=None, user_ids=None):
+    """
+    월별(bucket='month') 또는 요일별(bucket='weekday') 사용 일수를 SQL에서 집계
+    예약을 통계 기간으로 잘라 일 단위로 펼친 뒤 (구간, 장비, 사용자)별로 센다.
+    반환값: (구간, 장비명, 사용자명, 사용 일수) 행 이터레이터
+    """
+    filters = ['1 = 1']
+    params = {}
+    first_day = 'r.start_date'
+    last_day = 'r.end_date'
+    if start_date:
+        first_day = 'max(r.start_date, :start_date)'
+        filters.append('r.end_date >= :start_date')
+        params['start_date'] = start_date.isoformat()
+    if end_date:
+        last_day = 'min(r.end_date, :end_date)'
+        filters.append('r.start_date <= :end_date')
+        params['end_date'] = end_date.isoformat()
+    bind_params = []
+    if equipment_ids is not None:
+        filters.append('r.equipment_id IN :equipment_ids')
+        params['equipment_ids'] = list(equipment_ids)
+        bind_params.append(bindparam('equipment_ids', expanding=True))
+    if user_ids is not None:
+        filters.append('r.user_id IN :user_ids')
+        params['user_ids'] = list(user_ids)
+        bind_params.append(bindparam('user_ids', expanding=True))
+
+    if bucket == 'month':
+        bucket_expr = "strftime('%Y-%m', days.day)"
+    else:
+        # strftime('%w')는 0=일요일 이므로 0=월요일로 맞춤
+        bucket_expr = "(CAST(strftime('%w', days.day) AS INTEGER) + 6) % 7"
+
+    sql = text(f"""
+        WITH RECURSIVE days(equipment_id, user_id, day, last_day) AS (
+            SELECT r.equipment_id, r.user_id, {first_day}, {last_day}
+            FROM {reservation_table_sql(start_date)} r
+            WHERE {' AND '.join(filters)} AND {first_day} <= {last_day}
+            UNION ALL
+            SELECT equipment_id, user_id, date(day, '+1 day'), last_day FROM days WHERE day < last_day
+        )
+        SELECT {bucket_expr} AS bucket, e.name, u.name, COUNT(*) AS used_days
+        FROM days
+        LEFT JOIN equipment e ON e.id = days.equipment_id
+        LEFT JOIN "user" u ON u.id = days.user_id
+        GROUP BY bucket, days.equipment_id, days.user_id
+        ORDER BY bucket, e.name, u.name
+    """).bindparams(*bind_params)
+    result = db.session.execute(sql.execution_options(yield_per=EXPORT_FETCH_SIZE), params)
+    for bucket_value, equipment_name, user_name, used_days in result:
+        yield (bucket_value, equipment_name or 'Unknown Equipment', user_name or 'Unknown User', used_days)
+
+def export_records(group_by, params):
+    """
+    내보내기 형식별 (제목 행 목록, 컬럼명, 데이터 행 이터레이터)
+    equipment/user는 통계 캐시에서, raw/month/weekday는 DB 커서에서 스트리밍으로 만든다.
+    """
+    start_date, end_date, equipment_ids, user_ids = params
+
+    if group_by in ('equipment', 'user'):
+        stats_dict = cached_statistics(*params)
+        preamble = [
+            ['기간', f'{stats_dict.get("period_start", "N/A")} ~ {stats_dict.get("period_end", "N/A")}'],
+            ['총 일수', stats_dict.get("total_days_in_period", "N/A")],
+            []
+        ]
+        if group_by == 'equipment':
+            # 장비별 데이터
+            columns = ['장비명', '사용 일수', '미사용 일수', '세부 내역']
+            rows = ([equipment_name, stats.get('used_days', 0), stats.get('not_used_days', 'N/A'),
+                     ', '.join([f"{user}: {days}일" for user, days in sorted(stats.get('users', {}).items())])]
+                    for equipment_name, stats in sorted(stats_dict.get('equipment_usage', {}).items()))
+        else:
+            # 사용자별 데이터
+            columns = ['사용자명', '총 사용 일수', '세부 내역']
+            rows = ([user_name, stats.get('used_days', 0),
+                     ', '.join([f"{equipment}: {days}일" for equipment, days in sorted(stats.get('equipment', {}).items())])]
+                    for user_name, stats in sorted(stats_dict.get('user_usage', {}).items()))
+        return preamble, columns, rows
+
+    if group_by == 'raw':
+        # 예약 단위 원본 데이터 (기간과 겹치는 예약, 시작일 순)
+        source = reservation_source(start_date)
+        query = reservation_rows_query(source)
+        if start_date:
+            query = query.filter(source.c.end_date >= start_date)
+        if end_date:
+            query = query.filter(source.c.start_date <= end_date)
+        if equipment_ids is not None:
+            query = query.filter(source.c.equipment_id.in_(equipment_ids))
+        if user_ids is not None:
+            query = query.filter(source.c.user_id.in_(user_ids))
+        query = query.order_by(source.c.start_date, source.c.id).yield_per(EXPORT_FETCH_SIZE)
+        columns = ['예약 ID', '사용자 ID', '사용자명', '장비 ID', '장비명', '시작일', '종료일', '목적', '생성일시', '반복 예약 ID']
+        rows = ([res_id, user_id, user_name, equipment_id, equipment_name, start.isoformat(), end.isoformat(),
+                 purpose, created_at.isoformat() if created_at else None, series_id]
+                for res_id, user_id, user_name, equipment_id, equipment_name, start, end, purpose, created_at, series_id in query)
+        return [], columns, rows
+
+    if group_by == 'month':
+        columns = ['월', '장비명', '사용자명', '사용 일수']
+        return [], columns, (list(row) for row in usage_bucket_rows('month', *params))
+
+    # weekday
+    columns = ['요일', '장비명', '사용자명', '사용 일수']
+    return [], columns, ([WEEKDAY_NAMES[row[0]]] + list(row[1:]) for row in usage_bucket_rows('weekday', *params))
+
+class _CsvLineBuffer:
+    """csv.writer가 쓴 한 줄을 그대로 돌려주는 버퍼 (스트리밍용)"""
+    def write(self, value):
+        return value
+
+def parse_export_args():
+    """내보내기 공통 파라미터 파싱: ((통계 파라미터, group_by), None) 또는 (None, 에러 응답)"""
+    params, error = parse_statistics_args()
+    if error:
+        return None, error
+    group_by = request.args.get('group_by', 'equipment')
+    if group_by not in ('equipment', 'user', 'raw', 'month', 'weekday'):
+        return None, (jsonify({'message': 'group_by는 equipment, user, raw, month, weekday 중 하나여야 합니다.'}), 400)
+    return (params, group_by), None
 
-# == 데이터 내보내기 API ==
-@app.route('/api/export/csv', methods=['GET'])
+@bp.route('/api/export/csv', methods=['GET'])
 def export_csv():
     """
-    CSV 형식으로 통계 데이터 내보내기
+    CSV 형식으로 통계 데이터 내보내기 (행 단위 스트리밍)
     Query Parameters:
     - start_date: 시작 날짜 (YYYY-MM-DD)
     - end_date: 종료 날짜 (YYYY-MM-DD)
     - equipment_ids: 장비 ID 목록 (쉼표로 구분)
     - user_ids: 사용자 ID 목록 (쉼표로 구분)
-    - group_by: 그룹화 기준 (equipment, user, month, weekday)
+    - group_by: 그룹화 기준 (equipment, user, raw, month, weekday)
+      raw는 예약 단위 원본 데이터, month/weekday는 (월/요일, 장비, 사용자)별 사용 일수
     """
-    from io import StringIO
     import csv
-    
-    # 통계 데이터 가져오기 (statistics API와 동일한 로직 활용)
-    stats_data = get_statistics()
-    if isinstance(stats_data, tuple):  # 에러 응답인 경우
-        return stats_data
-    
-    # 응답 객체에서 JSON 데이터 추출
-    stats_dict = stats_data.get_json()
-    
-    # 그룹화 파라미터 확인
-    group_by = request.args.get('group_by', 'equipment')
-    
-    # CSV 데이터 준비
-    csv_output = StringIO()
-    csv_writer = csv.writer(csv_output)
-    
-    # 헤더 추가
-    csv_writer.writerow(['기간', f'{stats_dict.get("period_start", "N/A")} ~ {stats_dict.get("period_end", "N/A")}'])
-    csv_writer.writerow(['총 일수', stats_dict.get("total_days_in_period", "N/A")])
-    csv_writer.writerow([])
-    
-    if group_by == 'equipment':
-        # 장비별 데이터
-        csv_writer.writerow(['장비명', '사용 일수', '미사용 일수', '세부 내역'])
-        for equipment_name, stats in stats_dict.get('equipment_usage', {}).items():
-            detail = ', '.join([f"{user}: {days}일" for user, days in stats.get('users', {}).items()])
-            csv_writer.writerow([equipment_name, stats.get('used_days', 0), stats.get('not_used_days', 'N/A'), detail])
-    elif group_by == 'user':
-        # 사용자별 데이터
-        csv_writer.writerow(['사용자명', '총 사용 일수', '세부 내역'])
-        for user_name, stats in stats_dict.get('user_usage', {}).items():
-            detail = ', '.join([f"{equipment}: {days}일" for equipment, days in stats.get('equipment', {}).items()])
-            csv_writer.writerow([user_name, stats.get('used_days', 0), detail])
-    else:
-        # 기본 형식
-        csv_writer.writerow(['통계 형식이 지원되지 않습니다'])
-    
+
+    parsed, error = parse_export_args()
+    if error:  # 에러 응답인 경우
+        return error
+    params, group_by = parsed
+    preamble, columns, rows = export_records(group_by, params)
+
+    def generate():
+        writer = csv.writer(_CsvLineBuffer())
+        for row in preamble:
+            yield writer.writerow(row)
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow(row)
+
     # 응답 생성
-    response = app.response_class(
-        response=csv_output.getvalue(),
+    response = current_app.response_class(
+        response=stream_with_context(generate()),
         status=200,
         mimetype='text/csv'
     )
-    response.headers["Content-Disposition"] = f"attachment; filename=equipment_stats_{datetime.now().strftime('%Y%m%d')}.csv"
-    
+    filename = 'equipment_stats' if group_by in ('equipment', 'user') else f'reservations_{group_by}'
+    response.headers["Content-Disposition"] = f"attachment; filename={filename}_{datetime.now().strftime('%Y%m%d')}.csv"
+
+    return response
+
+@bp.route('/api/export/ndjson', methods=['GET'])
+def export_ndjson():
+    """
+    NDJSON(한 줄에 JSON 객체 하나) 형식으로 내보내기 (데이터 파이프라인용, 행 단위 스트리밍)
+    Query Parameters: /api/export/csv와 같음 (컬럼명이 각 객체의 키가 됨)
+    """
+    parsed, error = parse_export_args()
+    if error:
+        return error
+    params, group_by = parsed
+    _, columns, rows = export_records(group_by, params)
+
+    def generate():
+        for row in rows:
+            yield json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n'
+
+    response = current_app.response_class(
+        response=stream_with_context(generate()),
+        status=200,
+        mimetype='application/x-ndjson'
+    )
+    response.headers["Content-Disposition"] = f"attachment; filename=reservations_{group_by}_{datetime.now().strftime('%Y%m%d')}.ndjson"
     return response
 
-@app.route('/api/export/pdf', methods=['GET'])
+@bp.route('/api/export/pdf', methods=['GET'])
 def export_pdf():
     """
     PDF 형식으로 통계 데이터 내보내기 (서버 측에서 생성)
@@ -615,89 +3149,164 @@ def export_pdf():
         'success': False
     }), 501  # 501 Not Implemented
 
+# == 모니터링 ==
+@bp.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """요청/SQL/캐시 메트릭 (Prometheus 텍스트 형식)"""
+    lines = request_metrics.render()
+    cache = statistics_cache.stats()
+    for name, kind, help_text, value in (
+        ('statistics_cache_hits_total', 'counter', '통계 캐시 적중 수', cache['hits']),
+        ('statistics_cache_misses_total', 'counter', '통계 캐시 미스 수', cache['misses']),
+        ('statistics_cache_evictions_total', 'counter', '통계 캐시에서 밀려난 항목 수', cache['evictions']),
+        ('statistics_cache_entries', 'gauge', '통계 캐시 항목 수', cache['size']),
+        ('event_stream_subscribers', 'gauge', '열려 있는 변경 스트림 수', change_feed.subscribers),
+    ):
+        lines.extend([f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', f'{name} {value}'])
+    return current_app.response_class('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
 # === 서버 메인 페이지 리다이렉트 (옵션) ===
 # 사용자 정의 보고서 페이지 제거
-# @app.route('/custom_report')
+# @bp.route('/custom_report')
 # def custom_report_redirect():
 #     return send_from_directory(os.getcwd(), 'custom_report.html')
 
-# --- 서버 실행 ---
-if __name__ == '__main__':
-    # 애플리케이션 컨텍스트 내에서 데이터베이스 테이블 생성
-    with app.app_context():
+# --- 데이터베이스 초기화 / 예시 데이터 (CLI) ---
+def missing_schema():
+    """모델에는 있지만 DB에 없는 테이블/컬럼 이름 목록 (예: ['data_version', 'reservation.series_id'])"""
+    inspector = inspect(db.engine)
+    tables = set(inspector.get_table_names())
+    missing = []
+    for table in db.metadata.sorted_tables:
+        if table.name not in tables:
+            missing.append(table.name)
+            continue
+        columns = {column['name'] for column in inspector.get_columns(table.name)}
+        missing.extend(f'{table.name}.{column.name}' for column in table.columns if column.name not in columns)
+    return missing
+
+def run_migration_command(name, problem):
+    """
+    flask_migrate의 upgrade/stamp를 최신 리비전(head)으로 실행
+    flask db 명령이 등록되지 않은 앱(ENABLE_MIGRATIONS=False)이면 직접 실행할 명령을 알려 주는 RuntimeError
+    """
+    if 'migrate' not in current_app.extensions:
+        raise RuntimeError(f"{problem} 'FLASK_APP=app.py flask db {name} head'를 실행하세요.")
+    import flask_migrate
+    getattr(flask_migrate, name)(revision='head')
+
+def init_database():
+    """
+    스키마를 최신 리비전으로 맞추고, 롤업 테이블이 비어 있으면 기존 예약으로 백필
+    - 빈 DB: 모델로 테이블을 만들고 최신 리비전으로 표시 (flask db stamp head)
+    - 마이그레이션 기록이 있거나 테이블/컬럼이 모자란 기존 DB: 마이그레이션 적용 (flask db upgrade)
+      (마이그레이션 도입 전의 reservations.db는 기록 없이 예전 스키마라 처음 리비전부터 적용됨)
+    """
+    tables = set(inspect(db.engine).get_table_names())
+    missing = missing_schema() if tables else []
+    if 'alembic_version' in tables or missing:
+        run_migration_command('upgrade', f"예전 스키마의 데이터베이스입니다 (없는 테이블/컬럼: {', '.join(missing) or '없음'}).")
+        print("데이터베이스 마이그레이션을 적용했습니다")
+    else:
         db.create_all()
-        print("데이터베이스 테이블이 준비되었습니다 (reservations.db)")
-
-        # --- 초기 데이터 추가 ---
-        if not User.query.first(): # 사용자가 없으면 기본 사용자 추가
-            print("기본 사용자 추가 중...")
-            users = [
-                User(name='연구원A'),
-                User(name='연구원B'),
-                User(name='책임연구원')
-            ]
-            db.session.add_all(users)
-            db.session.commit()
-            print("기본 사용자 추가 완료")
-
-        if not Equipment.query.first(): # 장비가 없으면 기본 장비 추가
-            print("기본 장비 추가 중...")
-            equipment = [
-                Equipment(name='현미경 #1', description='광학 현미경'),
-                Equipment(name='원심분리기', description='샘플 분리용'),
-                Equipment(name='분광광도계', description='물질 농도 측정')
+        run_migration_command('stamp', '새로 만든 테이블을 최신 리비전으로 표시해야 합니다.')
+        print("데이터베이스 테이블이 준비되었습니다")
+
+    # 롤업 테이블이 비어 있으면 기존 예약으로 백필
+    if Reservation.query.first() and not UserMonthlyUsage.query.first():
+        rebuild_rollups()
+        print("사용량 롤업 테이블 백필 완료")
+
+def seed_demo_data():
+    """비어 있는 테이블에 기본 사용자/장비와 더미 예약을 추가"""
+    # --- 초기 데이터 추가 ---
+    if not User.query.first(): # 사용자가 없으면 기본 사용자 추가
+        print("기본 사용자 추가 중...")
+        users = [
+            User(name='연구원A'),
+            User(name='연구원B'),
+            User(name='책임연구원')
+        ]
+        db.session.add_all(users)
+        db.session.commit()
+        print("기본 사용자 추가 완료")
+
+    if not Equipment.query.first(): # 장비가 없으면 기본 장비 추가
+        print("기본 장비 추가 중...")
+        equipment = [
+            Equipment(name='현미경 #1', description='광학 현미경'),
+            Equipment(name='원심분리기', description='샘플 분리용'),
+            Equipment(name='분광광도계', description='물질 농도 측정')
+        ]
+        db.session.add_all(equipment)
+        db.session.commit()
+        print("기본 장비 추가 완료")
+
+    # --- 더미 예약 데이터 추가 ---
+    if not Reservation.query.first(): # 예약이 없으면 더미 예약 추가
+        print("더미 예약 데이터 추가 중...")
+        user_a = User.query.filter_by(name='연구원A').first()
+        user_b = User.query.filter_by(name='연구원B').first()
+        user_c = User.query.filter_by(name='책임연구원').first()
+        microscope = Equipment.query.filter_by(name='현미경 #1').first()
+        centrifuge = Equipment.query.filter_by(name='원심분리기').first()
+        spectrophotometer = Equipment.query.filter_by(name='분광광도계').first()
+
+        if user_a and user_b and user_c and microscope and centrifuge and spectrophotometer:
+            dummy_reservations = [
+                # 연구원A - 현미경 #1
+                Reservation(user_id=user_a.id, equipment_id=microscope.id, start_date=date(2024, 10, 1), end_date=date(2024, 10, 5), purpose='샘플 관찰'),
+                Reservation(user_id=user_a.id, equipment_id=microscope.id, start_date=date(2024, 11, 10), end_date=date(2024, 11, 12), purpose='실험 데이터 수집'),
+                Reservation(user_id=user_a.id, equipment_id=microscope.id, start_date=date(2025, 1, 20), end_date=date(2025, 1, 25), purpose='새 샘플 테스트'),
+
+                # 연구원B - 원심분리기
+                Reservation(user_id=user_b.id, equipment_id=centrifuge.id, start_date=date(2024, 10, 3), end_date=date(2024, 10, 3), purpose='샘플 분리'),
+                Reservation(user_id=user_b.id, equipment_id=centrifuge.id, start_date=date(2024, 12, 1), end_date=date(2024, 12, 5), purpose='대량 샘플 처리'),
+                Reservation(user_id=user_b.id, equipment_id=centrifuge.id, start_date=date(2025, 2, 15), end_date=date(2025, 2, 16), purpose='정기 유지보수 전 사용'),
+
+                # 책임연구원 - 분광광도계
+                Reservation(user_id=user_c.id, equipment_id=spectrophotometer.id, start_date=date(2024, 10, 15), end_date=date(2024, 10, 17), purpose='물질 농도 분석'),
+                Reservation(user_id=user_c.id, equipment_id=spectrophotometer.id, start_date=date(2025, 3, 1), end_date=date(2025, 3, 7), purpose='새로운 시약 테스트'),
+
+                # 연구원A - 원심분리기
+                Reservation(user_id=user_a.id, equipment_id=centrifuge.id, start_date=date(2024, 11, 5), end_date=date(2024, 11, 6), purpose='추가 샘플 분리'),
+
+                # 연구원B - 현미경 #1
+                Reservation(user_id=user_b.id, equipment_id=microscope.id, start_date=date(2025, 3, 10), end_date=date(2025, 3, 14), purpose='미세 구조 관찰'),
+
+                # 책임연구원 - 현미경 #1 (연구원B 예약 직후)
+                Reservation(user_id=user_c.id, equipment_id=microscope.id, start_date=date(2025, 3, 15), end_date=date(2025, 3, 18), purpose='긴급 분석'),
+
+                # 다양한 기간의 예약
+                Reservation(user_id=user_a.id, equipment_id=spectrophotometer.id, start_date=date(2024, 9, 1), end_date=date(2024, 9, 30), purpose='장기 프로젝트'),
+                Reservation(user_id=user_b.id, equipment_id=microscope.id, start_date=date(2024, 8, 15), end_date=date(2024, 8, 20), purpose='여름 연구'),
+                Reservation(user_id=user_c.id, equipment_id=centrifuge.id, start_date=date(2025, 4, 1), end_date=date(2025, 4, 10), purpose='봄 실험')
             ]
-            db.session.add_all(equipment)
+            db.session.add_all(dummy_reservations)
             db.session.commit()
-            print("기본 장비 추가 완료")
-
-        # --- 더미 예약 데이터 추가 ---
-        if not Reservation.query.first(): # 예약이 없으면 더미 예약 추가
-            print("더미 예약 데이터 추가 중...")
-            user_a = User.query.filter_by(name='연구원A').first()
-            user_b = User.query.filter_by(name='연구원B').first()
-            user_c = User.query.filter_by(name='책임연구원').first()
-            microscope = Equipment.query.filter_by(name='현미경 #1').first()
-            centrifuge = Equipment.query.filter_by(name='원심분리기').first()
-            spectrophotometer = Equipment.query.filter_by(name='분광광도계').first()
-
-            if user_a and user_b and user_c and microscope and centrifuge and spectrophotometer:
-                dummy_reservations = [
-                    # 연구원A - 현미경 #1
-                    Reservation(user_id=user_a.id, equipment_id=microscope.id, start_date=date(2024, 10, 1), end_date=date(2024, 10, 5), purpose='샘플 관찰'),
-                    Reservation(user_id=user_a.id, equipment_id=microscope.id, start_date=date(2024, 11, 10), end_date=date(2024, 11, 12), purpose='실험 데이터 수집'),
-                    Reservation(user_id=user_a.id, equipment_id=microscope.id, start_date=date(2025, 1, 20), end_date=date(2025, 1, 25), purpose='새 샘플 테스트'),
-
-                    # 연구원B - 원심분리기
-                    Reservation(user_id=user_b.id, equipment_id=centrifuge.id, start_date=date(2024, 10, 3), end_date=date(2024, 10, 3), purpose='샘플 분리'),
-                    Reservation(user_id=user_b.id, equipment_id=centrifuge.id, start_date=date(2024, 12, 1), end_date=date(2024, 12, 5), purpose='대량 샘플 처리'),
-                    Reservation(user_id=user_b.id, equipment_id=centrifuge.id, start_date=date(2025, 2, 15), end_date=date(2025, 2, 16), purpose='정기 유지보수 전 사용'),
-
-                    # 책임연구원 - 분광광도계
-                    Reservation(user_id=user_c.id, equipment_id=spectrophotometer.id, start_date=date(2024, 10, 15), end_date=date(2024, 10, 17), purpose='물질 농도 분석'),
-                    Reservation(user_id=user_c.id, equipment_id=spectrophotometer.id, start_date=date(2025, 3, 1), end_date=date(2025, 3, 7), purpose='새로운 시약 테스트'),
-
-                    # 연구원A - 원심분리기
-                    Reservation(user_id=user_a.id, equipment_id=centrifuge.id, start_date=date(2024, 11, 5), end_date=date(2024, 11, 6), purpose='추가 샘플 분리'),
-
-                    # 연구원B - 현미경 #1
-                    Reservation(user_id=user_b.id, equipment_id=microscope.id, start_date=date(2025, 3, 10), end_date=date(2025, 3, 14), purpose='미세 구조 관찰'),
-
-                    # 책임연구원 - 현미경 #1 (겹치는 기간)
-                    Reservation(user_id=user_c.id, equipment_id=microscope.id, start_date=date(2025, 3, 12), end_date=date(2025, 3, 15), purpose='긴급 분석'),
-
-                    # 다양한 기간의 예약
-                    Reservation(user_id=user_a.id, equipment_id=spectrophotometer.id, start_date=date(2024, 9, 1), end_date=date(2024, 9, 30), purpose='장기 프로젝트'),
-                    Reservation(user_id=user_b.id, equipment_id=microscope.id, start_date=date(2024, 8, 15), end_date=date(2024, 8, 20), purpose='여름 연구'),
-                    Reservation(user_id=user_c.id, equipment_id=centrifuge.id, start_date=date(2025, 4, 1), end_date=date(2025, 4, 10), purpose='봄 실험')
-                ]
-                db.session.add_all(dummy_reservations)
-                db.session.commit()
-                print("더미 예약 데이터 추가 완료")
-            else:
-                print("더미 예약 데이터 추가 실패: 사용자 또는 장비를 찾을 수 없습니다.")
+            rebuild_rollups() # 더미 예약도 통계에 반영
+            print("더미 예약 데이터 추가 완료")
+        else:
+            print("더미 예약 데이터 추가 실패: 사용자 또는 장비를 찾을 수 없습니다.")
+
+@bp.cli.command('init-db')
+def init_db_command():
+    """테이블 생성 및 롤업 백필 (flask init-db)"""
+    init_database()
+
+@bp.cli.command('seed-demo')
+def seed_demo_command():
+    """기본 사용자/장비/더미 예약 추가 (flask seed-demo)"""
+    seed_demo_data()
 
+# --- 개발 서버 실행 ---
+# 운영 환경에서는 wsgi.py의 application을 사용 (README 참고)
+if __name__ == '__main__':
+    app = create_app()
+    with app.app_context():
+        init_database()
+        seed_demo_data()
 
-     # 서버 실행 (네트워크 내 다른 기기에서 접속 가능하도록 host='0.0.0.0' 설정)
-    print("Flask 서버를 시작합니다...")
-    app.run(debug=True, host='0.0.0.0', port=5000) # debug=True는 개발 중에만 사용
+    # 서버 실행 (네트워크 내 다른 기기에서 접속 가능하도록 host='0.0.0.0' 설정)
+    print("Flask 개발 서버를 시작합니다...")
+    app.run(debug=os.environ.get('FLASK_DEBUG') == '1', host='0.0.0.0', port=5000, threaded=True) # 디버그/리로더는 FLASK_DEBUG=1 일 때만
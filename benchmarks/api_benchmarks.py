@@ -0,0 +1,290 @@
+"""
+API 엔드포인트 지연 시간/처리량 벤치마크
+
+datagen.py로 만든 데이터(없으면 임시 파일에 생성)의 복사본에서 Flask 테스트 클라이언트로
+각 시나리오를 반복 실행하고, 시나리오별 평균/p50/p95/최대 지연 시간과 초당 처리량을
+JSON 파일로 저장한다. 커밋 간 비교는 compare.py를 사용한다.
+
+시나리오:
+- reservations_month_view        GET /api/reservations (한 달 범위, FullCalendar 월 보기)
+- reservations_month_view_equipment  같은 조회 + equipment_id 필터
+- add_reservation_conflict       POST /api/reservations (기존 예약과 겹쳐 409)
+- add_reservation_created        POST /api/reservations (빈 기간에 생성, 201)
+- update_reservation_conflict    PUT /api/reservations/<id> (다른 예약과 겹쳐 409)
+- add_reservation_replay         같은 Idempotency-Key로 POST 재시도 (첫 요청 후 저장된 응답 재생)
+- statistics_<범위>_cold/warm    GET /api/statistics (week/month_to_date/month/quarter/year/all, 캐시 비움/적중)
+- export_csv_equipment / export_csv_raw  GET /api/export/csv (스트리밍 본문까지 모두 읽음)
+- delete_user_cascade / delete_equipment_cascade  DELETE /api/users|equipment/<id>
+
+사용법:
+    python benchmarks/api_benchmarks.py --scale small
+    python benchmarks/api_benchmarks.py --scale large --db /tmp/bench-large.db --iterations 50 \\
+        --output benchmarks/results/large.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from datagen import SCALES, generate  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='API 엔드포인트 벤치마크')
+    parser.add_argument('--scale', choices=SCALES, default='small', help='데이터 규모 프리셋')
+    parser.add_argument('--db', help='datagen.py로 만든 DB 파일 (없으면 이 경로에 생성, 생략하면 임시 파일)')
+    parser.add_argument('--iterations', type=int, default=30, help='시나리오당 측정 횟수')
+    parser.add_argument('--warmup', type=int, default=3, help='시나리오당 측정 전 실행 횟수')
+    parser.add_argument('--seed', type=int, default=0, help='데이터/요청 난수 시드')
+    parser.add_argument('--only', help='실행할 시나리오 이름 접두사 (쉼표로 구분)')
+    parser.add_argument('--output', help='결과 JSON 경로 (기본값: benchmarks/results/<시각>-<커밋>.json)')
+    return parser.parse_args()
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, check=True,
+                              capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(samples, statuses):
+    samples_ms = sorted(sample * 1000 for sample in samples)
+    total = sum(samples)
+    return {
+        'iterations': len(samples),
+        'mean_ms': round(statistics.fmean(samples_ms), 3),
+        'p50_ms': round(statistics.median(samples_ms), 3),
+        'p95_ms': round(samples_ms[min(len(samples_ms) - 1, int(len(samples_ms) * 0.95))], 3),
+        'max_ms': round(samples_ms[-1], 3),
+        'ops_per_sec': round(len(samples) / total, 1) if total else None,
+        'status_codes': {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+class Runner:
+    """시나리오 하나를 warmup + iterations 회 실행하고 결과를 모음"""
+
+    def __init__(self, client, iterations, warmup, only=None):
+        self.client = client
+        self.iterations = iterations
+        self.warmup = warmup
+        self.only = only
+        self.results = {}
+
+    def wanted(self, name):
+        return not self.only or any(name.startswith(prefix) for prefix in self.only)
+
+    def run(self, name, make_request, before_each=None, iterations=None, warmup=None):
+        """make_request(i) -> (method, url, json body 또는 None)"""
+        if not self.wanted(name):
+            return
+        iterations = self.iterations if iterations is None else iterations
+        warmup = self.warmup if warmup is None else warmup
+        samples = []
+        statuses = Counter()
+        for i in range(warmup + iterations):
+            method, url, body, *headers = make_request(i)
+            if before_each:
+                before_each()
+            started = time.perf_counter()
+            response = self.client.open(url, method=method, json=body, headers=headers[0] if headers else None)
+            response.get_data() # 스트리밍 응답도 끝까지 읽음
+            elapsed = time.perf_counter() - started
+            if i >= warmup:
+                samples.append(elapsed)
+                statuses[response.status_code] += 1
+        self.results[name] = summarize(samples, statuses)
+        result = self.results[name]
+        print(f"{name:40s} p50 {result['p50_ms']:9.2f} ms  p95 {result['p95_ms']:9.2f} ms  "
+              f"{result['ops_per_sec']:8.1f} ops/s  {result['status_codes']}")
+
+
+def load_fixtures(db_path, seed, count):
+    """요청에 쓸 실제 ID/날짜를 DB에서 미리 골라 둠 (측정 시간에 포함되지 않도록)"""
+    rng = random.Random(seed)
+    today = date.today().isoformat()
+    with sqlite3.connect(db_path) as conn:
+        bounds = conn.execute('SELECT MIN(start_date), MAX(end_date) FROM reservation').fetchone()
+        future = conn.execute(
+            'SELECT id, user_id, equipment_id, start_date, end_date FROM reservation '
+            'WHERE start_date >= ? ORDER BY equipment_id, start_date LIMIT ?', (today, count * 20)
+        ).fetchall()
+        user_ids = [row[0] for row in conn.execute('SELECT id FROM user ORDER BY id')]
+        equipment_ids = [row[0] for row in conn.execute('SELECT id FROM equipment ORDER BY id')]
+    # 같은 장비의 연속한 미래 예약 쌍 (앞 예약을 뒤 예약 기간으로 옮기면 충돌)
+    pairs = [(a, b) for a, b in zip(future, future[1:]) if a[2] == b[2]]
+    rng.shuffle(future)
+    rng.shuffle(pairs)
+    return {
+        'first_day': date.fromisoformat(bounds[0]),
+        'last_day': date.fromisoformat(bounds[1]),
+        'future': future,
+        'pairs': pairs,
+        'user_ids': user_ids,
+        'equipment_ids': equipment_ids,
+        'rng': rng,
+    }
+
+
+def run_benchmarks(app, db_path, runner, seed):
+    statistics_cache = app.extensions['reservations'].statistics_cache
+
+    fx = load_fixtures(db_path, seed, runner.warmup + runner.iterations)
+    rng = fx['rng']
+    total = runner.warmup + runner.iterations
+    today = date.today()
+
+    # --- 월 보기 조회 ---
+    months = []
+    month = date(fx['first_day'].year, fx['first_day'].month, 1)
+    while month <= fx['last_day']:
+        months.append(month)
+        month = (month + timedelta(days=32)).replace(day=1)
+    view_months = [rng.choice(months) for _ in range(total)]
+    view_equipment = [rng.choice(fx['equipment_ids']) for _ in range(total)]
+
+    def month_url(i):
+        start = view_months[i]
+        end = (start + timedelta(days=32)).replace(day=1)
+        return f'/api/reservations?start={start.isoformat()}&end={end.isoformat()}'
+
+    runner.run('reservations_month_view', lambda i: ('GET', month_url(i), None))
+    runner.run('reservations_month_view_equipment',
+               lambda i: ('GET', month_url(i) + f'&equipment_id={view_equipment[i]}', None))
+
+    # --- 예약 추가/수정 충돌 검사 ---
+    def conflicting_post(i):
+        _, user_id, equipment_id, start, end = fx['future'][i % len(fx['future'])]
+        return 'POST', '/api/reservations', {'user_id': user_id, 'equipment_id': equipment_id,
+                                             'start_date': start, 'end_date': end}
+
+    def conflicting_put(i):
+        (res_id, user_id, equipment_id, _, _), (_, _, _, start, end) = fx['pairs'][i % len(fx['pairs'])]
+        return 'PUT', f'/api/reservations/{res_id}', {'user_id': user_id, 'equipment_id': equipment_id,
+                                                      'start_date': start, 'end_date': end}
+
+    # 데이터 범위가 끝난 뒤의 날짜에 장비별로 겹치지 않게 생성
+    free_start = max(fx['last_day'], today) + timedelta(days=10)
+
+    def created_post(i):
+        equipment_id = fx['equipment_ids'][i % len(fx['equipment_ids'])]
+        day = free_start + timedelta(days=2 * (i // len(fx['equipment_ids'])))
+        return 'POST', '/api/reservations', {'user_id': fx['user_ids'][i % len(fx['user_ids'])],
+                                             'equipment_id': equipment_id,
+                                             'start_date': day.isoformat(), 'end_date': day.isoformat()}
+
+    if fx['future']:
+        runner.run('add_reservation_conflict', conflicting_post)
+    runner.run('add_reservation_created', created_post)
+    if fx['pairs']:
+        runner.run('update_reservation_conflict', conflicting_put)
+
+    # 클라이언트 재시도: 첫 요청만 처리되고 나머지는 저장된 응답을 재생
+    replay_request = created_post(total + len(fx['equipment_ids']))
+    runner.run('add_reservation_replay', lambda i: replay_request + ({'Idempotency-Key': 'bench-replay'},))
+
+    # --- 통계 (캐시를 비운 계산 / 캐시 적중) ---
+    ranges = {
+        'week': (today - timedelta(days=6), today),
+        'month_to_date': (today.replace(day=1), today),
+        'month': (today.replace(day=1), (today.replace(day=1) + timedelta(days=32)).replace(day=1) - timedelta(days=1)),
+        'quarter': (today - timedelta(days=90), today),
+        'year': (today - timedelta(days=365), today),
+        'all': (None, None),
+    }
+    for label, (start, end) in ranges.items():
+        params = '&'.join(f'{key}={value.isoformat()}' for key, value in (('start_date', start), ('end_date', end)) if value)
+        url = '/api/statistics' + (f'?{params}' if params else '')
+        runner.run(f'statistics_{label}_cold', lambda i, url=url: ('GET', url, None), before_each=statistics_cache.clear)
+        runner.run(f'statistics_{label}_warm', lambda i, url=url: ('GET', url, None))
+    year_months = f"start_date={(today - timedelta(days=364)).isoformat()}&end_date={today.isoformat()}&bucket=month"
+    runner.run('statistics_periods_year_month_cold', lambda i: ('GET', f'/api/statistics/periods?{year_months}', None),
+               before_each=statistics_cache.clear)
+    for bucket in ('day', 'month'):
+        url = f"/api/statistics/timeseries?start_date={(today - timedelta(days=364)).isoformat()}&end_date={today.isoformat()}&bucket={bucket}"
+        runner.run(f'timeseries_year_{bucket}_cold', lambda i, url=url: ('GET', url, None), before_each=statistics_cache.clear)
+
+    # --- CSV 내보내기 ---
+    year_start = (today - timedelta(days=365)).isoformat()
+    month_start = (today - timedelta(days=30)).isoformat()
+    runner.run('export_csv_equipment',
+               lambda i: ('GET', f'/api/export/csv?group_by=equipment&start_date={year_start}&end_date={today.isoformat()}', None),
+               before_each=statistics_cache.clear)
+    runner.run('export_csv_raw',
+               lambda i: ('GET', f'/api/export/csv?group_by=raw&start_date={month_start}&end_date={today.isoformat()}', None))
+
+    # --- 연쇄 삭제 (데이터를 지우므로 마지막에, 서로 다른 ID로) ---
+    delete_count = min(runner.iterations, 20)
+    users = fx['user_ids'][-(delete_count + 1):]
+    equipment = fx['equipment_ids'][-(delete_count + 1):]
+    runner.run('delete_user_cascade', lambda i: ('DELETE', f'/api/users/{users[i]}', None),
+               iterations=delete_count, warmup=1)
+    runner.run('delete_equipment_cascade', lambda i: ('DELETE', f'/api/equipment/{equipment[i]}', None),
+               iterations=delete_count, warmup=1)
+
+
+def main():
+    args = parse_args()
+    scale = SCALES[args.scale]
+    sys.path.insert(0, ROOT)
+    from app import create_app
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = args.db or os.path.join(tmp, 'source.db')
+        if not os.path.exists(source):
+            generate(source, scale, args.seed)
+        # 쓰기 시나리오가 원본을 바꾸지 않도록 복사본에서 실행
+        db_path = os.path.join(tmp, 'run.db')
+        with sqlite3.connect(source) as src, sqlite3.connect(db_path) as dst:
+            src.backup(dst)
+
+        app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + db_path, 'ENABLE_MIGRATIONS': False})
+        runner = Runner(app.test_client(), args.iterations, args.warmup,
+                        only=args.only.split(',') if args.only else None)
+        started = time.perf_counter()
+        run_benchmarks(app, db_path, runner, args.seed)
+        elapsed = time.perf_counter() - started
+
+    commit = git_commit()
+    report = {
+        'meta': {
+            'commit': commit,
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'scale': args.scale,
+            'data': scale,
+            'seed': args.seed,
+            'iterations': args.iterations,
+            'warmup': args.warmup,
+            'elapsed_seconds': round(elapsed, 1),
+        },
+        'benchmarks': runner.results,
+    }
+    output = args.output or os.path.join(
+        ROOT, 'benchmarks', 'results',
+        f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{commit or 'nogit'}-{args.scale}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"결과 저장: {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+콜드 스타트 벤치마크
+
+새 파이썬 프로세스에서 app을 import하고 create_app()으로 앱을 만든 뒤
+첫 요청(GET /api/equipment)에 응답하기까지의 시간을 여러 번 재서 중앙값을 보고한다.
+웹 워커 설정(ENABLE_MIGRATIONS=False)과 CLI 설정(flask_migrate 로드)을 비교할 수 있다.
+
+사용법:
+    python benchmarks/cold_start.py --runs 10
+    python benchmarks/cold_start.py --runs 10 --with-migrations
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 자식 프로세스에서 실행할 측정 코드
+CHILD_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+from app import create_app
+imported = time.perf_counter()
+app = create_app({{'SQLALCHEMY_DATABASE_URI': {uri!r}, 'ENABLE_MIGRATIONS': {migrations!r}}})
+created = time.perf_counter()
+response = app.test_client().get('/api/equipment')
+answered = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({{
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'first_request_ms': (answered - created) * 1000,
+    'total_ms': (answered - started) * 1000,
+    'alembic_loaded': 'alembic' in sys.modules
+}}))
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='콜드 스타트 벤치마크')
+    parser.add_argument('--runs', type=int, default=10, help='측정 횟수 (프로세스 수)')
+    parser.add_argument('--with-migrations', action='store_true', help='flask_migrate를 등록한 앱으로 측정')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        uri = 'sqlite:///' + os.path.join(tmp, 'cold_start.db')
+        sys.path.insert(0, ROOT)
+        from app import create_app, db
+        with create_app({'SQLALCHEMY_DATABASE_URI': uri, 'ENABLE_MIGRATIONS': False}).app_context():
+            db.create_all()
+
+        script = CHILD_SCRIPT.format(root=ROOT, uri=uri, migrations=args.with_migrations)
+        samples = []
+        for _ in range(args.runs):
+            output = subprocess.run([sys.executable, '-c', script], check=True,
+                                    capture_output=True, text=True, cwd=tmp).stdout
+            samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    result = {'runs': args.runs, 'with_migrations': args.with_migrations,
+              'alembic_loaded': samples[0]['alembic_loaded']}
+    for key in ('import_ms', 'create_app_ms', 'first_request_ms', 'total_ms'):
+        result[key + '_median'] = round(statistics.median(sample[key] for sample in samples), 1)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+두 벤치마크 결과(JSON)를 비교
+
+시나리오별 p50 지연 시간 변화를 표로 출력하고, threshold(기본 20%)보다 느려진
+시나리오가 있으면 종료 코드 1을 반환한다 (CI에서 회귀 검사용).
+
+사용법:
+    python benchmarks/compare.py benchmarks/results/before.json benchmarks/results/after.json
+    python benchmarks/compare.py before.json after.json --metric p95_ms --threshold 0.1
+"""
+import argparse
+import json
+import sys
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='벤치마크 결과 비교')
+    parser.add_argument('baseline', help='기준 결과 JSON')
+    parser.add_argument('candidate', help='비교할 결과 JSON')
+    parser.add_argument('--metric', default='p50_ms', choices=['mean_ms', 'p50_ms', 'p95_ms', 'max_ms'],
+                        help='비교할 지연 시간 지표')
+    parser.add_argument('--threshold', type=float, default=0.2, help='회귀로 볼 상대 증가율 (0.2 = 20%%)')
+    return parser.parse_args()
+
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    args = parse_args()
+    baseline = load(args.baseline)
+    candidate = load(args.candidate)
+    if baseline['meta'].get('data') != candidate['meta'].get('data'):
+        print(f"경고: 데이터 규모가 다릅니다 ({baseline['meta'].get('data')} vs {candidate['meta'].get('data')})")
+
+    print(f"{'시나리오':40s} {'기준':>10s} {'비교':>10s} {'변화':>8s}  "
+          f"({baseline['meta'].get('commit')} -> {candidate['meta'].get('commit')}, {args.metric})")
+    regressions = []
+    for name in sorted(set(baseline['benchmarks']) | set(candidate['benchmarks'])):
+        before = baseline['benchmarks'].get(name, {}).get(args.metric)
+        after = candidate['benchmarks'].get(name, {}).get(args.metric)
+        if before is None or after is None:
+            print(f"{name:40s} {before or '-':>10} {after or '-':>10} {'':>8s}")
+            continue
+        change = (after - before) / before if before else 0.0
+        flag = ''
+        if change > args.threshold:
+            flag = '  <- 회귀'
+            regressions.append(name)
+        print(f"{name:40s} {before:10.2f} {after:10.2f} {change:+8.1%}{flag}")
+
+    if regressions:
+        print(f"{len(regressions)}개 시나리오가 {args.threshold:.0%} 넘게 느려졌습니다: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
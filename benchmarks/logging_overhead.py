@@ -0,0 +1,100 @@
+"""
+요청 경로 로깅 오버헤드 마이크로벤치마크
+
+예전 방식(print로 stdout에 바로 쓰기)과 구조화 로깅(큐 핸들러 + 리스너 스레드)이
+요청 스레드에서 차지하는 호출당 시간을 비교한다. 로깅 호출은 실제 요청 컨텍스트
+(GET /api/reservations) 안에서 측정하므로 엔드포인트 필터와 샘플링 비용까지 포함된다.
+출력은 모두 같은 임시 파일로 보낸다 (리스너가 파일에 쓰는 시간은 요청 경로 밖이라 따로 보고).
+--stall-ms를 주면 쓰기마다 그만큼 멈추는 출력(가득 찬 파이프, 느린 디스크/원격 로그 수집기)으로도
+비교한다. print는 그 시간을 요청 스레드가 그대로 기다리고, 큐 로깅은 리스너 스레드만 기다린다.
+
+사용법:
+    python benchmarks/logging_overhead.py
+    python benchmarks/logging_overhead.py --calls 200000
+    python benchmarks/logging_overhead.py --calls 2000 --stall-ms 1
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StalledStream:
+    """쓰기마다 지정한 시간만큼 멈추는 출력 스트림"""
+
+    def __init__(self, stream, stall_seconds):
+        self.stream = stream
+        self.stall_seconds = stall_seconds
+
+    def write(self, data):
+        time.sleep(self.stall_seconds)
+        return self.stream.write(data)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='요청 경로 로깅 오버헤드 측정')
+    parser.add_argument('--calls', type=int, default=50_000, help='시나리오별 호출 횟수')
+    parser.add_argument('--stall-ms', type=float, default=0, help='출력 쓰기마다 추가할 지연 (밀리초)')
+    return parser.parse_args()
+
+
+def measure(func, calls):
+    started = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - started) / calls * 1e6 # 호출당 마이크로초
+
+
+def main():
+    args = parse_args()
+    sys.path.insert(0, ROOT)
+    import app as app_module
+
+    start_date, end_date = date(2025, 1, 1), date(2025, 1, 4)
+    fields = {'fields': {'reservation_id': 1, 'equipment_id': 1, 'start': start_date, 'end': end_date}}
+    per_call = {}
+    drain = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        log_file = open(os.path.join(tmp, 'out.log'), 'w', encoding='utf-8')
+        sink = StalledStream(log_file, args.stall_ms / 1000) if args.stall_ms else log_file
+
+        # 예전 코드: 요청마다 print (콘솔/PYTHONUNBUFFERED 환경처럼 줄마다 flush되는 경우와 블록 버퍼링 경우)
+        per_call['print_flush'] = measure(
+            lambda: print(f"Adding reservation from {start_date} to {end_date}", file=sink, flush=True), args.calls)
+        if not args.stall_ms: # StalledStream은 버퍼가 없어 블록 버퍼링 비교가 의미 없음
+            per_call['print_buffered'] = measure(
+                lambda: print(f"Adding reservation from {start_date} to {end_date}", file=sink), args.calls)
+
+        uri = 'sqlite:///' + os.path.join(tmp, 'bench.db')
+        for name, rates in (('log_info_queued', {}),
+                            ('log_info_sampled_out', {'get_reservations': 0.0}),
+                            ('log_debug_disabled', {})):
+            app = app_module.create_app({'SQLALCHEMY_DATABASE_URI': uri, 'ENABLE_MIGRATIONS': False,
+                                         'LOG_LEVEL': 'INFO', 'LOG_SAMPLE_RATES': rates})
+            app_module._log_listener.handlers[0].setStream(sink)
+            log = app_module.logger.debug if name == 'log_debug_disabled' else app_module.logger.info
+            with app.test_request_context('/api/reservations?start=2025-01-01&end=2025-02-01'):
+                per_call[name] = measure(lambda: log('예약 추가', extra=fields), args.calls)
+            drain_started = time.perf_counter()
+            app_module.stop_log_listener() # 큐에 남은 레코드를 리스너가 모두 쓸 때까지 대기
+            drain[name] = (time.perf_counter() - drain_started) * 1000
+        log_file.close()
+
+    print(json.dumps({
+        'calls': args.calls,
+        'stall_ms': args.stall_ms,
+        'us_per_call': {name: round(value, 3) for name, value in per_call.items()},
+        'listener_drain_ms': {name: round(value, 1) for name, value in drain.items()}
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""
+예약 목록 JSON 직렬화 벤치마크
+
+GET /api/reservations 응답을 만드는 두 단계(행 -> dict, dict -> JSON 응답 본문)를
+예전 방식과 현재 방식으로 나눠 측정한다. DB 조회는 한 번만 하고 같은 행으로 비교한다.
+    before          행마다 isoformat() 3번 + Flask 기본 프로바이더(표준 json, 키 정렬)
+    after_stdlib    reservation_rows_to_dicts() + ReservationJSONProvider(표준 json, 키 정렬 없음)
+    after_orjson    reservation_rows_to_dicts()(날짜 그대로) + ReservationJSONProvider(orjson, 설치된 경우)
+
+사용법:
+    python benchmarks/serialization.py
+    python benchmarks/serialization.py --reservations 50000 --repeat 5
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='예약 목록 JSON 직렬화 시간 측정')
+    parser.add_argument('--reservations', type=int, default=50_000, help='직렬화할 예약 수')
+    parser.add_argument('--repeat', type=int, default=5, help='시나리오별 반복 횟수 (가장 빠른 값을 보고)')
+    return parser.parse_args()
+
+
+def legacy_row_to_dict(row):
+    """변경 전 reservation_row_to_dict (날짜를 행마다 ISO 문자열로 변환)"""
+    res_id, user_id, user_name, equipment_id, equipment_name, start_date, end_date, purpose, created_at, series_id = row
+    return {
+        'id': res_id,
+        'user_id': user_id,
+        'user_name': user_name,
+        'equipment_id': equipment_id,
+        'equipment_name': equipment_name,
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'purpose': purpose,
+        'created_at': created_at.isoformat(),
+        'series_id': series_id
+    }
+
+
+def best_of(func, repeat):
+    best, result = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    args = parse_args()
+    sys.path.insert(0, ROOT)
+    from datagen import generate
+    import app as app_module
+    from flask.json.provider import DefaultJSONProvider
+
+    scale = {'users': 1_000, 'equipment': 200, 'reservations': args.reservations}
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        app = generate(os.path.join(tmp, 'bench.db'), scale, verbose=False)
+        with app.app_context():
+            fetch_ms, rows = best_of(lambda: app_module.reservation_rows_query().order_by(
+                app_module.Reservation.start_date).all(), args.repeat)
+
+            scenarios = [('before', lambda: [legacy_row_to_dict(row) for row in rows], DefaultJSONProvider(app)),
+                         ('after_stdlib', lambda: app_module.reservation_rows_to_dicts(rows),
+                          app_module.ReservationJSONProvider(app, 'stdlib'))]
+            if app_module.load_orjson():
+                scenarios.append(('after_orjson', lambda: app_module.reservation_rows_to_dicts(rows),
+                                  app_module.ReservationJSONProvider(app, 'orjson')))
+            bodies = {}
+            for name, build, provider in scenarios:
+                app.json = provider # reservation_rows_to_dicts()는 현재 인코더에 맞춰 날짜 형태를 고름
+                build_ms, items = best_of(build, args.repeat)
+                encode_ms, response = best_of(lambda: provider.response(items), args.repeat)
+                bodies[name] = response.get_data()
+                results[name] = {
+                    'build_ms': round(build_ms, 1),
+                    'encode_ms': round(encode_ms, 1),
+                    'total_ms': round(build_ms + encode_ms, 1),
+                    'bytes': len(bodies[name])
+                }
+            # 키 순서/이스케이프만 다르고 내용은 같아야 함
+            expected = json.loads(bodies['before'])
+            for name, body in bodies.items():
+                results[name]['same_as_before'] = json.loads(body) == expected
+            app_module.db.engine.dispose()
+
+    print(json.dumps({
+        'reservations': len(rows),
+        'fetch_ms': round(fetch_ms, 1),
+        'serialization': results,
+        'speedup': {name: round(results['before']['total_ms'] / result['total_ms'], 2)
+                    for name, result in results.items() if name != 'before'}
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+예약 동시성 스트레스 벤치마크
+
+임시 SQLite DB로 app.py를 멀티스레드 서버로 띄운 뒤, 여러 클라이언트 스레드가
+동시에 POST /api/reservations 를 보내고 다음을 보고한다.
+- 처리량 (요청/초)과 상태 코드별 건수
+- 같은 장비에서 기간이 겹치는 예약 쌍의 수 (항상 0이어야 함)
+
+사용법:
+    python benchmarks/stress_booking.py --threads 16 --requests 2000 --equipment 4
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DOUBLE_BOOKING_SQL = """
+SELECT COUNT(*)
+FROM reservation a
+JOIN reservation b
+  ON a.equipment_id = b.equipment_id
+ AND a.id < b.id
+ AND a.start_date <= b.end_date
+ AND b.start_date <= a.end_date
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='예약 동시성 스트레스 벤치마크')
+    parser.add_argument('--threads', type=int, default=16, help='동시에 요청을 보내는 클라이언트 스레드 수')
+    parser.add_argument('--requests', type=int, default=2000, help='전체 예약 요청 수')
+    parser.add_argument('--equipment', type=int, default=4, help='예약 대상 장비 수')
+    parser.add_argument('--days', type=int, default=60, help='예약 시작일을 고르는 기간 (오늘부터 일 수)')
+    parser.add_argument('--seed', type=int, default=0, help='난수 시드')
+    return parser.parse_args()
+
+
+def start_server(db_path):
+    """임시 DB를 쓰는 app을 멀티스레드 서버로 띄우고 (서버, 포트) 반환"""
+    sys.path.insert(0, ROOT)
+    from app import create_app, db
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietRequestHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + db_path, 'ENABLE_MIGRATIONS': False})
+    with app.app_context():
+        db.create_all()
+
+    server = make_server('127.0.0.1', 0, app, threaded=True, request_handler=QuietRequestHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_port
+
+
+def request_json(port, method, path, body=None):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    try:
+        conn.request(method, path, body=json.dumps(body) if body is not None else None,
+                     headers={'Content-Type': 'application/json'})
+        response = conn.getresponse()
+        return response.status, json.loads(response.read() or b'null')
+    finally:
+        conn.close()
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'stress.db')
+        server, port = start_server(db_path)
+
+        _, user = request_json(port, 'POST', '/api/users', {'name': '스트레스 사용자'})
+        equipment_ids = [request_json(port, 'POST', '/api/equipment', {'name': f'장비 {i + 1}'})[1]['id']
+                         for i in range(args.equipment)]
+
+        today = date.today()
+        payloads = []
+        for _ in range(args.requests):
+            start = today + timedelta(days=rng.randrange(args.days))
+            payloads.append({
+                'user_id': user['id'],
+                'equipment_id': rng.choice(equipment_ids),
+                'start_date': start.isoformat(),
+                'end_date': (start + timedelta(days=rng.randrange(3))).isoformat(),
+                'purpose': 'stress'
+            })
+
+        def book(payload):
+            status, _ = request_json(port, 'POST', '/api/reservations', payload)
+            return status
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            statuses = Counter(pool.map(book, payloads))
+        elapsed = time.perf_counter() - started
+        server.shutdown()
+
+        with sqlite3.connect(db_path) as conn:
+            stored = conn.execute('SELECT COUNT(*) FROM reservation').fetchone()[0]
+            double_bookings = conn.execute(DOUBLE_BOOKING_SQL).fetchone()[0]
+
+    result = {
+        'threads': args.threads,
+        'requests': args.requests,
+        'equipment': args.equipment,
+        'elapsed_seconds': round(elapsed, 3),
+        'requests_per_second': round(args.requests / elapsed, 1),
+        'status_counts': {str(code): count for code, count in sorted(statuses.items())},
+        'stored_reservations': stored,
+        'double_bookings': double_bookings
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0 if double_bookings == 0 and stored == statuses.get(201, 0) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
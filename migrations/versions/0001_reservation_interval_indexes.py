@@ -0,0 +1,37 @@
+"""reservation interval indexes
+
+예약 기간 중복 검사, 캘린더 기간 조회, 통계 기간 조회에서 사용하는
+equipment_id/user_id/start_date/end_date 복합 인덱스를 추가한다.
+
+기존 reservations.db 는 db.create_all() 로 만들어졌으므로 인덱스가 이미 있는
+경우(새로 create_all 한 DB)에도 안전하도록 if_not_exists 를 사용한다.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_reservation_equipment_dates', 'reservation',
+                    ['equipment_id', 'start_date', 'end_date'], unique=False, if_not_exists=True)
+    op.create_index('ix_reservation_user_start', 'reservation',
+                    ['user_id', 'start_date'], unique=False, if_not_exists=True)
+    op.create_index('ix_reservation_end_start', 'reservation',
+                    ['end_date', 'start_date'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_reservation_end_start', table_name='reservation', if_exists=True)
+    op.drop_index('ix_reservation_user_start', table_name='reservation', if_exists=True)
+    op.drop_index('ix_reservation_equipment_dates', table_name='reservation', if_exists=True)
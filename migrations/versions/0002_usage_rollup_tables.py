@@ -0,0 +1,65 @@
+"""usage rollup tables
+
+장비별 일자별 점유(equipment_daily_usage)와 사용자-장비별 월간 사용 일수
+(user_monthly_usage) 롤업 테이블을 만들고 기존 예약으로 백필한다.
+이후에는 예약 쓰기 경로가 같은 트랜잭션에서 갱신하며,
+`flask rebuild-rollups` 로 언제든 다시 만들 수 있다.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+EXPAND_DAYS = """
+    WITH RECURSIVE days(equipment_id, user_id, day, end_date) AS (
+        SELECT equipment_id, user_id, start_date, end_date FROM reservation WHERE start_date <= end_date
+        UNION ALL
+        SELECT equipment_id, user_id, date(day, '+1 day'), end_date FROM days WHERE day < end_date
+    )
+"""
+
+
+def upgrade():
+    op.create_table('equipment_daily_usage',
+        sa.Column('equipment_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('reserved_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('equipment_id', 'day'),
+        if_not_exists=True
+    )
+    op.create_table('user_monthly_usage',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('equipment_id', sa.Integer(), nullable=False),
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column('used_days', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'equipment_id', 'month'),
+        if_not_exists=True
+    )
+
+    # 기존 예약으로 백필
+    op.execute("DELETE FROM equipment_daily_usage")
+    op.execute("DELETE FROM user_monthly_usage")
+    op.execute(EXPAND_DAYS + """
+        INSERT INTO equipment_daily_usage (equipment_id, day, reserved_count)
+        SELECT equipment_id, day, COUNT(*) FROM days GROUP BY equipment_id, day
+    """)
+    op.execute(EXPAND_DAYS + """
+        INSERT INTO user_monthly_usage (user_id, equipment_id, month, used_days)
+        SELECT user_id, equipment_id, date(day, 'start of month'), COUNT(*) FROM days
+        GROUP BY user_id, equipment_id, date(day, 'start of month')
+    """)
+
+
+def downgrade():
+    op.drop_table('user_monthly_usage')
+    op.drop_table('equipment_daily_usage')
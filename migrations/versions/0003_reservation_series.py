@@ -0,0 +1,50 @@
+"""reservation series
+
+반복 예약 규칙 테이블(reservation_series)과 예약의 series_id 컬럼을 추가한다.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('reservation_series',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('equipment_id', sa.Integer(), nullable=False),
+        sa.Column('frequency', sa.String(length=10), nullable=False),
+        sa.Column('interval', sa.Integer(), nullable=False),
+        sa.Column('weekdays', sa.String(length=20), nullable=True),
+        sa.Column('duration_days', sa.Integer(), nullable=False),
+        sa.Column('start_date', sa.Date(), nullable=False),
+        sa.Column('until_date', sa.Date(), nullable=False),
+        sa.Column('purpose', sa.String(length=200), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['equipment_id'], ['equipment.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('reservation', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('series_id', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_reservation_series_id'), ['series_id'], unique=False)
+        batch_op.create_foreign_key('fk_reservation_series_id', 'reservation_series', ['series_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('reservation', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_reservation_series_id', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_reservation_series_id'))
+        batch_op.drop_column('series_id')
+
+    op.drop_table('reservation_series')
@@ -0,0 +1,28 @@
+"""reservation start/id index
+
+예약 목록 커서 페이지네이션(ORDER BY start_date, id 와 (start_date, id) > (?, ?) 탐색)에
+쓰는 인덱스를 추가한다.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_reservation_start_id', 'reservation',
+                    ['start_date', 'id'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_reservation_start_id', table_name='reservation', if_exists=True)
@@ -0,0 +1,28 @@
+"""reservation start-date covering index
+
+시작일 순으로 기간과 겹치는 예약을 훑는 조회(여러 기간 통계 스윕, 점유 시계열, 기간 필터만 있는
+예약 목록)가 테이블을 다시 읽지 않도록 (start_date, end_date, equipment_id, user_id) 인덱스를 추가한다.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_reservation_start_cover', 'reservation',
+                    ['start_date', 'end_date', 'equipment_id', 'user_id'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index('ix_reservation_start_cover', table_name='reservation', if_exists=True)
@@ -0,0 +1,60 @@
+"""reservation archive
+
+지난 예약을 옮겨 두는 보관 테이블(reservation_archive)을 추가한다.
+예약은 flask archive-reservations 명령이 옮기며, 이 리비전은 테이블만 만든다.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('reservation_archive',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('equipment_id', sa.Integer(), nullable=False),
+        sa.Column('start_date', sa.Date(), nullable=False),
+        sa.Column('end_date', sa.Date(), nullable=False),
+        sa.Column('purpose', sa.String(length=200), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('series_id', sa.Integer(), nullable=True),
+        sa.Column('archived_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['equipment_id'], ['equipment.id'], ),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('reservation_archive', schema=None) as batch_op:
+        batch_op.create_index('ix_reservation_archive_start_cover', ['start_date', 'end_date', 'equipment_id', 'user_id'], unique=False)
+        batch_op.create_index('ix_reservation_archive_end', ['end_date'], unique=False)
+        batch_op.create_index('ix_reservation_archive_equipment_start', ['equipment_id', 'start_date'], unique=False)
+        batch_op.create_index('ix_reservation_archive_user_start', ['user_id', 'start_date'], unique=False)
+        batch_op.create_index(batch_op.f('ix_reservation_archive_series_id'), ['series_id'], unique=False)
+
+
+def downgrade():
+    # 보관된 예약을 잃지 않도록 테이블을 지우기 전에 reservation으로 되돌림
+    op.execute("""
+        INSERT INTO reservation (id, user_id, equipment_id, start_date, end_date, purpose, created_at, series_id)
+        SELECT id, user_id, equipment_id, start_date, end_date, purpose, created_at,
+               CASE WHEN series_id IN (SELECT id FROM reservation_series) THEN series_id END
+        FROM reservation_archive
+    """)
+    with op.batch_alter_table('reservation_archive', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_reservation_archive_series_id'))
+        batch_op.drop_index('ix_reservation_archive_user_start')
+        batch_op.drop_index('ix_reservation_archive_equipment_start')
+        batch_op.drop_index('ix_reservation_archive_end')
+        batch_op.drop_index('ix_reservation_archive_start_cover')
+
+    op.drop_table('reservation_archive')
@@ -0,0 +1,82 @@
+"""cascade foreign keys and soft delete
+
+예약/반복 규칙/보관된 예약의 user_id, equipment_id 외래 키를 ON DELETE CASCADE로,
+reservation.series_id를 ON DELETE SET NULL로 바꾸고 user/equipment에 deleted_at(소프트 삭제) 컬럼을 추가한다.
+SQLite는 외래 키를 ALTER로 바꿀 수 없어 batch 모드로 테이블을 다시 만든다 (인덱스는 반영된 그대로 복원).
+재생성 중에는 env.py가 외래 키 검사를 꺼 두므로, 끝난 뒤 PRAGMA foreign_key_check로 위반이 없는지 확인한다.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+# 이름 없이 만들어진 외래 키를 batch 모드에서 이름으로 지울 수 있게 함
+NAMING_CONVENTION = {'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+# (테이블, 컬럼, 참조 테이블, ON DELETE)
+OWNER_FOREIGN_KEYS = [
+    ('reservation_series', 'user_id', 'user', 'CASCADE'),
+    ('reservation_series', 'equipment_id', 'equipment', 'CASCADE'),
+    ('reservation', 'user_id', 'user', 'CASCADE'),
+    ('reservation', 'equipment_id', 'equipment', 'CASCADE'),
+    ('reservation_archive', 'user_id', 'user', 'CASCADE'),
+    ('reservation_archive', 'equipment_id', 'equipment', 'CASCADE'),
+]
+
+
+def rebuild_foreign_keys(table_name, with_ondelete):
+    """table_name의 user/equipment(reservation은 series 포함) 외래 키를 다시 만듦 (with_ondelete=False면 예전 정의로)"""
+    with op.batch_alter_table(table_name, schema=None, recreate='always',
+                              naming_convention=NAMING_CONVENTION) as batch_op:
+        for table, column, referred, ondelete in OWNER_FOREIGN_KEYS:
+            if table != table_name:
+                continue
+            name = f'fk_{table}_{column}_{referred}'
+            batch_op.drop_constraint(name, type_='foreignkey')
+            batch_op.create_foreign_key(name, referred, [column], ['id'],
+                                        ondelete=ondelete if with_ondelete else None)
+        if table_name == 'reservation':
+            batch_op.drop_constraint('fk_reservation_series_id', type_='foreignkey')
+            batch_op.create_foreign_key('fk_reservation_series_id', 'reservation_series', ['series_id'], ['id'],
+                                        ondelete='SET NULL' if with_ondelete else None)
+
+
+def check_foreign_keys():
+    violations = op.get_bind().exec_driver_sql('PRAGMA foreign_key_check').fetchall()
+    if violations:
+        raise RuntimeError(f'외래 키 위반이 있습니다 (table, rowid, parent, fkid): {violations[:10]}')
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+    with op.batch_alter_table('equipment', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+    rebuild_foreign_keys('reservation_series', True)
+    rebuild_foreign_keys('reservation', True)
+    rebuild_foreign_keys('reservation_archive', True)
+    check_foreign_keys()
+
+
+def downgrade():
+    rebuild_foreign_keys('reservation_archive', False)
+    rebuild_foreign_keys('reservation', False)
+    rebuild_foreign_keys('reservation_series', False)
+
+    # 소프트 삭제된 사용자/장비는 다시 일반 사용자/장비로 보임
+    with op.batch_alter_table('equipment', schema=None) as batch_op:
+        batch_op.drop_column('deleted_at')
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('deleted_at')
+    check_foreign_keys()
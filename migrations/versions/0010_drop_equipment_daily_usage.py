@@ -0,0 +1,45 @@
+"""drop equipment daily usage
+
+장비별 일자별 점유 롤업(equipment_daily_usage)을 삭제한다. 읽는 곳이 없었고,
+예약을 쓸 때마다 예약 일수만큼 upsert하는 비용만 들었다.
+통계는 user_monthly_usage와 원본 예약으로 계산한다.
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.drop_table('equipment_daily_usage')
+
+
+def downgrade():
+    op.create_table('equipment_daily_usage',
+        sa.Column('equipment_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('reserved_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('equipment_id', 'day')
+    )
+    # 예전 코드가 읽을 수 있도록 원본/보관된 예약으로 다시 백필
+    op.execute("""
+        WITH RECURSIVE days(equipment_id, day, end_date) AS (
+            SELECT equipment_id, start_date, end_date FROM reservation WHERE start_date <= end_date
+            UNION ALL
+            SELECT equipment_id, start_date, end_date FROM reservation_archive WHERE start_date <= end_date
+            UNION ALL
+            SELECT equipment_id, date(day, '+1 day'), end_date FROM days WHERE day < end_date
+        )
+        INSERT INTO equipment_daily_usage (equipment_id, day, reserved_count)
+        SELECT equipment_id, day, COUNT(*) FROM days GROUP BY equipment_id, day
+    """)
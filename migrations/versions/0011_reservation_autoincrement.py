@@ -0,0 +1,42 @@
+"""reservation autoincrement
+
+reservation을 AUTOINCREMENT 테이블로 다시 만들어 id가 단조 증가하게 한다.
+AUTOINCREMENT가 없으면 SQLite는 새 id를 MAX(rowid) + 1로 정하므로, 보관(reservation_archive)되거나
+삭제된 예약의 id가 새 예약에 다시 쓰일 수 있다. sqlite_sequence는 두 테이블의 가장 큰 id로 맞춘다.
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('reservation', schema=None, recreate='always',
+                              table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        pass
+    op.execute("DELETE FROM sqlite_sequence WHERE name = 'reservation'")
+    op.execute("""
+        INSERT INTO sqlite_sequence (name, seq)
+        SELECT 'reservation', MAX(id) FROM (
+            SELECT MAX(id) AS id FROM reservation
+            UNION ALL
+            SELECT MAX(id) FROM reservation_archive
+        ) HAVING MAX(id) IS NOT NULL
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('reservation', schema=None, recreate='always',
+                              table_kwargs={'sqlite_autoincrement': False}) as batch_op:
+        pass
+    op.execute("DELETE FROM sqlite_sequence WHERE name = 'reservation'")
@@ -0,0 +1,57 @@
+"""user daily usage
+
+사용자-장비별 일간 사용 일수 롤업(user_daily_usage, WITHOUT ROWID)을 추가하고 원본/보관된 예약으로 백필한다.
+통계 기간 앞뒤의 일부 달을 원본 예약 대신 이 테이블에서 읽는다.
+user_monthly_usage에는 달 범위 조회용 인덱스를 추가한다 (기본 키는 user_id가 앞이라 전체를 훑었음).
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0012'
+down_revision = '0011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_daily_usage',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('equipment_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('used_days', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'equipment_id', 'user_id'),
+        sqlite_with_rowid=False
+    )
+    with op.batch_alter_table('user_daily_usage', schema=None) as batch_op:
+        batch_op.create_index('ix_user_daily_usage_user', ['user_id'], unique=False)
+    with op.batch_alter_table('user_monthly_usage', schema=None) as batch_op:
+        batch_op.create_index('ix_user_monthly_usage_month', ['month', 'equipment_id', 'user_id', 'used_days'], unique=False)
+
+    # 원본/보관된 예약으로 백필
+    op.execute("""
+        WITH RECURSIVE days(equipment_id, user_id, day, end_date) AS (
+            SELECT equipment_id, user_id, start_date, end_date FROM reservation WHERE start_date <= end_date
+            UNION ALL
+            SELECT equipment_id, user_id, start_date, end_date FROM reservation_archive WHERE start_date <= end_date
+            UNION ALL
+            SELECT equipment_id, user_id, date(day, '+1 day'), end_date FROM days WHERE day < end_date
+        )
+        INSERT INTO user_daily_usage (day, equipment_id, user_id, used_days)
+        SELECT day, equipment_id, user_id, COUNT(*) FROM days GROUP BY day, equipment_id, user_id
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('user_monthly_usage', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_monthly_usage_month')
+    with op.batch_alter_table('user_daily_usage', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_daily_usage_user')
+
+    op.drop_table('user_daily_usage')
@@ -384,7 +384,7 @@ document.addEventListener('DOMContentLoaded', function() {
 
         if (result) {
             closeModal();
-            calendar.refetchEvents();
+            refreshCalendarIfOffline();
         }
         // Error message handled within postData/putData
     });
@@ -398,7 +398,7 @@ document.addEventListener('DOMContentLoaded', function() {
             const result = await deleteData(`${API_BASE_URL}/reservations/${reservationId}`);
             if (result) {
                 closeModal();
-                calendar.refetchEvents();
+                refreshCalendarIfOffline();
             }
         }
     });
@@ -411,6 +411,35 @@ document.addEventListener('DOMContentLoaded', function() {
         return `${year}-${month}-${day}`;
     };
 
+    // Convert an API reservation item into a FullCalendar event object
+    function toCalendarEvent(item) {
+        // API provides inclusive start_date and end_date (YYYY-MM-DD)
+        // FullCalendar's 'end' date is exclusive. Add 1 day to the inclusive end date.
+        const endDateForCalendar = new Date(item.end_date);
+        endDateForCalendar.setDate(endDateForCalendar.getDate() + 1);
+
+        return {
+            id: item.id,
+            title: `${item.equipment_name} - ${item.user_name}`,
+            start: item.start_date, // Use YYYY-MM-DD directly from API
+            end: formatYmdLocal(endDateForCalendar), // Format the adjusted date
+            allDay: true,
+            // Store original data and IDs in extendedProps
+            extendedProps: {
+                user_id: item.user_id,
+                user_name: item.user_name,
+                equipment_id: item.equipment_id,
+                equipment_name: item.equipment_name,
+                start_date: item.start_date, // Store original inclusive start
+                end_date: item.end_date,     // Store original inclusive end
+                purpose: item.purpose
+            },
+            // Apply color based on equipment ID here
+            backgroundColor: getEquipmentColor(item.equipment_id).bg,
+            borderColor: getEquipmentColor(item.equipment_id).border
+        };
+    }
+
     // --- FullCalendar Instantiation ---
     let calendar = new FullCalendar.Calendar(calendarEl, {
         initialView: 'dayGridMonth',
@@ -442,33 +471,7 @@ document.addEventListener('DOMContentLoaded', function() {
                     return response.json();
                 })
                 .then(data => {
-                    const events = data.map(item => {
-                        // API provides inclusive start_date and end_date (YYYY-MM-DD)
-                        // FullCalendar's 'end' date is exclusive. Add 1 day to the inclusive end date.
-                        const endDateForCalendar = new Date(item.end_date);
-                        endDateForCalendar.setDate(endDateForCalendar.getDate() + 1);
-
-                        return {
-                            id: item.id,
-                            title: `${item.equipment_name} - ${item.user_name}`,
-                            start: item.start_date, // Use YYYY-MM-DD directly from API
-                            end: formatYmdLocal(endDateForCalendar), // Format the adjusted date
-                            allDay: true,
-                            // Store original data and IDs in extendedProps
-                            extendedProps: {
-                                user_id: item.user_id,
-                                user_name: item.user_name,
-                                equipment_id: item.equipment_id,
-                                equipment_name: item.equipment_name,
-                                start_date: item.start_date, // Store original inclusive start
-                                end_date: item.end_date,     // Store original inclusive end
-                                purpose: item.purpose
-                            },
-                            // Apply color based on equipment ID here
-                            backgroundColor: getEquipmentColor(item.equipment_id).bg,
-                            borderColor: getEquipmentColor(item.equipment_id).border
-                        };
-                    });
+                    const events = data.map(toCalendarEvent);
                     successCallback(events);
                 })
                 .catch(error => {
@@ -529,6 +532,55 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     loadInitialData();
+
+    // --- 실시간 변경 반영 (Server-Sent Events) ---
+    // 다른 사용자의 예약 추가/수정/삭제를 받아 달력에 바로 반영 (전체 기간을 다시 조회하지 않음)
+    const changeStream = new EventSource(`${API_BASE_URL}/events/stream`);
+
+    function matchesFilters(item) {
+        const eqId = equipmentFilter.value;
+        const userId = userFilter.value;
+        return (!eqId || String(item.equipment_id) === eqId) && (!userId || String(item.user_id) === userId);
+    }
+
+    function removeCalendarEvents(predicate) {
+        calendar.getEvents().filter(predicate).forEach(event => event.remove());
+    }
+
+    changeStream.addEventListener('reservation', (e) => {
+        const { op, data } = JSON.parse(e.data);
+        const existing = calendar.getEventById(String(data.id));
+        if (existing) existing.remove();
+        if (op !== 'delete' && matchesFilters(data)) {
+            // 함수형 이벤트 소스에 붙여야 다음 refetchEvents() 때 중복되지 않음
+            calendar.addEvent(toCalendarEvent(data), calendar.getEventSources()[0]);
+        }
+    });
+
+    changeStream.addEventListener('equipment', (e) => {
+        const { op, data } = JSON.parse(e.data);
+        // 소프트 삭제(soft)면 지난 예약은 남아 있으므로 지우지 않고 현재 범위를 다시 조회
+        if (op === 'delete' && data.soft) calendar.refetchEvents();
+        else if (op === 'delete') removeCalendarEvents(event => event.extendedProps.equipment_id === data.id);
+        loadInitialData();
+    });
+
+    changeStream.addEventListener('user', (e) => {
+        const { op, data } = JSON.parse(e.data);
+        if (op === 'delete' && data.soft) calendar.refetchEvents();
+        else if (op === 'delete') removeCalendarEvents(event => event.extendedProps.user_id === data.id);
+        loadInitialData();
+    });
+
+    // 서버가 재개 지점을 잃어버린 경우 (재시작 등) 현재 범위를 다시 조회
+    changeStream.addEventListener('reset', () => calendar.refetchEvents());
+
+    // 스트림이 연결되어 있으면 자신의 변경도 스트림으로 반영되므로 다시 조회하지 않음
+    function refreshCalendarIfOffline() {
+        if (changeStream.readyState !== EventSource.OPEN) {
+            calendar.refetchEvents();
+        }
+    }
     // --- 관리 섹션 토글 기능 (모바일 전용) ---
     // 이 기능은 모바일 뷰 (lg 미만)에서만 시각적으로 의미가 있습니다.
     // 데스크탑에서는 lg:block 클래스 때문에 hidden이 적용되어도 내용이 보입니다.
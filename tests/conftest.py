@@ -0,0 +1,73 @@
+import os
+import sys
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import Equipment, Reservation, User, create_app, db  # noqa: E402
+
+
+def add_reservations(count, equipment_count=3, user_count=3):
+    """오늘부터 장비마다 이틀짜리 예약을 사흘 간격으로 count개 추가 (서로 겹치지 않음)"""
+    today = date.today()
+    db.session.add_all(Reservation(user_id=i % user_count + 1, equipment_id=i % equipment_count + 1,
+                                   start_date=today + timedelta(days=i // equipment_count * 3),
+                                   end_date=today + timedelta(days=i // equipment_count * 3 + 1),
+                                   purpose='test')
+                       for i in range(count))
+    db.session.commit()
+
+
+@pytest.fixture
+def app(tmp_path):
+    """임시 파일 DB를 쓰는 앱 (사용자/장비 3개씩, 예약 없음)"""
+    app = create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'test.db'),
+                      'ENABLE_MIGRATIONS': False})
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([User(name=f'user{i}') for i in range(1, 4)] +
+                           [Equipment(name=f'equipment{i}') for i in range(1, 4)])
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+class StatementRecorder:
+    """블록 안에서 앱 엔진으로 실행된 SQL 문을 기록 (before_cursor_execute)"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters))
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+
+    @property
+    def selects(self):
+        return [(statement, parameters) for statement, parameters in self.statements
+                if statement.lstrip().upper().startswith(('SELECT', 'WITH'))]
+
+
+@pytest.fixture
+def record_sql(app):
+    """with record_sql() as sql: ... 형태로 요청 중의 SQL 문을 모음"""
+    def recorder():
+        with app.app_context():
+            return StatementRecorder(db.engine)
+    return recorder
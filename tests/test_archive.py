@@ -0,0 +1,118 @@
+"""
+지난 예약 보관 (archive_reservations): 보관 전후로 통계/내보내기/롤업이 같고, 캘린더/중복 검사는 reservation 테이블만 읽음
+"""
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import func
+
+from app import Reservation, ReservationArchive, archive_reservations, db, rebuild_rollups
+from conftest import add_reservations
+from test_rollups import assert_rollups_match_reservations, rollup_rows
+
+TODAY = date.today()
+CUTOFF = TODAY - timedelta(days=100)
+OLD_COUNT = 12
+
+
+def day(offset):
+    return (TODAY + timedelta(days=offset)).isoformat()
+
+
+@pytest.fixture
+def history(app):
+    """앞으로의 예약 30개 + 기준일 이전에 끝난 예약 12개 (가장 큰 id는 지난 예약)"""
+    with app.app_context():
+        add_reservations(30)
+        db.session.add_all(Reservation(user_id=i % 3 + 1, equipment_id=i % 3 + 1,
+                                       start_date=TODAY - timedelta(days=400 - i * 20),
+                                       end_date=TODAY - timedelta(days=390 - i * 20), purpose='old')
+                           for i in range(OLD_COUNT))
+        # 기준일에 걸쳐 끝나는 예약은 옮기지 않음
+        db.session.add(Reservation(user_id=1, equipment_id=2, start_date=CUTOFF - timedelta(days=5),
+                                   end_date=CUTOFF, purpose='edge'))
+        db.session.add(Reservation(user_id=2, equipment_id=3, start_date=TODAY - timedelta(days=500),
+                                   end_date=TODAY - timedelta(days=499), purpose='old'))
+        db.session.commit()
+        rebuild_rollups()
+        return db.session.query(func.max(Reservation.id)).scalar()
+
+
+def snapshot(client):
+    """보관 여부와 관계없이 같아야 하는 응답"""
+    responses = {}
+    for url in ('/api/statistics',
+                f'/api/statistics?start_date={day(-450)}&end_date={day(30)}',
+                f'/api/statistics?start_date={day(-200)}&end_date={day(-150)}&equipment_id=2'):
+        responses[url] = client.get(url).get_json()
+    for group_by in ('raw', 'month', 'user'):
+        url = f'/api/export/ndjson?start_date={day(-450)}&end_date={day(100)}&group_by={group_by}'
+        responses[url] = sorted(client.get(url).get_data(as_text=True).splitlines())
+    return responses
+
+
+def test_archive_keeps_statistics_export_and_rollups(app, client, history):
+    before = snapshot(client)
+    with app.app_context():
+        rollups = rollup_rows()
+        moved = archive_reservations(CUTOFF, batch_size=5)  # 여러 배치로 나눠 옮김
+        assert moved == OLD_COUNT + 1
+        assert ReservationArchive.query.count() == OLD_COUNT + 1
+        assert Reservation.query.filter(Reservation.end_date < CUTOFF).count() == 0
+        assert Reservation.query.filter_by(purpose='edge').count() == 1
+        assert rollup_rows() == rollups
+        # 다시 실행하면 옮길 것이 없음
+        assert archive_reservations(CUTOFF, batch_size=5) == 0
+
+    assert snapshot(client) == before
+    assert_rollups_match_reservations(app)
+
+    # 기간이 보관된 구간에 닿는 캘린더 조회는 보관된 예약도 보여줌
+    calendar = client.get(f'/api/reservations?start={day(-400)}&end={day(-380)}').get_json()
+    assert [item['purpose'] for item in calendar] == ['old']
+
+
+def test_recent_reads_touch_only_hot_table(app, client, record_sql, history):
+    with app.app_context():
+        archive_reservations(CUTOFF, batch_size=100)
+
+    with record_sql() as sql:
+        calendar = client.get(f'/api/reservations?start={day(0)}&end={day(30)}')
+        conflicts = client.get(f'/api/reservations/conflicts?equipment_id=1&start_date={day(0)}&end_date={day(3)}')
+        created = client.post('/api/reservations', json={
+            'user_id': 1, 'equipment_id': 1, 'start_date': day(200), 'end_date': day(201)})
+    assert calendar.status_code == 200 and len(calendar.get_json()) == 30
+    assert conflicts.get_json()['conflict']
+    assert created.status_code == 201
+
+    # 보관 테이블은 워터마크(가장 늦은 종료일) 조회로만 읽음
+    archive_reads = [statement for statement, _ in sql.statements if 'reservation_archive' in statement]
+    assert archive_reads and all('max(reservation_archive.end_date)' in statement for statement in archive_reads)
+
+
+def test_future_cutoff_is_rejected(app, history):
+    with app.app_context():
+        with pytest.raises(ValueError):
+            archive_reservations(TODAY + timedelta(days=1), batch_size=10)
+        assert ReservationArchive.query.count() == 0
+
+
+def test_archived_reservation_delete_and_ids(app, client, history):
+    max_id = history
+    with app.app_context():
+        archive_reservations(CUTOFF, batch_size=100)
+        assert db.session.get(ReservationArchive, max_id) is not None
+        archived_id = ReservationArchive.query.filter_by(purpose='old').first().id
+
+    # 보관된 예약의 id는 새 예약에 다시 쓰이지 않음 (AUTOINCREMENT)
+    response = client.post('/api/reservations', json={
+        'user_id': 1, 'equipment_id': 1, 'start_date': day(300), 'end_date': day(300)})
+    assert response.status_code == 201
+    assert response.get_json()['id'] > max_id
+
+    # 보관된 예약도 삭제할 수 있고 롤업에서 빠짐
+    assert client.delete(f'/api/reservations/{archived_id}').status_code == 200
+    with app.app_context():
+        assert db.session.get(ReservationArchive, archived_id) is None
+    assert client.delete(f'/api/reservations/{archived_id}').status_code == 404
+    assert_rollups_match_reservations(app)
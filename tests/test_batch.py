@@ -0,0 +1,96 @@
+"""
+POST /api/reservations/batch: 전부 아니면 전무(all_or_nothing)와 best_effort, 항목별 409 보고
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from app import Reservation
+
+TODAY = date.today()
+# 사용자 IN, 장비 IN, 기존 예약 범위, 생성된 예약 JOIN (항목 수와 관계없음)
+BATCH_SELECTS = 4
+
+
+def item(user_id, equipment_id, start, end=None):
+    return {'user_id': user_id, 'equipment_id': equipment_id,
+            'start_date': (TODAY + timedelta(days=start)).isoformat(),
+            'end_date': (TODAY + timedelta(days=start if end is None else end)).isoformat()}
+
+
+@pytest.fixture
+def existing(client):
+    """장비 1의 5~7일 뒤 예약"""
+    response = client.post('/api/reservations', json=item(1, 1, 5, 7))
+    assert response.status_code == 201
+    return response.get_json()['id']
+
+
+def reservation_count(app):
+    with app.app_context():
+        return Reservation.query.count()
+
+
+def test_all_or_nothing_reports_conflicts_and_saves_nothing(app, client, existing):
+    response = client.post('/api/reservations/batch', json={'reservations': [
+        item(2, 2, 1, 3),
+        item(2, 1, 7, 8),   # 기존 예약과 마지막 날이 겹침
+        item(3, 2, 3, 4),   # 배치 안의 0번 항목과 겹침 (시작일이 빠른 0번이 우선)
+        item(3, 3, 1),
+    ]})
+
+    assert response.status_code == 409
+    body = response.get_json()
+    assert body['created'] == 0 and body['failed'] == 2
+    results = {result['index']: result for result in body['results']}
+    assert set(results) == {1, 2}
+    assert results[1]['status_code'] == 409 and results[1]['conflict_reservation_id'] == existing
+    assert results[2]['status_code'] == 409 and results[2]['conflict_index'] == 0
+    assert reservation_count(app) == 1
+
+
+def test_all_or_nothing_validation_error_is_400(app, client, existing):
+    response = client.post('/api/reservations/batch', json={'reservations': [
+        item(2, 2, 1), item(99, 2, 2), item(2, 1, 6)]})
+
+    assert response.status_code == 400
+    codes = {result['index']: result['status_code'] for result in response.get_json()['results']}
+    assert codes == {1: 404, 2: 409}
+    assert reservation_count(app) == 1
+
+
+def test_best_effort_saves_valid_items(app, client, existing):
+    response = client.post('/api/reservations/batch', json={'mode': 'best_effort', 'reservations': [
+        item(2, 1, 6),      # 기존 예약과 겹침
+        item(2, 2, 1, 2),
+        item(3, 2, 2, 3),   # 1번 항목과 겹침
+        {'user_id': 1, 'equipment_id': 3, 'start_date': 'not-a-date', 'end_date': 'x'},
+        item(3, 3, 10, 12),
+    ]})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['created'] == 2 and body['failed'] == 3
+    statuses = [(result['index'], result['status'], result['status_code']) for result in body['results']]
+    assert statuses == [(0, 'error', 409), (1, 'created', 201), (2, 'error', 409), (3, 'error', 400), (4, 'created', 201)]
+    created = body['results'][4]['reservation']
+    assert created['user_name'] == 'user3' and created['equipment_name'] == 'equipment3'
+    assert reservation_count(app) == 3
+
+    # 저장된 항목은 구간 인덱스에도 반영되어 바로 충돌로 잡힘
+    response = client.post('/api/reservations', json=item(1, 3, 12, 14))
+    assert response.status_code == 409
+    assert response.get_json()['conflict_reservation']['id'] == created['id']
+
+
+@pytest.mark.parametrize('count', [3, 30])
+def test_batch_select_count_does_not_grow(app, client, record_sql, count):
+    items = [item(i % 3 + 1, i % 3 + 1, i // 3 * 2) for i in range(count)]
+
+    with record_sql() as sql:
+        response = client.post('/api/reservations/batch', json={'reservations': items})
+
+    assert response.status_code == 201
+    assert response.get_json()['created'] == count
+    assert reservation_count(app) == count
+    assert len(sql.selects) == BATCH_SELECTS, sql.selects
@@ -0,0 +1,75 @@
+"""
+동시 예약 요청 (스레드마다 테스트 클라이언트, 임시 파일 DB)
+
+WAL + BEGIN IMMEDIATE + 장비별 잠금으로 "database is locked" 없이 모두 201/409로 끝나고,
+같은 장비의 같은 기간은 정확히 한 요청만 예약해야 한다.
+"""
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from app import db
+
+THREADS = 16
+SLOTS = 60 # (장비, 날짜) 조합 수
+REQUESTS_PER_SLOT = 4
+
+
+def test_parallel_posts_without_lock_errors(app):
+    first_day = date.today() + timedelta(days=1)
+    slots = [(slot % 3 + 1, first_day + timedelta(days=slot // 3)) for slot in range(SLOTS)]
+    requests = [slot for slot in slots for _ in range(REQUESTS_PER_SLOT)]
+
+    def post(args):
+        index, (equipment_id, day) = args
+        client = app.test_client()
+        if index % 8 == 0: # 쓰기 사이사이에 읽기도 섞음
+            assert client.get('/api/reservations').status_code == 200
+        response = client.post('/api/reservations', json={
+            'user_id': index % 3 + 1, 'equipment_id': equipment_id,
+            'start_date': day.isoformat(), 'end_date': day.isoformat()})
+        return response.status_code, response.get_data(as_text=True)
+
+    with ThreadPoolExecutor(THREADS) as executor:
+        results = list(executor.map(post, enumerate(requests)))
+
+    statuses = [status for status, _ in results]
+    assert not [body for _, body in results if 'database is locked' in body]
+    assert set(statuses) <= {201, 409}, [result for result in results if result[0] not in (201, 409)][:3]
+    assert statuses.count(201) == SLOTS
+
+    with app.app_context():
+        assert db.session.execute(text('SELECT COUNT(*) FROM reservation')).scalar() == SLOTS
+        double_booked = db.session.execute(text("""
+            SELECT COUNT(*) FROM reservation a JOIN reservation b
+              ON a.equipment_id = b.equipment_id AND a.id < b.id
+             AND a.start_date <= b.end_date AND b.start_date <= a.end_date
+        """)).scalar()
+        assert double_booked == 0
+
+
+def test_deletes_wait_for_equipment_lock(app, client):
+    today = date.today().isoformat()
+    created = client.post('/api/reservations', json={'user_id': 1, 'equipment_id': 1,
+                                                     'start_date': today, 'end_date': today}).get_json()
+    series = client.post('/api/reservations/series', json={
+        'user_id': 2, 'equipment_id': 2, 'frequency': 'daily', 'start_date': today,
+        'until_date': (date.today() + timedelta(days=5)).isoformat()}).get_json()
+    locks = app.extensions['reservations'].equipment_locks
+
+    for equipment_id, url in ((1, f"/api/reservations/{created['id']}"), (2, f"/api/reservations/series/{series['id']}")):
+        with ThreadPoolExecutor(1) as executor:
+            with locks.hold(equipment_id):
+                pending = executor.submit(lambda: app.test_client().delete(url).status_code)
+                # 장비 잠금을 쥐고 있는 동안에는 삭제가 끝나지 않음 (DB 쓰기 잠금도 잡지 않아 다른 쓰기를 막지 않음)
+                done, _ = wait([pending], timeout=0.3)
+                assert not done
+                assert client.post('/api/reservations', json={'user_id': 3, 'equipment_id': 3, 'start_date': today,
+                                                              'end_date': today}).status_code in (201, 409)
+            assert pending.result(timeout=10) == 200
+
+    # 삭제가 구간 인덱스에도 반영되어 같은 기간을 다시 예약할 수 있음
+    for equipment_id in (1, 2):
+        assert client.post('/api/reservations', json={'user_id': 3, 'equipment_id': equipment_id,
+                                                      'start_date': today, 'end_date': today}).status_code == 201
@@ -0,0 +1,116 @@
+"""
+사용자/장비 삭제: 기본 모드의 외래 키 CASCADE와 SOFT_DELETE 모드
+
+어느 모드든 삭제 후의 롤업은 남은 예약으로 다시 만든 롤업(rebuild_rollups)과 같아야 한다.
+"""
+from datetime import date, timedelta
+
+from sqlalchemy import select
+
+from app import (Reservation, ReservationArchive, User, UserDailyUsage, UserMonthlyUsage, archive_reservations, db,
+                 rebuild_rollups)
+from conftest import add_reservations
+
+
+def add_past_reservations(count, days_ago=60):
+    """days_ago일 전부터 add_reservations()와 같은 배치로 지난 예약 count개 추가"""
+    start = date.today() - timedelta(days=days_ago)
+    db.session.add_all(Reservation(user_id=i % 3 + 1, equipment_id=i % 3 + 1,
+                                   start_date=start + timedelta(days=i // 3 * 3),
+                                   end_date=start + timedelta(days=i // 3 * 3 + 1),
+                                   purpose='past')
+                       for i in range(count))
+    db.session.commit()
+
+
+def rollup_rows():
+    return (sorted(db.session.execute(select(UserMonthlyUsage.__table__)).all()),
+            sorted(db.session.execute(select(UserDailyUsage.__table__)).all()))
+
+
+def assert_rollups_match_reservations():
+    """롤업을 남은 예약(보관 포함)으로 다시 만들어도 바뀌지 않음"""
+    before = rollup_rows()
+    rebuild_rollups()
+    assert rollup_rows() == before
+
+
+def test_hard_delete_user_cascades(app, client):
+    with app.app_context():
+        add_past_reservations(30, days_ago=400)
+        add_reservations(30)
+        rebuild_rollups()
+        assert archive_reservations(date.today() - timedelta(days=300), 10) > 0
+        # 장비 1의 구간 인덱스를 미리 불러 둠 (오늘은 사용자 1의 예약과 겹침)
+        conflicts = client.get('/api/reservations/conflicts?equipment_id=1'
+                               f'&start_date={date.today()}&end_date={date.today()}').get_json()
+        assert conflicts['conflicts']
+
+    response = client.delete('/api/users/1')
+
+    assert response.status_code == 200
+    with app.app_context():
+        assert db.session.get(User, 1) is None
+        assert Reservation.query.filter_by(user_id=1).count() == 0
+        assert ReservationArchive.query.filter_by(user_id=1).count() == 0
+        assert UserMonthlyUsage.query.filter_by(user_id=1).count() == 0
+        assert UserDailyUsage.query.filter_by(user_id=1).count() == 0
+        assert Reservation.query.filter_by(user_id=2).count() == 10
+        assert ReservationArchive.query.filter_by(user_id=2).count() == 10
+        assert_rollups_match_reservations()
+    # 지운 사용자의 예약이 구간 인덱스에서도 빠져야 같은 날 예약 가능
+    response = client.post('/api/reservations', json={'user_id': 2, 'equipment_id': 1,
+                                                      'start_date': date.today().isoformat(),
+                                                      'end_date': date.today().isoformat()})
+    assert response.status_code == 201
+
+
+def test_hard_delete_equipment_cascades(app, client):
+    with app.app_context():
+        add_past_reservations(30)
+        add_reservations(30)
+        rebuild_rollups()
+
+    assert client.delete('/api/equipment/2').status_code == 200
+
+    with app.app_context():
+        assert Reservation.query.filter_by(equipment_id=2).count() == 0
+        assert UserMonthlyUsage.query.filter_by(equipment_id=2).count() == 0
+        assert UserDailyUsage.query.filter_by(equipment_id=2).count() == 0
+        assert_rollups_match_reservations()
+
+
+def test_soft_delete_user_keeps_history(app, client):
+    app.config['SOFT_DELETE'] = True
+    today = date.today()
+    with app.app_context():
+        add_past_reservations(30)
+        add_reservations(30)
+        rebuild_rollups()
+        past = Reservation.query.filter(Reservation.user_id == 1, Reservation.start_date < today).count()
+
+    assert client.delete('/api/users/1').status_code == 200
+
+    with app.app_context():
+        # 시작 전 예약만 지워지고 지난 예약과 사용자 행은 남음
+        assert Reservation.query.filter(Reservation.user_id == 1, Reservation.start_date >= today).count() == 0
+        assert Reservation.query.filter_by(user_id=1).count() == past > 0
+        assert db.session.get(User, 1).deleted_at is not None
+        assert_rollups_match_reservations()
+    assert 1 not in [user['id'] for user in client.get('/api/users').get_json()]
+    assert client.delete('/api/users/1').status_code == 404
+    response = client.post('/api/reservations', json={'user_id': 1, 'equipment_id': 2,
+                                                      'start_date': (today + timedelta(days=200)).isoformat(),
+                                                      'end_date': (today + timedelta(days=200)).isoformat()})
+    assert response.status_code == 404
+    statistics = client.get(f'/api/statistics?start_date={today - timedelta(days=60)}&end_date={today}').get_json()
+    assert any('user1' in usage['users'] for usage in statistics['equipment_usage'].values())
+
+    # 같은 이름으로 추가하면 같은 ID로 되살아나고 지난 예약이 다시 연결됨
+    response = client.post('/api/users', json={'name': 'user1'})
+
+    assert response.status_code == 201
+    assert response.get_json()['id'] == 1
+    assert 1 in [user['id'] for user in client.get('/api/users').get_json()]
+    reservations = client.get('/api/reservations?user_id=1').get_json()
+    assert len(reservations) == past
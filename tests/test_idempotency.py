@@ -0,0 +1,97 @@
+"""
+Idempotency-Key: 같은 키의 재시도는 저장된 응답을 그대로 받고, 다른 요청이나 처리 중인 키는 거절
+"""
+import hashlib
+import json
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+
+from app import IDEMPOTENCY_KEY_MAX_LENGTH, IdempotencyKey, Reservation, db
+
+TODAY = date.today()
+BODY = json.dumps({'user_id': 1, 'equipment_id': 1, 'start_date': TODAY.isoformat(),
+                   'end_date': (TODAY + timedelta(days=2)).isoformat()}).encode()
+
+
+def post(client, key, body=BODY, url='/api/reservations'):
+    return client.post(url, data=body, content_type='application/json', headers={'Idempotency-Key': key})
+
+
+def reservation_count(app):
+    with app.app_context():
+        return Reservation.query.count()
+
+
+def add_key(app, key, body=BODY, status_code=None, age=0):
+    """POST /api/reservations 요청에 대한 키 행을 직접 추가 (age초 전에 점유/저장된 것으로)"""
+    with app.app_context():
+        db.session.add(IdempotencyKey(
+            key=key, request_hash=hashlib.sha256(b'\n'.join([b'POST', b'/api/reservations?', body])).digest(),
+            status_code=status_code, response_body=b'{"id":1}' if status_code else None,
+            created_at=datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=age)))
+        db.session.commit()
+
+
+def test_retry_replays_stored_response(app, client):
+    first = post(client, 'key-1')
+    assert first.status_code == 201
+    assert 'Idempotent-Replayed' not in first.headers
+
+    retry = post(client, 'key-1')
+    assert retry.status_code == 201
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+    assert retry.get_data() == first.get_data()
+    assert reservation_count(app) == 1
+
+    # 키가 없으면 같은 요청이 중복 검사에 걸림
+    assert client.post('/api/reservations', data=BODY, content_type='application/json').status_code == 409
+    # 다른 키는 새 요청
+    assert post(client, 'key-2').status_code == 409
+
+
+def test_client_errors_are_replayed(app, client):
+    body = json.dumps({'user_id': 99, 'equipment_id': 1, 'start_date': TODAY.isoformat(),
+                       'end_date': TODAY.isoformat()}).encode()
+    first = post(client, 'missing-user', body)
+    assert first.status_code == 404
+    retry = post(client, 'missing-user', body)
+    assert (retry.status_code, retry.get_data()) == (404, first.get_data())
+    assert retry.headers['Idempotent-Replayed'] == 'true'
+
+
+def test_same_key_with_different_request_is_422(app, client):
+    created = post(client, 'key-1').get_json()
+    other = BODY.replace(b'"user_id": 1', b'"user_id": 2')
+
+    assert post(client, 'key-1', other).status_code == 422
+    assert client.delete(f"/api/reservations/{created['id']}", headers={'Idempotency-Key': 'key-1'}).status_code == 422
+    assert reservation_count(app) == 1
+
+
+def test_in_flight_key_is_409_with_retry_after(app, client):
+    add_key(app, 'busy')
+
+    response = post(client, 'busy')
+    assert response.status_code == 409
+    assert response.headers['Retry-After'] == '1'
+    assert reservation_count(app) == 0
+
+
+def test_abandoned_and_expired_keys_run_again(app, client):
+    # 처리 중인 채로 IDEMPOTENCY_LOCK_TIMEOUT이 지난 키는 다시 점유
+    add_key(app, 'abandoned', age=app.config['IDEMPOTENCY_LOCK_TIMEOUT'] + 1)
+    response = post(client, 'abandoned')
+    assert response.status_code == 201
+    assert 'Idempotent-Replayed' not in response.headers
+
+    # IDEMPOTENCY_TTL이 지난 응답은 재사용하지 않음 (다시 실행하면 방금 만든 예약과 겹침)
+    add_key(app, 'expired', status_code=201, age=app.config['IDEMPOTENCY_TTL'] + 1)
+    assert post(client, 'expired').status_code == 409
+    assert reservation_count(app) == 1
+
+
+@pytest.mark.parametrize('key', ['', 'k' * (IDEMPOTENCY_KEY_MAX_LENGTH + 1)])
+def test_invalid_key_length_is_400(app, client, key):
+    assert post(client, key).status_code == 400
+    assert reservation_count(app) == 0
@@ -0,0 +1,58 @@
+"""
+init_database(): 빈 DB는 테이블 생성 + 최신 리비전 표시, 예전 스키마의 DB는 마이그레이션 적용
+"""
+import os
+import shutil
+
+import pytest
+from sqlalchemy import text
+
+from app import create_app, db, init_database, missing_schema
+
+REPO_DB = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'reservations.db')
+
+
+def make_app(path, **config):
+    return create_app({'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(path), **config})
+
+
+def head_revision():
+    return db.session.execute(text('SELECT version_num FROM alembic_version')).scalar()
+
+
+def test_init_empty_database_stamps_head(tmp_path):
+    app = make_app(tmp_path / 'new.db')
+    with app.app_context():
+        init_database()
+        assert missing_schema() == []
+        revision = head_revision()
+        # 다시 실행해도 그대로
+        init_database()
+        assert head_revision() == revision
+        db.engine.dispose()
+    assert revision is not None
+
+
+def test_init_upgrades_pre_migration_database(tmp_path):
+    path = tmp_path / 'old.db'
+    shutil.copy(REPO_DB, path)
+    app = make_app(path)
+    with app.app_context():
+        assert 'reservation.series_id' in missing_schema()
+        init_database()
+        assert missing_schema() == []
+        db.engine.dispose()
+
+    client = app.test_client()
+    for url in ('/api/reservations', '/api/users', '/api/equipment', '/api/statistics'):
+        assert client.get(url).status_code == 200, url
+
+
+def test_init_without_migrations_explains_upgrade(tmp_path):
+    path = tmp_path / 'old.db'
+    shutil.copy(REPO_DB, path)
+    app = make_app(path, ENABLE_MIGRATIONS=False)
+    with app.app_context():
+        with pytest.raises(RuntimeError, match='flask db upgrade'):
+            init_database()
+        db.engine.dispose()
@@ -0,0 +1,55 @@
+"""
+EquipmentIntervalIndex: 양 끝을 포함하는 날짜 구간의 겹침 판정 경계
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from app import EquipmentIntervalIndex
+
+D = date(2026, 3, 1)
+
+
+def day(offset):
+    return D + timedelta(days=offset)
+
+
+@pytest.fixture
+def index():
+    # 1: 하루짜리, 2: 긴 예약, 3: 긴 예약 바로 다음 날 하루
+    return EquipmentIntervalIndex([(1, day(0), day(0)), (2, day(5), day(30)), (3, day(31), day(31))])
+
+
+@pytest.mark.parametrize('start, end, expected', [
+    (0, 0, [1]),           # 같은 날 시작/종료
+    (-1, -1, []),
+    (1, 4, []),            # 두 예약 사이
+    (-3, 0, [1]),          # 종료일이 예약 시작일
+    (0, 5, [1, 2]),
+    (4, 5, [2]),           # 종료일이 긴 예약의 시작일
+    (30, 30, [2]),         # 긴 예약의 마지막 날 (앞에서 시작한 예약)
+    (20, 20, [2]),         # 긴 예약의 한가운데 하루
+    (29, 31, [2, 3]),
+    (31, 40, [3]),
+    (32, 40, []),
+    (-10, 50, [1, 2, 3]),
+])
+def test_collisions_boundaries(index, start, end, expected):
+    assert index.collisions(day(start), day(end)) == expected
+    assert index.collides(day(start), day(end)) == bool(expected)
+
+
+def test_exclude_id_and_updates(index):
+    # 자기 자신(수정 중인 예약)은 제외
+    assert index.collisions(day(10), day(12), exclude_id=2) == []
+    assert not index.collides(day(10), day(12), exclude_id=2)
+
+    # 긴 예약을 줄이면 뒤쪽이 비고, 그 자리에 새 예약을 넣으면 다시 겹침
+    index.add(2, day(5), day(9))
+    assert index.collisions(day(10), day(30)) == []
+    index.add(4, day(10), day(30))
+    assert index.collisions(day(30), day(30)) == [4]
+    index.remove(4)
+    index.remove(1)
+    assert index.collisions(day(-5), day(30)) == [2]
+    assert EquipmentIntervalIndex([]).collisions(day(0), day(0)) == []
@@ -0,0 +1,117 @@
+"""
+커서(keyset) 페이지네이션: limit/cursor를 지정한 목록 조회
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from app import Reservation, User, db
+from conftest import add_reservations
+from test_query_plans import assert_index_search, reservation_plans
+
+TODAY = date.today()
+
+
+def walk(client, url, limit, between_pages=None):
+    """next_cursor를 따라 끝까지 읽은 항목 목록 (between_pages(n)은 n번째 페이지를 읽은 뒤 호출)"""
+    items, cursor, pages = [], None, 0
+    while True:
+        query = f'limit={limit}' + (f'&cursor={cursor}' if cursor else '')
+        response = client.get(url + ('&' if '?' in url else '?') + query)
+        assert response.status_code == 200, response.get_json()
+        body = response.get_json()
+        assert len(body['items']) <= limit
+        items.extend(body['items'])
+        pages += 1
+        cursor = body['next_cursor']
+        if cursor is None:
+            return items
+        if between_pages:
+            between_pages(pages)
+
+
+def order_key(item):
+    return item['start_date'], item['id']
+
+
+def test_reservation_pages_follow_start_date_then_id(app, client):
+    with app.app_context():
+        add_reservations(30)  # 장비 3개가 같은 날 시작 (start_date가 같은 행이 3개씩)
+
+    full = client.get('/api/reservations').get_json()
+    items = walk(client, '/api/reservations', limit=4)
+
+    assert [item['id'] for item in items] == [item['id'] for item in sorted(full, key=order_key)]
+    assert len({item['id'] for item in items}) == 30
+    # 페이지 응답 항목은 전체 목록과 같은 형태
+    assert {item['id']: item for item in items} == {item['id']: item for item in full}
+
+    # 필터와 함께 써도 같은 순서
+    filtered = client.get('/api/reservations?equipment_id=2').get_json()
+    items = walk(client, '/api/reservations?equipment_id=2', limit=3)
+    assert [item['id'] for item in items] == [item['id'] for item in sorted(filtered, key=order_key)]
+
+
+def test_pages_skip_nothing_when_rows_change_mid_walk(app, client):
+    with app.app_context():
+        add_reservations(30)
+        deleted_id = Reservation.query.order_by(Reservation.start_date.desc(), Reservation.id.desc()).first().id
+    inserted = []
+
+    def change(page):
+        if page != 2:
+            return
+        with app.app_context():
+            # 이미 지나간 위치와 앞으로 읽을 위치에 하나씩 추가, 앞으로 읽을 행 하나 삭제
+            behind = Reservation(user_id=1, equipment_id=1, start_date=TODAY - timedelta(days=3),
+                                 end_date=TODAY - timedelta(days=3), purpose='behind')
+            ahead = Reservation(user_id=1, equipment_id=1, start_date=TODAY + timedelta(days=100),
+                                end_date=TODAY + timedelta(days=100), purpose='ahead')
+            db.session.add_all([behind, ahead])
+            db.session.delete(db.session.get(Reservation, deleted_id))
+            db.session.commit()
+            inserted.extend([behind.id, ahead.id])
+
+    items = walk(client, '/api/reservations', limit=4, between_pages=change)
+    ids = [item['id'] for item in items]
+
+    behind_id, ahead_id = inserted
+    assert len(ids) == len(set(ids))
+    assert behind_id not in ids and deleted_id not in ids
+    assert ahead_id == ids[-1]
+    assert set(ids) == set(range(1, 31)) - {deleted_id} | {ahead_id}
+    assert [order_key(item) for item in items] == sorted(order_key(item) for item in items)
+
+
+@pytest.mark.parametrize('url', ['/api/users', '/api/equipment'])
+def test_id_ordered_pages(app, client, url):
+    with app.app_context():
+        db.session.add_all(User(name=f'extra{i}') for i in range(4))
+        db.session.commit()
+
+    full = client.get(url).get_json()
+    items = walk(client, url, limit=2)
+    assert [item['id'] for item in items] == sorted(item['id'] for item in full)
+    assert client.get(f'{url}?limit=500').get_json()['next_cursor'] is None
+
+
+@pytest.mark.parametrize('url', ['/api/reservations', '/api/users', '/api/equipment'])
+@pytest.mark.parametrize('query', ['limit=0', 'limit=501', 'limit=abc', 'cursor=not-a-cursor', 'cursor=WyJ4Il0'])
+def test_invalid_page_args_are_400(client, url, query):
+    assert client.get(f'{url}?{query}').status_code == 400
+
+
+def test_next_page_seeks_from_cursor(app, client, record_sql):
+    with app.app_context():
+        add_reservations(30)
+    first = client.get('/api/reservations?limit=10').get_json()
+
+    with record_sql() as sql:
+        response = client.get(f"/api/reservations?limit=10&cursor={first['next_cursor']}")
+    assert response.status_code == 200
+    assert len(response.get_json()['items']) == 10
+    # SQLite 방언은 LIMIT 뒤에 항상 OFFSET ?을 붙이므로 바인딩 값이 0인지 확인
+    pages = [(statement, parameters) for statement, parameters in sql.selects if 'LIMIT' in statement]
+    assert pages and all(parameters[-1] == 0 for _, parameters in pages)
+    # 커서 위치부터 인덱스를 탐색
+    assert_index_search(reservation_plans(app, pages))
@@ -0,0 +1,49 @@
+"""
+예약 목록과 409 충돌 응답의 SELECT 수 (N+1 회귀 방지)
+
+사용자/장비 이름은 JOIN으로 함께 읽으므로 예약이 몇 건이든 SELECT 수가 같아야 한다.
+"""
+from datetime import date
+
+import pytest
+
+from conftest import add_reservations
+
+# 데이터 버전(ETag), 보관 테이블 워터마크, 예약+사용자+장비 JOIN
+LIST_SELECTS = 3
+# 사용자, 장비, 충돌한 예약 한 건 (중복 검사 자체는 메모리 구간 인덱스)
+CONFLICT_SELECTS = 3
+
+
+@pytest.mark.parametrize('count', [3, 60])
+def test_list_reservations_select_count(app, client, record_sql, count):
+    with app.app_context():
+        add_reservations(count)
+
+    with record_sql() as sql:
+        response = client.get('/api/reservations')
+
+    assert response.status_code == 200
+    assert len(response.get_json()) == count
+    assert all(item['user_name'] and item['equipment_name'] for item in response.get_json())
+    assert len(sql.selects) == LIST_SELECTS, sql.selects
+
+
+@pytest.mark.parametrize('count', [3, 60])
+def test_conflict_reservation_select_count(app, client, record_sql, count):
+    with app.app_context():
+        add_reservations(count)
+    today = date.today().isoformat()
+    # 장비 1의 구간 인덱스를 미리 불러 둠 (처음 한 번만 DB에서 읽음)
+    client.get(f'/api/reservations/conflicts?equipment_id=1&start_date={today}&end_date={today}')
+
+    with record_sql() as sql:
+        response = client.post('/api/reservations', json={'user_id': 2, 'equipment_id': 1,
+                                                          'start_date': today, 'end_date': today})
+
+    assert response.status_code == 409
+    conflict = response.get_json()['conflict_reservation']
+    assert conflict['equipment_id'] == 1
+    assert conflict['user_name'] == 'user1'
+    assert conflict['equipment_name'] == 'equipment1'
+    assert len(sql.selects) == CONFLICT_SELECTS, sql.selects
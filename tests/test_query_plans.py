@@ -0,0 +1,91 @@
+"""
+기간 조회 쿼리가 ix_reservation_* 인덱스(통계는 롤업 테이블의 날짜 키)를 탐색(SEARCH)하는지 EXPLAIN QUERY PLAN으로 확인
+
+요청 중에 실제로 실행된 SQL을 모아 계획을 보므로, 쿼리를 고쳐 쓰다가 테이블 전체 스캔으로
+돌아가면 실패한다.
+"""
+from datetime import date, timedelta
+
+from conftest import add_reservations
+from app import db, rebuild_rollups
+
+TODAY = date.today()
+
+
+def reservation_plans(app, statements, table='reservation'):
+    """table을 읽는 SELECT마다 EXPLAIN QUERY PLAN의 table 관련 줄 목록"""
+    plans = []
+    with app.app_context():
+        connection = db.session.connection()
+        for statement, parameters in statements:
+            if f'FROM {table}' not in statement and 'FROM (SELECT' not in statement:
+                continue
+            details = [row[-1] for row in connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)]
+            details = [detail for detail in details if detail.split()[1:2] == [table]]
+            if details:
+                plans.append(details)
+    return plans
+
+
+def assert_index_search(plans, table='reservation', index='INDEX ix_reservation_'):
+    assert plans, f'{table} 테이블을 읽는 쿼리가 없음'
+    for details in plans:
+        assert not any(detail.startswith('SCAN') for detail in details), details
+        assert any(detail.startswith(f'SEARCH {table} USING') and index in detail
+                   for detail in details), details
+
+
+def test_overlap_check_uses_index(app, client, record_sql):
+    with app.app_context():
+        add_reservations(30)
+
+    with record_sql() as sql:
+        response = client.post('/api/reservations', json={'user_id': 1, 'equipment_id': 1,
+                                                          'start_date': TODAY.isoformat(), 'end_date': TODAY.isoformat()})
+    assert response.status_code == 409
+    assert_index_search(reservation_plans(app, [s for s in sql.selects if 'reservation.id = ?' not in s[0]]))
+
+    # 반복 예약은 회차 기간 전체와 겹치는 예약을 DB에서 찾음
+    with record_sql() as sql:
+        response = client.post('/api/reservations/series', json={
+            'user_id': 1, 'equipment_id': 2, 'frequency': 'daily',
+            'start_date': TODAY.isoformat(), 'until_date': (TODAY + timedelta(days=20)).isoformat()})
+    assert response.status_code == 409
+    assert_index_search(reservation_plans(app, sql.selects))
+
+
+def test_calendar_range_uses_index(app, client, record_sql):
+    with app.app_context():
+        add_reservations(30)
+    start, end = TODAY + timedelta(days=7), TODAY + timedelta(days=37)
+
+    for query in ('', '&equipment_id=2', '&user_id=3'):
+        with record_sql() as sql:
+            response = client.get(f'/api/reservations?start={start}&end={end}{query}')
+        assert response.status_code == 200
+        assert response.get_json()
+        assert_index_search(reservation_plans(app, sql.selects))
+
+
+def test_statistics_range_reads_rollups(app, client, record_sql):
+    with app.app_context():
+        add_reservations(30)
+        rebuild_rollups()
+    # 달 중간에서 시작/끝나고 온전한 달이 하나 이상 들어가는 기간 (앞뒤 일부 달은 일간 롤업, 가운데는 월간 롤업)
+    start, end = TODAY + timedelta(days=3), TODAY + timedelta(days=70)
+
+    for query in ('', '&equipment_id=2'):
+        with record_sql() as sql:
+            response = client.get(f'/api/statistics?start_date={start}&end_date={end}{query}')
+        assert response.status_code == 200
+        assert not reservation_plans(app, sql.selects)
+        assert_index_search(reservation_plans(app, sql.selects, 'user_daily_usage'), 'user_daily_usage', 'PRIMARY KEY')
+        assert_index_search(reservation_plans(app, sql.selects, 'user_monthly_usage'), 'user_monthly_usage',
+                            'INDEX ix_user_monthly_usage_month')
+
+    # 사용자 필터는 사용자 인덱스로 탐색해도 됨 (어느 쪽이든 전체 스캔은 아님)
+    with record_sql() as sql:
+        response = client.get(f'/api/statistics?start_date={start}&end_date={end}&user_id=3')
+    assert response.status_code == 200
+    assert not reservation_plans(app, sql.selects)
+    assert_index_search(reservation_plans(app, sql.selects, 'user_daily_usage'), 'user_daily_usage', '')
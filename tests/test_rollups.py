@@ -0,0 +1,90 @@
+"""
+사용량 롤업 (user_monthly_usage, user_daily_usage)
+
+쓰기 엔드포인트가 같은 트랜잭션에서 갱신한 롤업은 원본 예약으로 다시 만든 롤업과 같아야 하고,
+롤업으로 계산한 기간별 사용 일수는 원본 예약에서 직접 센 값과 같아야 한다.
+"""
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import select
+
+from app import Reservation, UserDailyUsage, UserMonthlyUsage, db, rebuild_rollups, usage_pairs_from_rollups
+from conftest import add_reservations
+
+TODAY = date.today()
+
+
+def rollup_rows():
+    return (sorted(db.session.execute(select(UserMonthlyUsage.__table__)).all()),
+            sorted(db.session.execute(select(UserDailyUsage.__table__)).all()))
+
+
+def assert_rollups_match_reservations(app):
+    with app.app_context():
+        before = rollup_rows()
+        rebuild_rollups()
+        assert rollup_rows() == before
+
+
+def test_write_endpoints_keep_rollups_in_sync(app, client):
+    def post(url, **body):
+        response = client.post(url, json=body)
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()
+
+    def day(offset):
+        return (TODAY + timedelta(days=offset)).isoformat()
+
+    # 달을 넘기는 예약, 배치, 반복 예약을 만든 뒤 옮기고 지움
+    created = post('/api/reservations', user_id=1, equipment_id=1, start_date=day(25), end_date=day(40))
+    post('/api/reservations/batch', reservations=[
+        {'user_id': 2, 'equipment_id': 2, 'start_date': day(1), 'end_date': day(3)},
+        {'user_id': 3, 'equipment_id': 2, 'start_date': day(28), 'end_date': day(33)},
+    ])
+    series = post('/api/reservations/series', user_id=2, equipment_id=3, frequency='weekly',
+                  weekdays=[0, 3], duration_days=2, start_date=day(0), until_date=day(60))
+    assert_rollups_match_reservations(app)
+
+    response = client.put(f"/api/reservations/{created['id']}",
+                          json={'user_id': 3, 'equipment_id': 1, 'start_date': day(50), 'end_date': day(70)})
+    assert response.status_code == 200, response.get_json()
+    assert client.put(f"/api/reservations/series/{series['id']}", json={'user_id': 1}).status_code == 200
+    assert_rollups_match_reservations(app)
+
+    assert client.delete(f"/api/reservations/{created['id']}").status_code == 200
+    assert client.delete(f"/api/reservations/series/{series['id']}").status_code == 200
+    assert_rollups_match_reservations(app)
+    with app.app_context():
+        # 0이 된 행은 남기지 않음
+        assert UserDailyUsage.query.filter(UserDailyUsage.used_days <= 0).count() == 0
+        assert UserMonthlyUsage.query.filter(UserMonthlyUsage.used_days <= 0).count() == 0
+
+
+@pytest.mark.parametrize('start_offset, end_offset', [
+    (0, 0),      # 하루
+    (-3, 10),    # 달 안 (또는 달 경계에 걸친) 짧은 기간
+    (-40, 100),  # 앞뒤 일부 달 + 온전한 달
+    (-200, 400), # 온전한 달 여러 개
+])
+def test_rollup_usage_matches_reservations(app, start_offset, end_offset):
+    start, end = TODAY + timedelta(days=start_offset), TODAY + timedelta(days=end_offset)
+    with app.app_context():
+        add_reservations(90)
+        # 지난 기간에도 달을 넘는 긴 예약 추가
+        db.session.add_all(Reservation(user_id=u, equipment_id=u, start_date=TODAY - timedelta(days=70 + u),
+                                       end_date=TODAY - timedelta(days=20 - u), purpose='long')
+                           for u in (1, 2, 3))
+        db.session.commit()
+        rebuild_rollups()
+
+        expected = {}
+        for res in Reservation.query:
+            days = (min(res.end_date, end) - max(res.start_date, start)).days + 1
+            if days > 0:
+                key = (res.equipment_id, res.user_id)
+                expected[key] = expected.get(key, 0) + days
+
+        assert usage_pairs_from_rollups(start, end) == expected
+        assert usage_pairs_from_rollups(start, end, equipment_ids=[2]) == {
+            key: days for key, days in expected.items() if key[0] == 2}
@@ -0,0 +1,148 @@
+"""
+반복 예약 (/api/reservations/series): 회차 전개, 전부 아니면 전무 충돌 검사, 앞으로의 회차만 수정/취소
+"""
+from datetime import date, timedelta
+
+import pytest
+
+from app import Reservation, ReservationSeries, db, interval_indexes, rebuild_rollups
+from test_rollups import assert_rollups_match_reservations
+
+TODAY = date.today()
+NEXT_MONDAY = TODAY + timedelta(days=7 - TODAY.weekday())
+
+
+def day(offset, base=TODAY):
+    return base + timedelta(days=offset)
+
+
+def series_body(**fields):
+    body = {'user_id': 1, 'equipment_id': 1, 'frequency': 'daily',
+            'start_date': TODAY.isoformat(), 'until_date': day(10).isoformat()}
+    body.update(fields)
+    return body
+
+
+def occurrences(app, series_id):
+    with app.app_context():
+        return [(res.user_id, res.equipment_id, res.start_date, res.end_date)
+                for res in Reservation.query.filter_by(series_id=series_id).order_by(Reservation.start_date)]
+
+
+@pytest.fixture
+def series(app, client):
+    """장비 1의 이틀 간격 하루짜리 회차 6개 (0, 2, ..., 10일 뒤) 중 첫 회차를 지난 기록으로 옮긴 반복 예약"""
+    response = client.post('/api/reservations/series', json=series_body(interval=2))
+    assert response.status_code == 201, response.get_json()
+    series_id = response.get_json()['id']
+    with app.app_context():
+        first = Reservation.query.filter_by(series_id=series_id, start_date=TODAY).one()
+        first.start_date = first.end_date = day(-5)
+        db.session.commit()
+        rebuild_rollups()
+        interval_indexes.invalidate({1})
+    return series_id
+
+
+def test_expand_daily_and_weekly(app, client):
+    response = client.post('/api/reservations/series', json=series_body(interval=3, until_date=day(9).isoformat()))
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body['occurrences'] == 4
+    assert [start for _, _, start, _ in occurrences(app, body['id'])] == [day(0), day(3), day(6), day(9)]
+
+    # 2주마다 월/수, 이틀씩 (until_date는 마지막 회차의 시작일 상한)
+    response = client.post('/api/reservations/series', json=series_body(
+        equipment_id=2, frequency='weekly', interval=2, weekdays=[2, 0], duration_days=2,
+        start_date=NEXT_MONDAY.isoformat(), until_date=day(27, NEXT_MONDAY).isoformat()))
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body['occurrences'] == 4 and body['weekdays'] == [0, 2]
+    assert [(start, end) for _, _, start, end in occurrences(app, body['id'])] == [
+        (day(offset, NEXT_MONDAY), day(offset + 1, NEXT_MONDAY)) for offset in (0, 2, 14, 16)]
+    assert_rollups_match_reservations(app)
+
+
+@pytest.mark.parametrize('fields', [
+    {'start_date': day(-1).isoformat()},                # 과거 시작
+    {'duration_days': 2},                               # 회차끼리 겹침
+    {'frequency': 'weekly'},                            # weekdays 없음
+    {'frequency': 'monthly'},
+    {'until_date': day(-1).isoformat()},
+])
+def test_invalid_series_is_400(app, client, fields):
+    assert client.post('/api/reservations/series', json=series_body(**fields)).status_code == 400
+    with app.app_context():
+        assert ReservationSeries.query.count() == 0
+
+
+def test_conflicting_occurrences_save_nothing(app, client):
+    response = client.post('/api/reservations', json={
+        'user_id': 2, 'equipment_id': 1, 'start_date': day(3).isoformat(), 'end_date': day(4).isoformat()})
+    existing = response.get_json()['id']
+
+    response = client.post('/api/reservations/series', json=series_body())
+    assert response.status_code == 409
+    assert response.get_json()['conflicts'] == [
+        {'start_date': day(3).isoformat(), 'conflict_reservation_id': existing},
+        {'start_date': day(4).isoformat(), 'conflict_reservation_id': existing},
+    ]
+    with app.app_context():
+        assert ReservationSeries.query.count() == 0
+        assert Reservation.query.count() == 1
+
+
+def test_update_changes_only_upcoming_occurrences(app, client, series):
+    response = client.put(f'/api/reservations/series/{series}', json={'user_id': 3, 'purpose': 'moved'})
+    assert response.status_code == 200
+    assert response.get_json()['updated_occurrences'] == 5
+    rows = occurrences(app, series)
+    assert rows[0] == (1, 1, day(-5), day(-5))  # 지난 회차는 그대로
+    assert {row[:2] for row in rows[1:]} == {(3, 1)}
+
+    # 다른 장비로 옮길 때 겹치는 회차가 있으면 아무것도 바꾸지 않음
+    blocker = client.post('/api/reservations', json={
+        'user_id': 2, 'equipment_id': 2, 'start_date': day(4).isoformat(), 'end_date': day(4).isoformat()}).get_json()['id']
+    response = client.put(f'/api/reservations/series/{series}', json={'equipment_id': 2})
+    assert response.status_code == 409
+    assert response.get_json()['conflicts'] == [{'start_date': day(4).isoformat(), 'conflict_reservation_id': blocker}]
+    assert {row[:2] for row in occurrences(app, series)[1:]} == {(3, 1)}
+
+    assert client.delete(f'/api/reservations/{blocker}').status_code == 200
+    assert client.put(f'/api/reservations/series/{series}', json={'equipment_id': 2}).status_code == 200
+    assert {row[:2] for row in occurrences(app, series)[1:]} == {(3, 2)}
+
+    # 구간 인덱스도 옮긴 장비 기준으로 갱신됨
+    def book(equipment_id):
+        return client.post('/api/reservations', json={
+            'user_id': 1, 'equipment_id': equipment_id, 'start_date': day(6).isoformat(), 'end_date': day(6).isoformat()})
+    assert book(2).status_code == 409
+    assert book(1).status_code == 201
+    assert_rollups_match_reservations(app)
+
+
+def test_delete_keeps_past_occurrences(app, client, series):
+    response = client.delete(f'/api/reservations/series/{series}')
+    assert response.status_code == 200
+    assert response.get_json()['deleted_occurrences'] == 5
+    assert occurrences(app, series) == [(1, 1, day(-5), day(-5))]
+    with app.app_context():
+        # 규칙은 어제까지로 줄여서 보존
+        assert db.session.get(ReservationSeries, series).until_date == day(-1)
+
+    # 취소된 회차 자리는 바로 예약 가능
+    response = client.post('/api/reservations', json={
+        'user_id': 2, 'equipment_id': 1, 'start_date': day(2).isoformat(), 'end_date': day(10).isoformat()})
+    assert response.status_code == 201
+    assert_rollups_match_reservations(app)
+
+
+def test_delete_without_history_removes_series(app, client):
+    series_id = client.post('/api/reservations/series', json=series_body()).get_json()['id']
+
+    response = client.delete(f'/api/reservations/series/{series_id}')
+    assert response.get_json()['deleted_occurrences'] == 11
+    assert occurrences(app, series_id) == []
+    assert client.delete(f'/api/reservations/series/{series_id}').status_code == 404
+    with app.app_context():
+        assert ReservationSeries.query.count() == 0
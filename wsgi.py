@@ -0,0 +1,46 @@
+"""
+운영용 WSGI 진입점
+
+- PythonAnywhere 등 WSGI 호스트: WSGI 설정 파일에서 `from wsgi import application`
+- 직접 실행: python wsgi.py (waitress가 설치되어 있으면 waitress, 없으면 werkzeug 멀티스레드 서버)
+- gunicorn: gunicorn --workers 1 --threads 28 wsgi:application
+
+장비별 쓰기 잠금, 예약 구간 인덱스, 통계 캐시가 프로세스 메모리에 있으므로
+워커 프로세스는 1개로 두고 스레드 수로 동시 처리량을 늘린다.
+테이블 생성은 배포 시 한 번 `flask init-db`(또는 `flask db upgrade`)로 실행한다.
+"""
+import os
+
+from app import create_app, missing_schema
+
+# 웹 워커는 flask db 명령이 필요 없으므로 flask_migrate/alembic을 불러오지 않음
+application = create_app({'ENABLE_MIGRATIONS': False})
+
+# 스키마가 모델보다 오래되었으면 요청마다 500을 내는 대신 시작할 때 바로 알림
+with application.app_context():
+    _missing = missing_schema()
+if _missing:
+    raise RuntimeError(f"데이터베이스 스키마가 최신이 아닙니다 (없는 테이블/컬럼: {', '.join(_missing)}). "
+                       "'FLASK_APP=app.py flask init-db'를 실행하세요.")
+
+SERVER_HOST = os.environ.get('RESERVATIONS_HOST', '0.0.0.0')
+SERVER_PORT = int(os.environ.get('RESERVATIONS_PORT', 8000))
+# 한 프로세스 안의 요청 처리 스레드 수 (변경 스트림은 연결마다 스레드 하나를 계속 점유하므로 그만큼 더함)
+SERVER_THREADS = int(os.environ.get('RESERVATIONS_THREADS', 8 + application.config['EVENT_STREAM_MAX_CLIENTS']))
+
+
+def serve():
+    try:
+        from waitress import serve as waitress_serve
+    except ImportError:
+        from werkzeug.serving import run_simple
+        print(f"werkzeug 멀티스레드 서버로 시작합니다 (http://{SERVER_HOST}:{SERVER_PORT})")
+        run_simple(SERVER_HOST, SERVER_PORT, application, threaded=True,
+                   use_reloader=False, use_debugger=False)
+    else:
+        print(f"waitress 서버로 시작합니다 (http://{SERVER_HOST}:{SERVER_PORT}, 스레드 {SERVER_THREADS}개)")
+        waitress_serve(application, host=SERVER_HOST, port=SERVER_PORT, threads=SERVER_THREADS)
+
+
+if __name__ == '__main__':
+    serve()